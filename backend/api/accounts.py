@@ -1,15 +1,60 @@
+import asyncio
+import base64
+import json
+import re
+import zipfile
+from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update, delete, func, and_, or_, true, bindparam
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from pydantic import BaseModel
-
-from database.database import get_session
-from database.models import Account, Proxy, AccountGroup, AccountTag
+from pydantic import BaseModel, Field
+
+from database.database import get_session, get_read_session
+from database.models import Account, Proxy, AccountGroup, AccountTag, account_tags, accounts_fts, ACCOUNT_STATUSES
+from services.account_index import account_index
+from services.account_selection import AccountFilter, account_filters, chunks
+from services.client_pool import client_pool
+from services.progress import Progress, progress_registry
+from services.response_cache import response_cache
+from services.serializers import ACCOUNT_KEYS, account_page, flat_rows
+from services.proxy_assign import plan_assignment, write_assignment, DEFAULT_MAX_PER_PROXY
+from services.status_stream import status_stream
+from services.session_checker import (
+    SessionValidator, DEFAULT_CONCURRENCY as DEFAULT_CHECK_CONCURRENCY, DEFAULT_PROXY_CONCURRENCY
+)
+from services.session_import import SessionImporter, iter_session_files
+from services.tdata import decode_archive
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+MAX_BULK_TAGS = 100
+
+# Columns that can be requested with `fields=` and used as sort keys
+ACCOUNT_FIELDS = {
+    "id": Account.id,
+    "telegram_id": Account.telegram_id,
+    "username": Account.username,
+    "phone": Account.phone,
+    "first_name": Account.first_name,
+    "last_name": Account.last_name,
+    "status": Account.status,
+    "proxy_id": Account.proxy_id,
+    "group_id": Account.group_id,
+    "last_checked_at": Account.last_checked_at,
+    "last_used_at": Account.last_used_at,
+    "created_at": Account.created_at,
+}
+
+# Tables read by the account list, their versions are part of its ETag
+ACCOUNT_LIST_TABLES = ["accounts", "proxies", "account_groups", "tags", "account_tags"]
+
 
 class AccountCreate(BaseModel):
     phone: Optional[str] = None
@@ -23,37 +68,188 @@ class AccountUpdate(BaseModel):
     tag_ids: Optional[List[int]] = None
 
 
+class BulkAction(BaseModel):
+    action: str  # delete, set_proxy, set_group, set_status, add_tags, remove_tags
+    # Select accounts either by id or by filter
+    account_ids: Optional[List[int]] = None
+    filter: Optional[AccountFilter] = None
+    value: Optional[int] = None  # proxy_id / group_id
+    status: Optional[str] = None  # set_status
+    tag_ids: Optional[List[int]] = None  # add_tags / remove_tags
+
+
+def _search_match(q: Optional[str]):
+    """FTS condition matching every word of `q` as a prefix, None for no words"""
+    if q and re.fullmatch(r"[\d\s()+-]+", q):
+        # A formatted phone number, indexed as one run of digits
+        digits = re.sub(r"\D", "", q)
+        words = [digits] if digits else []
+    else:
+        words = re.findall(r"\w+", q or "")
+    if not words:
+        return None
+    # Quoted so words are never read as FTS operators
+    expression = " ".join(f'"{word}"*' for word in words)
+    return accounts_fts.c.accounts_fts.op("MATCH")(expression)
+
+
+def _encode_cursor(value, account_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, account_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str, order_by: str):
+    try:
+        value, account_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if order_by == "last_checked_at" and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, int(account_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after_cursor(order_by: str, value, account_id: int, id_column=Account.id):
+    """Keyset condition for rows after (value, id) in ascending order"""
+    if order_by == "id":
+        return id_column > account_id
+
+    column = ACCOUNT_FIELDS[order_by]
+    # SQLite sorts NULLs first in ascending order
+    if value is None:
+        return or_(
+            and_(column.is_(None), id_column > account_id),
+            column.is_not(None)
+        )
+    return or_(column > value, and_(column == value, id_column > account_id))
+
+
+def _parse_fields(fields: str) -> List[str]:
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in ACCOUNT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _id_column(match):
+    # Search pages follow the FTS rowid order, which needs no sort
+    return accounts_fts.c.rowid if match is not None else Account.id
+
+
+def _list_conditions(status, group_id, tag_id, cursor: Optional[str], order_by: str, match=None) -> list:
+    """Filters and keyset cursor of the account list, resolved in SQL"""
+    conditions = account_filters(status, group_id, tag_id)
+    if cursor:
+        value, last_id = _decode_cursor(cursor, order_by)
+        conditions.append(_after_cursor(order_by, value, last_id, _id_column(match)))
+    return conditions
+
+
+def _list_query(selected: List[str], conditions: list, order_by: str, limit: int, match=None):
+    """Page of the account list, one row more than `limit` to tell if another follows"""
+    id_column = _id_column(match)
+    order = [id_column] if order_by == "id" else [ACCOUNT_FIELDS[order_by], id_column]
+    query = select(*[ACCOUNT_FIELDS[n] for n in selected])
+    if match is not None:
+        query = query.join(accounts_fts, accounts_fts.c.rowid == Account.id).where(match)
+    return query.where(*conditions).order_by(*order).limit(limit + 1)
+
+
 @router.get("")
 async def get_accounts(
+    request: Request,
     status: Optional[str] = None,
     group_id: Optional[int] = None,
     tag_id: Optional[int] = None,
-    session: AsyncSession = Depends(get_session)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order_by: str = Query("id", pattern="^(id|last_checked_at)$"),
+    fields: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get all accounts with optional filters"""
-    query = select(Account).options(
-        selectinload(Account.proxy),
-        selectinload(Account.group),
-        selectinload(Account.tags)
+    """Get a page of accounts with optional filters and search
+
+    Pages are ordered by `order_by` (then id) and continue from the
+    `next_cursor` of the previous page. Accounts reference their proxy,
+    group and tags by id, resolved in the `proxies`, `groups` and `tags`
+    side tables. With `fields=` only the listed columns are selected and
+    returned. `q` matches words of usernames, phones and names by prefix
+    through the FTS index. Responses carry an ETag and unchanged pages
+    are served from the response cache.
+    """
+    match = _search_match(q)
+
+    async def build():
+        index_ids = None
+        if order_by == "id" and account_index.ready and match is None:
+            # Resolve filters and the page of ids in memory, fetch only those rows.
+            # The filters are applied again in SQL for writes the index has not seen yet.
+            last_id = _decode_cursor(cursor, order_by)[1] if cursor else 0
+            bitmap = account_index.query(status, group_id, tag_id)
+            index_ids = account_index.page(bitmap, last_id, limit + 1)
+            conditions = [
+                Account.id.in_(bindparam("ids", index_ids[:limit], expanding=True, literal_execute=True)),
+                *account_filters(status, group_id, tag_id)
+            ]
+        else:
+            conditions = _list_conditions(status, group_id, tag_id, cursor, order_by, match)
+
+        if fields:
+            names = _parse_fields(fields)
+            # Sort key and id are always selected to build the next cursor
+            selected = list(dict.fromkeys(names + ["id", order_by]))
+        else:
+            selected = list(ACCOUNT_KEYS)
+
+        query = _list_query(selected, conditions, order_by, limit, match)
+        rows = (await session.execute(query)).all()
+        page = rows[:limit]
+
+        if fields:
+            payload = {"data": flat_rows([row[:len(names)] for row in page], names)}
+        else:
+            payload = await account_page(session, page)
+
+        if index_ids is not None:
+            # Ids the SQL filters dropped still count as read
+            more = len(index_ids) > limit
+            last = (index_ids[limit - 1], index_ids[limit - 1]) if more else None
+        else:
+            more = len(rows) > limit
+            last = (page[-1][selected.index(order_by)], page[-1][selected.index("id")]) if page else None
+        payload["next_cursor"] = _encode_cursor(*last) if more else None
+        return payload
+
+    return await response_cache.respond(request, "accounts", ACCOUNT_LIST_TABLES, build)
+
+
+@router.get("/stream")
+async def stream_accounts(
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """Stream account status changes as server-sent events
+
+    Each `changes` event carries the id and changed fields (status,
+    last_checked_at, proxy_id) of accounts updated since the previous
+    one. Reconnecting clients resume with `since` or the Last-Event-ID
+    header; a `reset` event means changes were missed and the list has
+    to be reloaded.
+    """
+    return StreamingResponse(
+        status_stream.subscribe(since if since is not None else last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    if status:
-        query = query.where(Account.status == status)
-    if group_id:
-        query = query.where(Account.group_id == group_id)
-    if tag_id:
-        query = query.join(Account.tags).where(AccountTag.id == tag_id)
-
-    result = await session.execute(query)
-    accounts = result.scalars().all()
-
-    return {"data": [acc.to_dict() for acc in accounts]}
-
 
 @router.get("/{account_id}")
 async def get_account(
     account_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get single account by ID"""
     query = select(Account).options(
@@ -86,7 +282,10 @@ async def create_account(
 
     session.add(account)
     await session.commit()
-    await session.refresh(account)
+    account_index.add([(account.id, account.status, account.group_id)])
+    status_stream.publish([{"id": account.id, "status": account.status, "proxy_id": account.proxy_id}])
+    # Load relationships eagerly, lazy loads are not allowed in async sessions
+    await session.refresh(account, ["proxy", "group", "tags"])
 
     return account.to_dict()
 
@@ -120,7 +319,14 @@ async def update_account(
         account.tags = list(tags_result.scalars().all())
 
     await session.commit()
-    await session.refresh(account)
+    account_index.set_group([account.id], account.group_id)
+    if data.proxy_id is not None:
+        status_stream.publish([{"id": account.id, "proxy_id": account.proxy_id}])
+        await client_pool.discard([account.id])
+    if data.tag_ids is not None:
+        account_index.set_tags(account.id, [tag.id for tag in account.tags])
+    # Load relationships eagerly, lazy loads are not allowed in async sessions
+    await session.refresh(account, ["proxy", "group", "tags"])
 
     return account.to_dict()
 
@@ -140,52 +346,295 @@ async def delete_account(
 
     await session.delete(account)
     await session.commit()
+    account_index.remove([account_id])
+    status_stream.publish([{"id": account_id, "deleted": True}])
+    await client_pool.discard([account_id])
 
     return {"success": True}
 
 
+def _bulk_selections(data: BulkAction):
+    """WHERE conditions for each statement of a bulk action
+
+    An id list yields one selection per chunk, a filter yields a single
+    selection that is resolved entirely in SQL.
+    """
+    if data.account_ids is not None:
+        ids = list(dict.fromkeys(data.account_ids))
+        return [[Account.id.in_(chunk)] for chunk in chunks(ids)]
+
+    conditions = account_filters(**data.filter.model_dump()) if data.filter else []
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Select accounts by account_ids or filter")
+    return [conditions]
+
+
+def _bulk_statement(data: BulkAction, conditions):
+    """Set-based statement for one selection, returning the rows it changed"""
+    if data.action == "delete":
+        # account_tags rows are removed by ON DELETE CASCADE
+        return delete(Account).where(*conditions).returning(Account.id)
+    if data.action == "set_proxy":
+        return update(Account).where(*conditions).values(proxy_id=data.value).returning(Account.id)
+    if data.action == "set_group":
+        return update(Account).where(*conditions).values(group_id=data.value).returning(Account.id)
+    if data.action == "set_status":
+        return update(Account).where(*conditions).values(status=data.status).returning(Account.id)
+
+    changed_pairs = (account_tags.c.account_id, account_tags.c.tag_id)
+    if data.action == "add_tags":
+        # One INSERT ... SELECT pairing every selected account with every tag
+        pairs = (
+            select(Account.id, AccountTag.id)
+            .join(AccountTag, true())
+            .where(*conditions, AccountTag.id.in_(data.tag_ids))
+        )
+        return (
+            insert(account_tags)
+            .from_select(["account_id", "tag_id"], pairs)
+            .on_conflict_do_nothing()
+            .returning(*changed_pairs)
+        )
+    if data.action == "remove_tags":
+        selected_ids = select(Account.id).where(*conditions)
+        return (
+            delete(account_tags)
+            .where(
+                account_tags.c.tag_id.in_(data.tag_ids),
+                account_tags.c.account_id.in_(selected_ids)
+            )
+            .returning(*changed_pairs)
+        )
+    raise HTTPException(status_code=400, detail=f"Unknown action: {data.action}")
+
+
+async def _publish_changes(data: BulkAction, changed):
+    """Update the filter index, status stream clients and pooled clients"""
+    ids = [row[0] for row in changed]
+    if data.action == "delete":
+        account_index.remove(ids)
+        status_stream.publish_ids(ids, deleted=True)
+        await client_pool.discard(ids)
+    elif data.action == "set_proxy":
+        status_stream.publish_ids(ids, proxy_id=data.value)
+        await client_pool.discard(ids)
+    elif data.action == "set_group":
+        account_index.set_group(ids, data.value)
+    elif data.action == "set_status":
+        account_index.set_status(ids, data.status)
+        status_stream.publish_ids(ids, status=data.status)
+    elif data.action == "add_tags":
+        account_index.add_tags(changed)
+    elif data.action == "remove_tags":
+        account_index.remove_tags(changed)
+
+
 @router.post("/bulk-action")
 async def bulk_action(
-    action: str,
-    account_ids: List[int],
-    value: Optional[int] = None,
+    data: BulkAction,
     session: AsyncSession = Depends(get_session)
 ):
-    """Perform bulk action on accounts"""
-    query = select(Account).where(Account.id.in_(account_ids))
-    result = await session.execute(query)
-    accounts = result.scalars().all()
-
-    if action == "delete":
-        for acc in accounts:
-            await session.delete(acc)
-    elif action == "set_proxy":
-        for acc in accounts:
-            acc.proxy_id = value
-    elif action == "set_group":
-        for acc in accounts:
-            acc.group_id = value
+    """Perform bulk action on accounts selected by id list or filter
+
+    Runs set-based statements without loading accounts into Python,
+    only the ids of changed rows come back to update the filter index.
+    """
+    if data.action == "set_status" and data.status not in ACCOUNT_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    if data.action in ("add_tags", "remove_tags"):
+        if not data.tag_ids or len(data.tag_ids) > MAX_BULK_TAGS:
+            raise HTTPException(status_code=400, detail=f"Provide 1-{MAX_BULK_TAGS} tag_ids")
+
+    changed = []
+    for conditions in _bulk_selections(data):
+        result = await session.execute(
+            _bulk_statement(data, conditions),
+            execution_options={"synchronize_session": False}
+        )
+        changed.extend(tuple(row) for row in result.all())
 
     await session.commit()
+    await _publish_changes(data, changed)
 
-    return {"success": True, "affected": len(accounts)}
+    return {"success": True, "affected": len(changed)}
+
+
+class ProxyAutoAssign(BaseModel):
+    # Select accounts either by id or by filter
+    account_ids: Optional[List[int]] = None
+    filter: Optional[AccountFilter] = None
+    max_per_proxy: int = Field(DEFAULT_MAX_PER_PROXY, ge=1, le=1000)
+    types: Optional[List[str]] = None  # socks5, http, ...
+    max_latency_ms: Optional[int] = None
+
+
+@router.post("/auto-assign-proxies")
+async def auto_assign_proxies(
+    data: ProxyAutoAssign,
+    session: AsyncSession = Depends(get_session)
+):
+    """Spread selected accounts over valid proxies
+
+    Accounts on a suitable proxy below the balanced load stay, the rest
+    go to the proxy with the fewest accounts, lower latency first,
+    skipping proxies at `max_per_proxy`. Accounts that do not fit keep
+    their proxy.
+    """
+    current = {}
+    for conditions in _bulk_selections(data):
+        result = await session.execute(select(Account.id, Account.proxy_id).where(*conditions))
+        current.update(result.all())
+
+    query = select(Proxy.id, Proxy.latency_ms).where(Proxy.status == "valid")
+    if data.types:
+        query = query.where(Proxy.type.in_(data.types))
+    if data.max_latency_ms is not None:
+        query = query.where(Proxy.latency_ms <= data.max_latency_ms)
+    proxies = (await session.execute(query)).all()
+
+    result = await session.execute(
+        select(Account.proxy_id, func.count())
+        .where(Account.proxy_id.is_not(None))
+        .group_by(Account.proxy_id)
+    )
+    loads = dict(result.all())
+    # The selected accounts are being reassigned, they don't count as load
+    for proxy_id in current.values():
+        if proxy_id is not None:
+            loads[proxy_id] -= 1
+
+    plan = plan_assignment(current, proxies, loads, data.max_per_proxy)
+    changed = {account_id: proxy_id for account_id, proxy_id in plan.items() if current[account_id] != proxy_id}
+
+    await write_assignment(session, changed)
+    await session.commit()
+
+    status_stream.publish({"id": account_id, "proxy_id": proxy_id} for account_id, proxy_id in changed.items())
+    await client_pool.discard(changed)
+
+    return {
+        "success": True,
+        "assigned": len(plan),
+        "changed": len(changed),
+        "unassigned": len(current) - len(plan),
+        "proxies": len(proxies)
+    }
+
+
+class SessionCheckRun(BaseModel):
+    # Select accounts either by id or by filter
+    account_ids: Optional[List[int]] = None
+    filter: Optional[AccountFilter] = None
+    concurrency: int = Field(DEFAULT_CHECK_CONCURRENCY, ge=1, le=1000)
+    proxy_concurrency: int = Field(DEFAULT_PROXY_CONCURRENCY, ge=1, le=100)
+
+
+# Keep references to running checks so they are not garbage collected
+_check_tasks = set()
+
+
+async def _run_session_check(validator: SessionValidator, targets, progress: Progress):
+    try:
+        await validator.run(targets, progress)
+        progress.finish()
+    except Exception as e:
+        progress.error("check", str(e))
+        progress.finish("failed")
+
+
+@router.post("/check")
+async def check_sessions(data: SessionCheckRun, wait: bool = False):
+    """Validate account sessions in the background, poll progress by run id
+
+    Selected accounts are marked `checking` up front and get their
+    result status and `last_checked_at` as checks complete.
+    """
+    validator = SessionValidator(concurrency=data.concurrency, proxy_concurrency=data.proxy_concurrency)
+    targets = await validator.mark_checking(_bulk_selections(data))
+    progress = progress_registry.start("session-check", total=len(targets))
+
+    task = asyncio.create_task(_run_session_check(validator, targets, progress))
+    _check_tasks.add(task)
+    task.add_done_callback(_check_tasks.discard)
+
+    if wait:
+        await task
+
+    return progress.to_dict()
+
+
+@router.get("/check/{run_id}")
+async def get_check_progress(run_id: str):
+    """Get progress of a session check run"""
+    progress = progress_registry.get(run_id)
+
+    if not progress or progress.kind != "session-check":
+        raise HTTPException(status_code=404, detail="Check run not found")
+
+    return progress.to_dict()
 
 
 @router.post("/import/tdata")
 async def import_tdata(
     file: UploadFile = File(...),
+    passcode: str = Form(""),
+    run_id: Optional[str] = None,
     session: AsyncSession = Depends(get_session)
 ):
-    """Import accounts from tdata zip"""
-    # TODO: Implement tdata import
-    return {"message": "tdata import not yet implemented"}
+    """Import accounts from a zip of tdata folders
+
+    Folders are decoded in a process pool, the resulting sessions are
+    upserted in batches.
+    """
+    progress = progress_registry.start("account-import", run_id=run_id)
+    importer = SessionImporter(session, progress)
+
+    try:
+        # Reads the central directory, which may be spooled to disk
+        archive = await asyncio.to_thread(zipfile.ZipFile, file.file)
+        with archive:
+            async for row in decode_archive(archive, passcode.encode(), progress):
+                await importer.add(row)
+        await importer.flush()
+    except zipfile.BadZipFile as e:
+        progress.error(file.filename or "upload", str(e))
+        progress.finish("failed")
+        raise HTTPException(status_code=400, detail=f"Invalid archive: {e}")
+
+    progress.finish()
+    return progress.to_dict()
 
 
 @router.post("/import/json")
 async def import_json(
     file: UploadFile = File(...),
+    run_id: Optional[str] = None,
     session: AsyncSession = Depends(get_session)
 ):
-    """Import accounts from JSON session"""
-    # TODO: Implement JSON session import
-    return {"message": "JSON import not yet implemented"}
+    """Import accounts from JSON sessions (zip of *.json files or JSONL)
+
+    Pass a client-generated `run_id` to poll progress while the upload
+    is being imported.
+    """
+    progress = progress_registry.start("account-import", run_id=run_id)
+
+    try:
+        await SessionImporter(session, progress).run(iter_session_files(file))
+    except zipfile.BadZipFile as e:
+        progress.error(file.filename or "upload", str(e))
+        progress.finish("failed")
+        raise HTTPException(status_code=400, detail=f"Invalid archive: {e}")
+
+    progress.finish()
+    return progress.to_dict()
+
+
+@router.get("/import/{run_id}")
+async def get_import_progress(run_id: str):
+    """Get progress of an account import"""
+    progress = progress_registry.get(run_id)
+
+    if not progress or progress.kind != "account-import":
+        raise HTTPException(status_code=404, detail="Import not found")
+
+    return progress.to_dict()
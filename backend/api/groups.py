@@ -1,12 +1,13 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 
-from database.database import get_session
-from database.models import AccountGroup
+from database.database import get_session, get_read_session
+from database.models import Account, AccountGroup
+from services.account_index import account_index
+from services.response_cache import response_cache
 
 router = APIRouter()
 
@@ -16,16 +17,34 @@ class GroupCreate(BaseModel):
     color: Optional[str] = None
 
 
+async def _count_accounts(session: AsyncSession, group_id: int) -> int:
+    query = select(func.count()).select_from(Account).where(Account.group_id == group_id)
+    return await session.scalar(query)
+
+
 @router.get("")
 async def get_groups(
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get all groups"""
-    query = select(AccountGroup).options(selectinload(AccountGroup.accounts))
-    result = await session.execute(query)
-    groups = result.scalars().all()
+    async def build():
+        counts = (
+            select(Account.group_id, func.count().label("accounts_count"))
+            .where(Account.group_id.is_not(None))
+            .group_by(Account.group_id)
+            .subquery()
+        )
+        query = (
+            select(AccountGroup, func.coalesce(counts.c.accounts_count, 0))
+            .outerjoin(counts, counts.c.group_id == AccountGroup.id)
+            .order_by(AccountGroup.id)
+        )
+        result = await session.execute(query)
+
+        return {"data": [g.to_dict(count) for g, count in result.all()]}
 
-    return {"data": [g.to_dict() for g in groups]}
+    return await response_cache.respond(request, "groups", ["account_groups", "accounts"], build)
 
 
 @router.post("")
@@ -43,7 +62,7 @@ async def create_group(
     await session.commit()
     await session.refresh(group)
 
-    return group.to_dict()
+    return group.to_dict(0)
 
 
 @router.put("/{group_id}")
@@ -67,7 +86,7 @@ async def update_group(
     await session.commit()
     await session.refresh(group)
 
-    return group.to_dict()
+    return group.to_dict(await _count_accounts(session, group.id))
 
 
 @router.delete("/{group_id}")
@@ -85,5 +104,6 @@ async def delete_group(
 
     await session.delete(group)
     await session.commit()
+    account_index.drop_group(group_id)
 
     return {"success": True}
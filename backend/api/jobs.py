@@ -0,0 +1,104 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+
+from database.database import get_read_session
+from database.models import Job, JOB_STATUSES
+from services.jobs import job_engine
+
+router = APIRouter()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class JobCreate(BaseModel):
+    kind: str
+    payload: Optional[dict] = None
+    account_id: Optional[int] = None
+    proxy_id: Optional[int] = None
+    priority: int = 0
+
+
+def _job_dict(job: Job):
+    # Active jobs are newer in memory than in the table
+    state = job_engine.get(job.id)
+    return state.to_dict() if state else job.to_dict()
+
+
+@router.get("")
+async def get_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    account_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get latest jobs with optional filters"""
+    if status and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    query = select(Job)
+    if status:
+        query = query.where(Job.status == status)
+    if kind:
+        query = query.where(Job.kind == kind)
+    if account_id is not None:
+        query = query.where(Job.account_id == account_id)
+
+    result = await session.execute(query.order_by(Job.id.desc()).limit(limit))
+
+    return {"data": [_job_dict(job) for job in result.scalars()]}
+
+
+@router.get("/stats")
+async def get_job_stats():
+    """Get queue and worker pool stats"""
+    return job_engine.stats()
+
+
+@router.post("")
+async def create_job(data: JobCreate):
+    """Queue a new job"""
+    try:
+        job = await job_engine.submit(**data.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return job.to_dict()
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get single job by ID"""
+    state = job_engine.get(job_id)
+    if state:
+        return state.to_dict()
+
+    job = await session.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.to_dict()
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Cancel a queued or running job"""
+    state = await job_engine.cancel(job_id)
+    if state:
+        return state.to_dict()
+
+    job = await session.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
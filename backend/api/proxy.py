@@ -1,18 +1,31 @@
+import asyncio
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
-from datetime import datetime
-import aiohttp
-from aiohttp_socks import ProxyConnector
 
-from database.database import get_session
-from database.models import Proxy
+from database.database import get_session, get_read_session, async_session, read_session
+from database.models import Account, Proxy, ProxyCheckRollup
+from services.progress import Progress, progress_registry
+from services.proxy_health import record_checks
+from services.proxy_import import ProxyImporter, iter_upload_lines, PROXY_TYPES
+from services.response_cache import response_cache
+from services.serializers import proxy_rows, proxy_select
+from services.proxy_checker import (
+    ProxyChecker, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, DEFAULT_BATCH_SIZE
+)
 
 router = APIRouter()
 
+# Unscored proxies sort last
+PROXY_ORDER = {
+    "id": [Proxy.id],
+    "reliability": [Proxy.reliability_score.desc().nulls_last(), Proxy.id],
+    "latency": [Proxy.latency_score.asc().nulls_last(), Proxy.id],
+}
+
 
 class ProxyCreate(BaseModel):
     type: str = "socks5"
@@ -23,36 +36,77 @@ class ProxyCreate(BaseModel):
 
 
 class ProxyBulkCreate(BaseModel):
-    proxies: List[str]  # Format: host:port or host:port:user:pass
+    proxies: List[str]  # Any format accepted by parse_proxy_line
     type: str = "socks5"
 
 
+def proxy_list_query(
+    status: Optional[str] = None,
+    min_reliability: Optional[float] = None,
+    max_latency: Optional[float] = None,
+    order_by: str = "id"
+):
+    """Query of the proxy list with its filters and order"""
+    query = proxy_select().order_by(*PROXY_ORDER[order_by])
+    if status:
+        query = query.where(Proxy.status == status)
+    if min_reliability is not None:
+        query = query.where(Proxy.reliability_score >= min_reliability)
+    if max_latency is not None:
+        query = query.where(Proxy.latency_score <= max_latency)
+    return query
+
+
+async def _count_accounts(session: AsyncSession, proxy_id: int) -> int:
+    query = select(func.count()).select_from(Account).where(Account.proxy_id == proxy_id)
+    return await session.scalar(query)
+
+
 @router.get("")
 async def get_proxies(
+    request: Request,
     status: Optional[str] = None,
-    session: AsyncSession = Depends(get_session)
+    min_reliability: Optional[float] = Query(None, ge=0, le=1),
+    max_latency: Optional[float] = Query(None, ge=0),
+    order_by: str = Query("id", pattern="^(id|reliability|latency)$"),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get all proxies"""
-    query = select(Proxy).options(selectinload(Proxy.accounts))
+    """Get all proxies, optionally filtered and sorted by health scores"""
+    async def build():
+        query = proxy_list_query(status, min_reliability, max_latency, order_by)
+        result = await session.execute(query)
+
+        return {"data": proxy_rows(result.all())}
+
+    return await response_cache.respond(request, "proxies", ["proxies", "accounts"], build)
 
-    if status:
-        query = query.where(Proxy.status == status)
 
+@router.get("/{proxy_id}/history")
+async def get_proxy_history(
+    proxy_id: int,
+    period: str = Query("hour", pattern="^(hour|day)$"),
+    limit: int = Query(48, ge=1, le=1000),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get hourly or daily check rollups of a proxy, newest first"""
+    query = (
+        select(ProxyCheckRollup)
+        .where(ProxyCheckRollup.proxy_id == proxy_id, ProxyCheckRollup.period == period)
+        .order_by(ProxyCheckRollup.bucket.desc())
+        .limit(limit)
+    )
     result = await session.execute(query)
-    proxies = result.scalars().all()
 
-    return {"data": [p.to_dict() for p in proxies]}
+    return {"data": [r.to_dict() for r in result.scalars()]}
 
 
 @router.get("/{proxy_id}")
 async def get_proxy(
     proxy_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get single proxy"""
-    query = select(Proxy).options(
-        selectinload(Proxy.accounts)
-    ).where(Proxy.id == proxy_id)
+    query = select(Proxy).where(Proxy.id == proxy_id)
 
     result = await session.execute(query)
     proxy = result.scalar_one_or_none()
@@ -60,7 +114,7 @@ async def get_proxy(
     if not proxy:
         raise HTTPException(status_code=404, detail="Proxy not found")
 
-    return proxy.to_dict()
+    return proxy.to_dict(await _count_accounts(session, proxy.id))
 
 
 @router.post("")
@@ -78,10 +132,18 @@ async def create_proxy(
     )
 
     session.add(proxy)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Proxy already exists")
     await session.refresh(proxy)
 
-    return proxy.to_dict()
+    return proxy.to_dict(0)
+
+
+def _check_type(proxy_type: str):
+    if proxy_type not in PROXY_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported proxy type: {proxy_type}")
 
 
 @router.post("/bulk")
@@ -90,27 +152,23 @@ async def create_proxies_bulk(
     session: AsyncSession = Depends(get_session)
 ):
     """Create multiple proxies at once"""
-    created = []
-
-    for line in data.proxies:
-        parts = line.strip().split(":")
-        if len(parts) < 2:
-            continue
-
-        proxy = Proxy(
-            type=data.type,
-            host=parts[0],
-            port=int(parts[1]),
-            username=parts[2] if len(parts) > 2 else None,
-            password=parts[3] if len(parts) > 3 else None
-        )
+    _check_type(data.type)
+    return await ProxyImporter(session, data.type).run(data.proxies)
 
-        session.add(proxy)
-        created.append(proxy)
 
-    await session.commit()
+@router.post("/import")
+async def import_proxies(
+    file: UploadFile = File(...),
+    type: str = Query("socks5"),
+    session: AsyncSession = Depends(get_session)
+):
+    """Import proxies from a text file, one proxy per line
 
-    return {"created": len(created)}
+    The file is parsed as it is read and inserted in batches, so memory
+    use does not grow with the file size.
+    """
+    _check_type(type)
+    return await ProxyImporter(session, type).run(iter_upload_lines(file))
 
 
 @router.put("/{proxy_id}")
@@ -133,10 +191,13 @@ async def update_proxy(
     proxy.username = data.username
     proxy.password = data.password
 
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Proxy already exists")
     await session.refresh(proxy)
 
-    return proxy.to_dict()
+    return proxy.to_dict(await _count_accounts(session, proxy.id))
 
 
 @router.delete("/{proxy_id}")
@@ -161,7 +222,8 @@ async def delete_proxy(
 @router.post("/{proxy_id}/check")
 async def check_proxy(
     proxy_id: int,
-    session: AsyncSession = Depends(get_session)
+    timeout: float = Query(DEFAULT_TIMEOUT, gt=0, le=60),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Check if proxy is working"""
     query = select(Proxy).where(Proxy.id == proxy_id)
@@ -171,55 +233,61 @@ async def check_proxy(
     if not proxy:
         raise HTTPException(status_code=404, detail="Proxy not found")
 
-    try:
-        # Build proxy URL
-        auth = f"{proxy.username}:{proxy.password}@" if proxy.username else ""
-        proxy_url = f"{proxy.type}://{auth}{proxy.host}:{proxy.port}"
+    # Don't hold the writer connection while waiting on the network
+    check = await ProxyChecker(timeout=timeout).check(proxy)
 
-        connector = ProxyConnector.from_url(proxy_url)
+    async with async_session() as write:
+        await record_checks(write, [check])
+        await write.commit()
 
-        async with aiohttp.ClientSession(connector=connector) as client:
-            async with client.get("https://api.ipify.org?format=json", timeout=10) as resp:
-                if resp.status == 200:
-                    proxy.status = "valid"
-                else:
-                    proxy.status = "invalid"
+    return {"status": check.status, "latency_ms": check.latency_ms, "error": check.error}
 
-    except Exception as e:
-        proxy.status = "invalid"
 
-    proxy.last_checked_at = datetime.utcnow()
-    await session.commit()
+# Keep references to running checks so they are not garbage collected
+_check_tasks = set()
+
 
-    return {"status": proxy.status}
+async def _run_check_all(checker: ProxyChecker, progress: Progress):
+    try:
+        async with read_session() as session:
+            result = await session.execute(select(Proxy))
+            proxies = result.scalars().all()
+
+        progress.total = len(proxies)
+        await checker.run(proxies, progress)
+        progress.finish()
+    except Exception as e:
+        progress.error("check-all", str(e))
+        progress.finish("failed")
 
 
 @router.post("/check-all")
 async def check_all_proxies(
-    session: AsyncSession = Depends(get_session)
+    concurrency: int = Query(DEFAULT_CONCURRENCY, ge=1, le=1000),
+    timeout: float = Query(DEFAULT_TIMEOUT, gt=0, le=60),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=5000),
+    wait: bool = False
 ):
-    """Check all proxies"""
-    query = select(Proxy)
-    result = await session.execute(query)
-    proxies = result.scalars().all()
+    """Check all proxies in the background, poll progress by run id"""
+    checker = ProxyChecker(concurrency=concurrency, timeout=timeout, batch_size=batch_size)
+    progress = progress_registry.start("proxy-check")
 
-    # TODO: Run checks in parallel
-    checked = 0
-    for proxy in proxies:
-        try:
-            auth = f"{proxy.username}:{proxy.password}@" if proxy.username else ""
-            proxy_url = f"{proxy.type}://{auth}{proxy.host}:{proxy.port}"
-            connector = ProxyConnector.from_url(proxy_url)
+    task = asyncio.create_task(_run_check_all(checker, progress))
+    _check_tasks.add(task)
+    task.add_done_callback(_check_tasks.discard)
 
-            async with aiohttp.ClientSession(connector=connector) as client:
-                async with client.get("https://api.ipify.org", timeout=10) as resp:
-                    proxy.status = "valid" if resp.status == 200 else "invalid"
-        except:
-            proxy.status = "invalid"
+    if wait:
+        await task
 
-        proxy.last_checked_at = datetime.utcnow()
-        checked += 1
+    return progress.to_dict()
 
-    await session.commit()
 
-    return {"checked": checked}
+@router.get("/check-all/{run_id}")
+async def get_check_progress(run_id: str):
+    """Get progress of a check-all run"""
+    progress = progress_registry.get(run_id)
+
+    if not progress or progress.kind != "proxy-check":
+        raise HTTPException(status_code=404, detail="Check run not found")
+
+    return progress.to_dict()
@@ -0,0 +1,208 @@
+import random
+import re
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field, field_validator
+
+from database.database import get_read_session
+from database.models import Account, ReactionAction, ReactionCampaign, CAMPAIGN_STATUSES, ACTION_STATUSES
+from services.account_selection import AccountFilter, account_filters, chunks
+from services.reactions import reaction_engine
+
+router = APIRouter()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_POSTS = 1000
+
+
+class CampaignCreate(BaseModel):
+    name: Optional[str] = None
+    channel: str  # @username or t.me link
+    post_ids: List[int] = Field(min_length=1, max_length=MAX_POSTS)
+    reactions: List[str] = Field(min_length=1)
+    count: int = Field(ge=1)  # reactions per post
+    min_delay: float = Field(0.0, ge=0)
+    max_delay: float = Field(0.0, ge=0)
+    # Select accounts either by id or by filter, valid accounts by default
+    account_ids: Optional[List[int]] = None
+    filter: Optional[AccountFilter] = None
+    exclude_ids: List[int] = []
+    random_limit: Optional[int] = Field(None, ge=1)  # use N random accounts of the selection
+
+    @field_validator("channel")
+    @classmethod
+    def channel_username(cls, value: str) -> str:
+        match = re.fullmatch(r"\s*(?:(?:https?://)?t\.me/|@)?(\w{4,32})/?\s*", value)
+        if not match:
+            raise ValueError("Expected a channel username or t.me link")
+        return match.group(1)
+
+
+def _campaign_dict(campaign: ReactionCampaign):
+    # Active campaigns are newer in memory than in the table
+    data = campaign.to_dict()
+    state = reaction_engine.get(campaign.id)
+    if state:
+        data.update(state.to_dict())
+    return data
+
+
+async def _select_accounts(data: CampaignCreate, session: AsyncSession):
+    """(account_id, proxy_id) of the selected accounts"""
+    if data.account_ids is not None:
+        ids = list(dict.fromkeys(data.account_ids))
+        selections = [[Account.id.in_(chunk)] for chunk in chunks(ids)]
+    else:
+        status_filter = data.filter or AccountFilter(status="valid")
+        selections = [account_filters(**status_filter.model_dump())]
+
+    excluded = set(data.exclude_ids)
+    accounts = []
+    for conditions in selections:
+        result = await session.execute(select(Account.id, Account.proxy_id).where(*conditions))
+        accounts.extend(tuple(row) for row in result.all() if row[0] not in excluded)
+
+    if data.random_limit is not None and data.random_limit < len(accounts):
+        accounts = random.sample(accounts, data.random_limit)
+    return accounts
+
+
+@router.get("/campaigns")
+async def get_campaigns(
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get latest reaction campaigns"""
+    if status and status not in CAMPAIGN_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    query = select(ReactionCampaign)
+    if status:
+        query = query.where(ReactionCampaign.status == status)
+
+    result = await session.execute(query.order_by(ReactionCampaign.id.desc()).limit(limit))
+
+    return {"data": [_campaign_dict(campaign) for campaign in result.scalars()]}
+
+
+@router.get("/stats")
+async def get_reaction_stats():
+    """Get dispatcher stats"""
+    return reaction_engine.stats()
+
+
+@router.post("/campaigns")
+async def create_campaign(
+    data: CampaignCreate,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Plan a reaction campaign and start it
+
+    Every reaction is planned up front: each post gets `count` random
+    accounts of the selection, spaced by random delays between
+    `min_delay` and `max_delay` seconds.
+    """
+    if data.max_delay < data.min_delay:
+        raise HTTPException(status_code=400, detail="max_delay is below min_delay")
+
+    accounts = await _select_accounts(data, session)
+    if not accounts:
+        raise HTTPException(status_code=400, detail="No accounts selected")
+
+    state = await reaction_engine.create(
+        channel=data.channel,
+        post_ids=list(dict.fromkeys(data.post_ids)),
+        reactions=data.reactions,
+        accounts=accounts,
+        count=data.count,
+        min_delay=data.min_delay,
+        max_delay=data.max_delay,
+        name=data.name
+    )
+
+    return state.to_dict()
+
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(
+    campaign_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get campaign settings and progress"""
+    campaign = await session.get(ReactionCampaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    return _campaign_dict(campaign)
+
+
+@router.get("/campaigns/{campaign_id}/actions")
+async def get_campaign_actions(
+    campaign_id: int,
+    status: Optional[str] = None,
+    after_id: int = 0,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Get planned and executed reactions of a campaign, paged by id"""
+    if status and status not in ACTION_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    query = select(ReactionAction).where(ReactionAction.campaign_id == campaign_id, ReactionAction.id > after_id)
+    if status:
+        query = query.where(ReactionAction.status == status)
+
+    result = await session.execute(query.order_by(ReactionAction.id).limit(limit))
+
+    return {"data": [action.to_dict() for action in result.scalars()]}
+
+
+async def _campaign_conflict(campaign_id: int, session: AsyncSession):
+    campaign = await session.get(ReactionCampaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    raise HTTPException(status_code=409, detail=f"Campaign is {_campaign_dict(campaign)['status']}")
+
+
+@router.post("/campaigns/{campaign_id}/pause")
+async def pause_campaign(
+    campaign_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Pause a running campaign"""
+    state = await reaction_engine.pause(campaign_id)
+    if state:
+        return state.to_dict()
+
+    await _campaign_conflict(campaign_id, session)
+
+
+@router.post("/campaigns/{campaign_id}/resume")
+async def resume_campaign(
+    campaign_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Resume a paused campaign, remaining reactions move by the pause"""
+    state = await reaction_engine.resume(campaign_id)
+    if state:
+        return state.to_dict()
+
+    await _campaign_conflict(campaign_id, session)
+
+
+@router.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(
+    campaign_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Cancel a running or paused campaign"""
+    state = await reaction_engine.cancel(campaign_id)
+    if state:
+        return state.to_dict()
+
+    await _campaign_conflict(campaign_id, session)
@@ -1,13 +1,27 @@
-from fastapi import APIRouter
+from fastapi import FastAPI
 
 from api.accounts import router as accounts_router
 from api.proxy import router as proxy_router
 from api.groups import router as groups_router
 from api.tags import router as tags_router
+from api.jobs import router as jobs_router
+from api.reactions import router as reactions_router
 
-api_router = APIRouter()
+API_ROUTERS = [
+    (accounts_router, "/accounts", ["accounts"]),
+    (proxy_router, "/proxy", ["proxy"]),
+    (groups_router, "/groups", ["groups"]),
+    (tags_router, "/tags", ["tags"]),
+    (jobs_router, "/jobs", ["jobs"]),
+    (reactions_router, "/reactions", ["reactions"]),
+]
 
-api_router.include_router(accounts_router, prefix="/accounts", tags=["accounts"])
-api_router.include_router(proxy_router, prefix="/proxy", tags=["proxy"])
-api_router.include_router(groups_router, prefix="/groups", tags=["groups"])
-api_router.include_router(tags_router, prefix="/tags", tags=["tags"])
+
+def include_api(app: FastAPI, prefix: str = "/api"):
+    """Include the API routers into the app
+
+    include_router rebuilds every route it copies, so the routers go into
+    the app directly instead of through an intermediate router.
+    """
+    for router, path, tags in API_ROUTERS:
+        app.include_router(router, prefix=prefix + path, tags=tags)
@@ -1,11 +1,13 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from database.database import get_session
+from database.database import get_session, get_read_session
 from database.models import AccountTag
+from services.account_index import account_index
+from services.response_cache import response_cache
 
 router = APIRouter()
 
@@ -17,14 +19,18 @@ class TagCreate(BaseModel):
 
 @router.get("")
 async def get_tags(
-    session: AsyncSession = Depends(get_session)
+    request: Request,
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get all tags"""
-    query = select(AccountTag)
-    result = await session.execute(query)
-    tags = result.scalars().all()
+    async def build():
+        query = select(AccountTag)
+        result = await session.execute(query)
+        tags = result.scalars().all()
+
+        return {"data": [t.to_dict() for t in tags]}
 
-    return {"data": [t.to_dict() for t in tags]}
+    return await response_cache.respond(request, "tags", ["tags"], build)
 
 
 @router.post("")
@@ -83,5 +89,6 @@ async def delete_tag(
 
     await session.delete(tag)
     await session.commit()
+    account_index.drop_tag(tag_id)
 
     return {"success": True}
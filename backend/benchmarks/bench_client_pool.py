@@ -0,0 +1,115 @@
+"""Pooled vs per-operation client connections against a local stub server
+
+The stub server answers every line after a fixed delay, standing in for
+a Telegram DC. FakeClient needs `--handshake` round trips to connect and
+one per operation, like a Telethon client doing auth key checks before
+its first request.
+
+    cd backend && python -m benchmarks.bench_client_pool --accounts 200 --ops 5000 --rtt 0.02
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from services.client_pool import ClientPool
+
+
+async def start_stub_server(rtt: float):
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                await asyncio.sleep(rtt)
+                writer.write(line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class FakeClient:
+    """Stands in for TelegramClient with the methods the pool uses"""
+
+    def __init__(self, port: int, handshake: int):
+        self.port = port
+        self.handshake = handshake
+        self.reader = self.writer = None
+        # Telethon multiplexes requests on one connection, this stub
+        # connection answers them in turn
+        self.lock = asyncio.Lock()
+
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        for _ in range(self.handshake):
+            await self.call()
+
+    async def call(self):
+        async with self.lock:
+            self.writer.write(b"ping\n")
+            await self.writer.drain()
+            await self.reader.readline()
+
+    async def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+
+async def run(label, ops, concurrency, operate):
+    queue = list(ops)
+    started = time.perf_counter()
+
+    async def worker():
+        while queue:
+            await operate(queue.pop())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10}: {len(ops) / elapsed:8.1f} ops/s ({elapsed:.2f}s)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-open", type=int, default=250)
+    parser.add_argument("--handshake", type=int, default=3, help="round trips to connect")
+    parser.add_argument("--rtt", type=float, default=0.02, help="stub server delay per round trip")
+    args = parser.parse_args()
+
+    server, port = await start_stub_server(args.rtt)
+    ops = [random.randint(1, args.accounts) for _ in range(args.ops)]
+
+    async def fresh(account_id):
+        client = FakeClient(port, args.handshake)
+        await client.connect()
+        await client.call()
+        await client.disconnect()
+
+    pool = ClientPool(lambda session, proxy: FakeClient(port, args.handshake), max_open=args.max_open)
+    pool.start()
+
+    async def pooled(account_id):
+        async with pool.client(account_id, f"session-{account_id}") as client:
+            await client.call()
+
+    await run("fresh", ops, args.concurrency, fresh)
+    await run("pooled", ops, args.concurrency, pooled)
+    print(f"pool stats: {pool.stats}, open {pool.open_count}/{args.max_open}")
+
+    await pool.close()
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""Throughput of the job engine with a fake executor
+
+Queues jobs spread over accounts and proxies, runs them with an executor
+that only sleeps, and reports submit and completion rates together with
+the highest concurrency seen per account and per proxy.
+
+    cd backend && python -m benchmarks.bench_jobs --jobs 20000 --proxies 50 --workers 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import func, select
+
+from database.database import init_db, close_db, async_session
+from database.models import Job
+from services.jobs import JobEngine
+
+
+class FakeExecutor:
+    """Sleeps for each job and records concurrency per account and proxy"""
+
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.running = Counter()
+        self.peak = Counter()
+
+    async def __call__(self, job):
+        keys = [("account", job.account_id), ("proxy", job.proxy_id)]
+        for key in keys:
+            self.running[key] += 1
+            self.peak[key] = max(self.peak[key], self.running[key])
+        try:
+            await asyncio.sleep(self.duration * random.uniform(0.5, 1.5))
+        finally:
+            for key in keys:
+                self.running[key] -= 1
+        return {"ok": True}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--accounts", type=int, default=2000)
+    parser.add_argument("--proxies", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--account-limit", type=int, default=1)
+    parser.add_argument("--proxy-limit", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=0.01, help="mean seconds per fake job")
+    args = parser.parse_args()
+
+    await init_db()
+    executor = FakeExecutor(args.duration)
+    engine = JobEngine(
+        executor=executor,
+        workers=args.workers,
+        account_limit=args.account_limit,
+        proxy_limit=args.proxy_limit
+    )
+    await engine.start()
+
+    specs = []
+    for i in range(args.jobs):
+        account_id = random.randint(1, args.accounts)
+        specs.append({
+            "kind": "bench",
+            "account_id": account_id,
+            "proxy_id": account_id % args.proxies + 1,
+            "priority": random.randint(0, 3)
+        })
+
+    started = time.perf_counter()
+    for i in range(0, len(specs), 1000):
+        await engine.submit_many(specs[i:i + 1000])
+    submitted = time.perf_counter() - started
+    print(f"submitted {args.jobs} jobs in {submitted:.2f}s ({args.jobs / submitted:,.0f} jobs/s)")
+
+    while any(engine.stats()[s] for s in ("queued", "running")):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await engine.stop()
+
+    # Upper bound set by the proxy caps and by the worker pool
+    bound = min(args.workers, args.proxies * args.proxy_limit) / args.duration
+    print(f"completed in {elapsed:.2f}s: {args.jobs / elapsed:,.0f} jobs/s (bound ~{bound:,.0f} jobs/s)")
+
+    peak_account = max(v for (scope, _), v in executor.peak.items() if scope == "account")
+    peak_proxy = max(v for (scope, _), v in executor.peak.items() if scope == "proxy")
+    print(f"peak concurrency: {peak_account} per account (cap {args.account_limit}), "
+          f"{peak_proxy} per proxy (cap {args.proxy_limit})")
+
+    async with async_session() as session:
+        result = await session.execute(select(Job.status, func.count()).group_by(Job.status))
+        print("persisted:", dict(result.all()))
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,247 @@
+"""Reaction campaign dispatch with a fake Telegram client
+
+Seeds accounts spread over proxies and runs one campaign in which every
+account reacts to every post, with a fake reactor that sleeps and hits
+flood waits at a given rate. Reports planning time, dispatch lag behind
+the planned fire times, throughput, peak tasks and memory, and checks
+that no account or proxy went under its interval. The campaign is paused
+halfway and nothing may fire until it is resumed.
+
+`--naive` runs the same plan as one sleeping coroutine per reaction,
+without rate limits, for comparison.
+
+    cd backend && python -m benchmarks.bench_reactions --accounts 10000 --posts 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import func, insert, select
+
+from database.database import init_db, close_db, async_session
+from database.models import Account, Proxy, ReactionAction
+from services.reactions import ReactionEngine, TransientReactionError, plan_actions
+from services.status_writer import status_writer
+
+REACTIONS = ["👍", "❤", "🔥", "👏"]
+
+
+class RecordingEngine(ReactionEngine):
+    """Records the dispatch time of each action, the clock the limits are kept on"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dispatched = []  # (time, action)
+
+    def _route(self, action_id, now, released=None):
+        running = len(self._tasks)
+        super()._route(action_id, now, released)
+        if len(self._tasks) > running:
+            self.dispatched.append((now, self._actions[action_id]))
+
+
+class FakeReactor:
+    """Sleeps like a request and fails with flood waits at a given rate"""
+
+    def __init__(self, latency: float, flood_rate: float, flood_wait: float):
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.flood_wait = flood_wait
+        self.engine = None
+        self.lags = []
+        self.fired = []  # (time, action), when the reaction started
+        self.floods = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def __call__(self, action, channel):
+        now = time.time()
+        campaign = self.engine.get(action.campaign_id) if self.engine else None
+        if action.attempts == 1:
+            self.lags.append(now - action.fire_at - (campaign.shift if campaign else 0.0))
+        self.fired.append((now, action))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+            if random.random() < self.flood_rate:
+                self.floods += 1
+                raise TransientReactionError("flood wait", retry_after=self.flood_wait)
+        finally:
+            self.in_flight -= 1
+
+
+async def seed(accounts: int, proxies: int):
+    async with async_session() as session:
+        await session.execute(insert(Proxy), [
+            {"type": "socks5", "host": f"10.0.{i // 250}.{i % 250}", "port": 1080} for i in range(proxies)
+        ])
+        await session.execute(insert(Account), [
+            {"phone": f"+7900{i:07d}", "status": "valid", "proxy_id": i % proxies + 1 if proxies else None}
+            for i in range(accounts)
+        ])
+        await session.commit()
+        result = await session.execute(select(Account.id, Account.proxy_id))
+        return [tuple(row) for row in result.all()]
+
+
+def min_gap(fired, key) -> float:
+    """Shortest time between two reactions with the same key"""
+    last, gap = {}, float("inf")
+    for at, action in sorted(fired, key=lambda f: f[0]):
+        k = key(action)
+        if k is None:
+            continue
+        if k in last:
+            gap = min(gap, at - last[k])
+        last[k] = at
+    return gap
+
+
+def percentiles(values) -> str:
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100)
+    return f"p50 {cuts[49] * 1000:.0f} ms, p95 {cuts[94] * 1000:.0f} ms, p99 {cuts[98] * 1000:.0f} ms"
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def watch_tasks(peak: list):
+    while True:
+        peak[0] = max(peak[0], len(asyncio.all_tasks()))
+        await asyncio.sleep(0.05)
+
+
+async def run_engine(args, accounts, reactor: FakeReactor):
+    engine = RecordingEngine(
+        reactor=reactor,
+        concurrency=args.concurrency,
+        account_interval=args.account_interval,
+        proxy_interval=args.proxy_interval,
+        jitter=args.jitter,
+        backoff=0.05,
+        flush_interval=0.2
+    )
+    reactor.engine = engine
+    status_writer.start()
+    engine.start()
+
+    started = time.perf_counter()
+    campaign = await engine.create(
+        "benchchannel", list(range(1, args.posts + 1)), REACTIONS, accounts,
+        count=len(accounts), min_delay=0.0, max_delay=args.max_delay
+    )
+    planned = time.perf_counter() - started
+    print(f"planned and stored {campaign.total:,} reactions in {planned:.2f}s "
+          f"({campaign.total / planned:,.0f}/s)")
+
+    dispatched = time.perf_counter()
+    paused = None
+    while campaign.status in ("running", "paused"):
+        await asyncio.sleep(0.02)
+        if paused is None and campaign.done + campaign.failed >= campaign.total // 2:
+            await engine.pause(campaign.id)
+            paused_at = time.time()
+            await asyncio.sleep(args.pause)
+            # Reactions started before the pause may still be sleeping
+            late = sum(1 for at, action in engine.dispatched if at > paused_at)
+            await engine.resume(campaign.id)
+            paused = late
+    elapsed = time.perf_counter() - dispatched
+    await engine.stop()
+    await status_writer.stop()
+
+    print(f"dispatched in {elapsed:.2f}s incl. {args.pause:.1f}s paused: "
+          f"{campaign.total / (elapsed - args.pause):,.0f} reactions/s")
+    print(f"done {campaign.done:,}, failed {campaign.failed:,}, flood waits {reactor.floods:,}, "
+          f"deferred by limits {engine.counters['deferred']:,}, retried {engine.counters['retried']:,}")
+    print(f"lag behind plan: {percentiles(reactor.lags)}")
+    print(f"dispatched while paused: {paused}")
+
+    account_gap = min_gap(engine.dispatched, lambda a: a.account_id)
+    proxy_gap = min_gap(engine.dispatched, lambda a: a.proxy_id)
+    print(f"min gap per account {account_gap:.3f}s (limit {args.account_interval}s), "
+          f"per proxy {proxy_gap:.4f}s (limit {args.proxy_interval}s)")
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(ReactionAction.status, func.count())
+            .where(ReactionAction.campaign_id == campaign.id).group_by(ReactionAction.status)
+        )
+        print("stored statuses:", dict(result.all()))
+
+
+async def run_naive(args, accounts, reactor: FakeReactor):
+    """One coroutine per reaction sleeping until its fire time, no limits"""
+    planned = plan_actions(
+        list(range(1, args.posts + 1)), accounts, REACTIONS, len(accounts), 0.0, args.max_delay, time.time()
+    )
+
+    class Action:
+        __slots__ = ("campaign_id", "account_id", "proxy_id", "fire_at", "attempts")
+
+    async def react(account_id, proxy_id, fire_at):
+        await asyncio.sleep(fire_at - time.time())
+        action = Action()
+        action.campaign_id, action.account_id, action.proxy_id = 0, account_id, proxy_id
+        action.fire_at, action.attempts = fire_at, 1
+        try:
+            await reactor(action, "benchchannel")
+        except TransientReactionError:
+            await asyncio.sleep(reactor.flood_wait)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(react(a, p, at) for a, p, _, _, at in planned))
+    elapsed = time.perf_counter() - started
+    print(f"naive: {len(planned):,} reactions in {elapsed:.2f}s, lag behind plan: {percentiles(reactor.lags)}")
+    print(f"naive: min gap per account {min_gap(reactor.fired, lambda a: a.account_id):.3f}s, "
+          f"per proxy {min_gap(reactor.fired, lambda a: a.proxy_id):.4f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--proxies", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--max-delay", type=float, default=0.004, help="max seconds between reactions on a post")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--account-interval", type=float, default=1.0)
+    parser.add_argument("--proxy-interval", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per fake reaction")
+    parser.add_argument("--flood-rate", type=float, default=0.01)
+    parser.add_argument("--flood-wait", type=float, default=0.5)
+    parser.add_argument("--pause", type=float, default=1.0, help="seconds the campaign is paused halfway")
+    parser.add_argument("--naive", action="store_true", help="one sleeping coroutine per reaction instead")
+    args = parser.parse_args()
+
+    await init_db()
+    accounts = await seed(args.accounts, args.proxies)
+    reactor = FakeReactor(args.latency, args.flood_rate, args.flood_wait)
+    rss_before = peak_rss_mb()
+    peak_tasks = [0]
+    watcher = asyncio.create_task(watch_tasks(peak_tasks))
+
+    if args.naive:
+        await run_naive(args, accounts, reactor)
+    else:
+        await run_engine(args, accounts, reactor)
+
+    watcher.cancel()
+    print(f"peak asyncio tasks {peak_tasks[0]:,}, peak reactions in flight {reactor.peak_in_flight:,}, "
+          f"peak RSS {peak_rss_mb():.0f} MB (+{peak_rss_mb() - rss_before:.0f} MB)")
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
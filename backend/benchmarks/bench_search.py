@@ -0,0 +1,100 @@
+"""Account search latency through the FTS index
+
+Seeds accounts with generated usernames, phones and names, then times
+first pages of the account list for a set of searches, alone and with
+filters, with the response cache cleared before every request.
+
+    cd backend && python -m benchmarks.bench_search --accounts 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from urllib.parse import urlencode
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import insert
+from starlette.requests import Request
+
+from api.accounts import get_accounts
+from database.database import init_db, close_db, async_session, read_session
+from database.models import Account, AccountGroup
+from services.account_index import account_index
+from services.response_cache import response_cache
+
+FIRST_NAMES = ["Ivan", "Anna", "Oleg", "Maria", "Dmitry", "Elena", "Sergey", "Olga", "Alexei", "Irina"]
+LAST_NAMES = ["Petrov", "Ivanova", "Smirnov", "Kuznetsova", "Popov", "Volkova", "Sokolov", "Novikova"]
+STATUSES = ["valid"] * 6 + ["banned", "spamblock", "unchecked", "session_expired"]
+
+SEARCHES = [
+    {"q": "7900123"},
+    {"q": "+7 900 55"},
+    {"q": "user4242"},
+    {"q": "ivan"},
+    {"q": "anna ivanova"},
+    {"q": "u"},
+    {"q": "ivan", "status": "banned"},
+    {"q": "petrov", "group_id": 3},
+    {"q": "ivan", "order_by": "last_checked_at"},
+    {"q": "nomatch"},
+]
+
+
+async def seed(accounts: int, groups: int):
+    async with async_session() as session:
+        await session.execute(insert(AccountGroup), [{"name": f"group {i}"} for i in range(groups)])
+        await session.execute(insert(Account), [
+            {"phone": f"+7900{random.randrange(10 ** 7):07d}", "username": f"user{i}",
+             "first_name": random.choice(FIRST_NAMES), "last_name": random.choice(LAST_NAMES),
+             "status": random.choice(STATUSES), "group_id": random.randint(1, groups)}
+            for i in range(accounts)
+        ])
+        await session.commit()
+
+
+async def search(params: dict) -> float:
+    params = {"limit": 100, **params}
+    request = Request({"type": "http", "method": "GET", "headers": [], "query_string": urlencode(params).encode()})
+    response_cache.clear()
+    started = time.perf_counter()
+    async with read_session() as session:
+        await get_accounts(
+            request,
+            status=params.get("status"),
+            group_id=params.get("group_id"),
+            tag_id=None,
+            limit=params["limit"],
+            cursor=None,
+            order_by=params.get("order_by", "id"),
+            fields=None,
+            q=params["q"],
+            session=session
+        )
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    await init_db()
+    await seed(args.accounts, args.groups)
+    async with read_session() as session:
+        await account_index.build(session)
+
+    for params in SEARCHES:
+        await search(params)  # warm up
+        best = min([await search(params) for _ in range(args.rounds)])
+        print(f"{best * 1000:7.2f} ms  {params}")
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
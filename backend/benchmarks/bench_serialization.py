@@ -0,0 +1,111 @@
+"""Account list serialization: ORM to_dict vs column selects with side tables
+
+Seeds accounts spread over proxies, groups and tags, then builds the
+same pages both ways, from the query to the response bytes: ORM objects
+with eager loaded relationships through to_dict, jsonable_encoder and
+JSONResponse, and row tuples through services.serializers and
+ORJSONResponse. Reports time, peak traced memory and body size per page.
+
+    cd backend && python -m benchmarks.bench_serialization --accounts 10000 --page 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from database.database import init_db, close_db, async_session, read_session
+from database.models import Account, AccountGroup, AccountTag, Proxy, account_tags
+from services.serializers import ACCOUNT_COLUMNS, account_page
+
+
+async def seed(accounts: int, proxies: int, groups: int, tags: int):
+    async with async_session() as session:
+        await session.execute(insert(Proxy), [
+            {"type": "socks5", "host": f"10.0.{i // 250}.{i % 250}", "port": 1080, "status": "valid",
+             "latency_ms": random.randint(50, 900)}
+            for i in range(proxies)
+        ])
+        await session.execute(insert(AccountGroup), [{"name": f"group {i}"} for i in range(groups)])
+        await session.execute(insert(AccountTag), [{"name": f"tag {i}"} for i in range(tags)])
+        await session.execute(insert(Account), [
+            {"phone": f"+7900{i:07d}", "username": f"user{i}", "first_name": "Ivan", "status": "valid",
+             "proxy_id": i % proxies + 1, "group_id": i % groups + 1}
+            for i in range(accounts)
+        ])
+        await session.execute(insert(account_tags), [
+            {"account_id": i + 1, "tag_id": tag_id}
+            for i in range(accounts)
+            for tag_id in random.sample(range(1, tags + 1), 2)
+        ])
+        await session.commit()
+
+
+async def orm_page(limit: int) -> bytes:
+    async with read_session() as session:
+        result = await session.execute(
+            select(Account).options(
+                selectinload(Account.proxy),
+                selectinload(Account.group),
+                selectinload(Account.tags)
+            ).order_by(Account.id).limit(limit)
+        )
+        data = {"data": [acc.to_dict() for acc in result.scalars()]}
+    return JSONResponse(jsonable_encoder(data)).body
+
+
+async def row_page(limit: int) -> bytes:
+    async with read_session() as session:
+        result = await session.execute(select(*ACCOUNT_COLUMNS).order_by(Account.id).limit(limit))
+        data = await account_page(session, result.all())
+    return ORJSONResponse(data).body
+
+
+async def measure(label, build, limit, rounds):
+    await build(limit)  # warm up statement caches
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = await build(limit)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    await build(limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(times)
+    print(f"{label:>6}: {best * 1000:8.1f} ms/page, {best * 10000 / limit * 1000:8.1f} ms/10k rows, "
+          f"peak {peak / 2 ** 20:6.1f} MB, body {len(body) / 2 ** 20:5.2f} MB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--page", type=int, default=10000)
+    parser.add_argument("--proxies", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    await init_db()
+    await seed(args.accounts, args.proxies, args.groups, args.tags)
+
+    await measure("orm", orm_page, args.page, args.rounds)
+    await measure("rows", row_page, args.page, args.rounds)
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
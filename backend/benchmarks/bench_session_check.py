@@ -0,0 +1,94 @@
+"""Throughput of the session validation pipeline with a fake checker
+
+Seeds accounts spread over proxies and validates all of them with a
+checker that sleeps, returns random statuses and fails transiently at a
+given rate. Reports accounts/s, retries and the resulting statuses.
+
+    cd backend && python -m benchmarks.bench_session_check --accounts 10000 --proxies 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import func, insert, select
+
+from database.database import init_db, close_db, async_session
+from database.models import Account, Proxy
+from services.progress import Progress
+from services.session_checker import SessionValidator, TransientCheckError
+from services.status_writer import status_writer
+
+OUTCOMES = ["valid"] * 80 + ["banned"] * 8 + ["spamblock"] * 6 + ["session_expired"] * 6
+
+
+def fake_checker(latency: float, transient_rate: float):
+    async def check(target):
+        await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        if random.random() < transient_rate:
+            raise TransientCheckError("connection reset")
+        return {"status": random.choice(OUTCOMES), "username": f"user{target.id}"}
+    return check
+
+
+async def seed(accounts: int, proxies: int):
+    async with async_session() as session:
+        await session.execute(insert(Proxy), [
+            {"type": "socks5", "host": f"10.0.{i // 250}.{i % 250}", "port": 1080} for i in range(proxies)
+        ])
+        await session.execute(insert(Account), [
+            {"phone": f"+7900{i:07d}", "status": "unchecked",
+             "proxy_id": i % proxies + 1 if proxies else None}
+            for i in range(accounts)
+        ])
+        await session.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--proxies", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--proxy-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per fake check")
+    parser.add_argument("--transient-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    await init_db()
+    await seed(args.accounts, args.proxies)
+
+    validator = SessionValidator(
+        checker=fake_checker(args.latency, args.transient_rate),
+        concurrency=args.concurrency,
+        proxy_concurrency=args.proxy_concurrency,
+        backoff=0.05
+    )
+    progress = Progress(kind="bench")
+    status_writer.start()
+
+    started = time.perf_counter()
+    targets = await validator.mark_checking([[]])
+    marked = time.perf_counter() - started
+    await validator.run(targets, progress)
+    elapsed = time.perf_counter() - started
+
+    slots = min(args.concurrency, args.proxies * args.proxy_concurrency)
+    print(f"marked {len(targets)} accounts checking in {marked:.2f}s")
+    print(f"checked in {elapsed:.2f}s: {len(targets) / elapsed:,.0f} accounts/s "
+          f"(bound ~{slots / args.latency:,.0f} accounts/s)")
+    print(f"retries {progress.counters.get('retries', 0)}, failed {progress.counters.get('failed', 0)}")
+
+    async with async_session() as session:
+        result = await session.execute(select(Account.status, func.count()).group_by(Account.status))
+        print("statuses:", dict(result.all()))
+
+    await status_writer.stop()
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
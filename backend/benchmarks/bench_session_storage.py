@@ -0,0 +1,124 @@
+"""Account listing scans with session strings inline vs in account_sessions
+
+Seeds the synthetic dataset, then copies the accounts rows in id order
+into two tables keyed on id, without and with the session string
+inline, so both are laid out like freshly written tables. Runs the same
+listing queries on both and reports the warm time and the pages read
+from the file with a cold page cache and mmap off, counted from
+/proc/self/io.
+
+    cd backend && python -m benchmarks.bench_session_storage --accounts 100000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from benchmarks.synthetic import Dataset, populate
+from database.database import init_db, close_db, DB_PATH
+
+IO_STATS = Path("/proc/self/io")
+COLUMNS = "id, telegram_id, username, phone, first_name, last_name, status, proxy_id, group_id, last_checked_at, last_used_at, created_at"
+
+QUERIES = {
+    "page of 100 by id": f"SELECT {COLUMNS} FROM {{table}} WHERE id > 50000 ORDER BY id LIMIT 100",
+    "fields export": "SELECT id, phone, username, status FROM {table}",
+    "unindexed filter": f"SELECT {COLUMNS} FROM {{table}} WHERE first_name = 'Ivan' AND last_name = 'Petrov'",
+    "count by status": "SELECT status, count(*) FROM {table} GROUP BY status",
+    "full rows, 1000 ids": "SELECT * FROM {table} WHERE id <= 1000",
+}
+
+
+def setup(path: Path):
+    conn = sqlite3.connect(path)
+    conn.create_function("unpack", 1, lambda data: zlib.decompress(data).decode())
+    # Same columns as accounts, id stays the rowid so pages by id are range reads
+    columns = "id INTEGER PRIMARY KEY" + COLUMNS[len("id"):]
+    conn.executescript(f"""
+        DROP TABLE IF EXISTS accounts_lean;
+        DROP TABLE IF EXISTS accounts_inline;
+        CREATE TABLE accounts_lean ({columns});
+        CREATE TABLE accounts_inline ({columns}, session_string);
+        INSERT INTO accounts_lean SELECT {COLUMNS} FROM accounts ORDER BY id;
+        INSERT INTO accounts_inline
+            SELECT {', '.join('a.' + c.strip() for c in COLUMNS.split(','))}, unpack(s.session_string)
+            FROM accounts AS a LEFT JOIN account_sessions AS s ON s.account_id = a.id ORDER BY a.id;
+    """)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    plain, packed = conn.execute(
+        "SELECT sum(length(session_string)), (SELECT sum(length(session_string)) FROM account_sessions) "
+        "FROM accounts_inline"
+    ).fetchone()
+    print(f"session strings: {plain / 2 ** 20:.1f} MB plain, {packed / 2 ** 20:.1f} MB compressed "
+          f"({packed / plain:.0%})")
+    for table in ("accounts_lean", "accounts_inline"):
+        pages = conn.execute("SELECT count(*) FROM dbstat WHERE name = ?", (table,)).fetchone()[0]
+        print(f"{table:>16}: {pages:7d} pages")
+    conn.close()
+
+
+def bytes_read() -> int:
+    for line in IO_STATS.read_text().splitlines():
+        if line.startswith("rchar:"):
+            return int(line.split()[1])
+    return 0
+
+
+def cold_pages(path: Path, sql: str) -> int:
+    """Pages read by the query on a new connection without mmap"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.execute("PRAGMA mmap_size=0")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.execute("SELECT count(*) FROM sqlite_schema").fetchone()  # loads the schema first
+    before = bytes_read()
+    conn.execute(sql).fetchall()
+    pages = (bytes_read() - before) // page_size
+    conn.close()
+    return pages
+
+
+def warm_ms(conn: sqlite3.Connection, sql: str, rounds: int) -> float:
+    conn.execute(sql).fetchall()
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def seed(accounts: int):
+    await init_db()
+    await populate(Dataset(accounts=accounts, proxies=max(1, accounts // 10)))
+    await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.accounts))
+    setup(DB_PATH)
+
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    print(f"{'query':>22} {'inline ms':>10} {'lean ms':>9} {'inline pages':>13} {'lean pages':>11}")
+    for name, sql in QUERIES.items():
+        inline, lean = sql.format(table="accounts_inline"), sql.format(table="accounts_lean")
+        print(f"{name:>22} {warm_ms(conn, inline, args.rounds):10.1f} {warm_ms(conn, lean, args.rounds):9.1f} "
+              f"{cold_pages(DB_PATH, inline):13d} {cold_pages(DB_PATH, lean):11d}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare the default SQLite engine with the tuned writer/reader profile
+
+Runs concurrent single-row status updates (one commit each) alongside
+concurrent listing reads and reports throughput and lock errors.
+
+    cd backend && python -m benchmarks.bench_sqlite_engine --accounts 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from database.database import Base, create_sqlite_engine
+from database.models import Account
+
+STATUSES = ["valid", "banned", "spamblock", "session_expired", "checking"]
+
+
+async def seed(path: Path, accounts: int):
+    seed_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with seed_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        rows = [{"phone": f"+7900{i:07d}", "status": "unchecked"} for i in range(accounts)]
+        await conn.execute(insert(Account), rows)
+    await seed_engine.dispose()
+
+
+async def run_profile(name, write_engine, read_engine, accounts, writers, updates, readers):
+    write_session = async_sessionmaker(write_engine, expire_on_commit=False)
+    read_session = async_sessionmaker(read_engine, expire_on_commit=False)
+    stats = {"updates": 0, "reads": 0, "locked": 0}
+    done = asyncio.Event()
+
+    async def writer():
+        for _ in range(updates):
+            account_id = random.randint(1, accounts)
+            try:
+                async with write_session() as session:
+                    await session.execute(
+                        update(Account).where(Account.id == account_id)
+                        .values(status=random.choice(STATUSES))
+                    )
+                    await session.commit()
+                stats["updates"] += 1
+            except OperationalError:
+                stats["locked"] += 1
+
+    async def reader():
+        while not done.is_set():
+            try:
+                async with read_session() as session:
+                    await session.execute(
+                        select(Account.id, Account.status)
+                        .where(Account.id > random.randint(1, accounts))
+                        .order_by(Account.id).limit(100)
+                    )
+                stats["reads"] += 1
+            except OperationalError:
+                stats["locked"] += 1
+
+    started = time.perf_counter()
+    read_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    await asyncio.gather(*[writer() for _ in range(writers)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*read_tasks)
+
+    print(
+        f"{name:>8}: {stats['updates'] / elapsed:8.0f} updates/s  "
+        f"{stats['reads'] / elapsed:8.0f} reads/s  "
+        f"{stats['locked']:5d} lock errors  ({elapsed:.2f}s)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=40, help="updates per writer")
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = Path(os.environ["NEXUS_DATA_DIR"])
+
+    default_path = workdir / "default.db"
+    await seed(default_path, args.accounts)
+    default_engine = create_async_engine(f"sqlite+aiosqlite:///{default_path}")
+    await run_profile(
+        "default", default_engine, default_engine,
+        args.accounts, args.writers, args.updates, args.readers
+    )
+    await default_engine.dispose()
+
+    tuned_path = workdir / "tuned.db"
+    await seed(tuned_path, args.accounts)
+    write_engine = create_sqlite_engine(tuned_path)
+    # The first writer connection switches the file to WAL before readers open it
+    async with write_engine.connect():
+        pass
+    read_engine = create_sqlite_engine(tuned_path, read_only=True, pool_size=args.readers)
+    await run_profile(
+        "tuned", write_engine, read_engine,
+        args.accounts, args.writers, args.updates, args.readers
+    )
+    await read_engine.dispose()
+    await write_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Backend cold start: process spawn to ready line and healthy /health
+
+Spawns `python main.py` the way the Electron shell does and times the
+ready line on stdout and the first successful /health. The first run
+creates the database, the following runs open an existing one, which is
+the usual launch. Import of the interpreter and framework is measured
+separately as the floor no change to the backend can go below, and the
+backend's own startup on top of it is checked against the budget: the
+script exits with status 1 when the median is over it.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5 --budget-ms 300
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FLOOR_IMPORTS = "import fastapi, fastapi.responses, sqlalchemy.ext.asyncio, sqlalchemy.orm, aiosqlite, uvicorn"
+READY_LINE = "[Backend] Ready on"
+TIMEOUT = 30.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def healthy(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+            return resp.status == 200
+    except OSError:
+        return False
+
+
+def floor_ms() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", FLOOR_IMPORTS], check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def start_once(data_dir: str, python_args=()) -> tuple:
+    """Milliseconds from spawn to the ready line and to a healthy /health, and the output"""
+    port = free_port()
+    env = {**os.environ, "NEXUS_DATA_DIR": data_dir, "NEXUS_PORT": str(port), "NEXUS_DEV": "0"}
+    ready_at = None
+    output = []
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, *python_args, "main.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+
+    def read_output():
+        nonlocal ready_at
+        for line in process.stdout:
+            if ready_at is None and line.startswith(READY_LINE):
+                ready_at = time.perf_counter()
+            output.append(line)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    try:
+        while not healthy(port):
+            if process.poll() is not None or time.perf_counter() - started > TIMEOUT:
+                raise RuntimeError("backend did not become healthy:\n" + "".join(output))
+            time.sleep(0.002)
+        healthy_at = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait()
+        reader.join()
+
+    if ready_at is None:
+        raise RuntimeError("no ready line:\n" + "".join(output))
+    return (ready_at - started) * 1000, (healthy_at - started) * 1000, "".join(output)
+
+
+async def seed(data_dir: str, accounts: int):
+    os.environ["NEXUS_DATA_DIR"] = data_dir
+    sys.path.insert(0, str(BACKEND_DIR))
+    from benchmarks.synthetic import Dataset, populate
+    from database.database import init_db, close_db
+
+    await init_db()
+    await populate(Dataset(accounts=accounts, proxies=max(1, accounts // 10)))
+    await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--accounts", type=int, default=0, help="seed the database before the runs")
+    parser.add_argument("--budget-ms", type=float, default=300, help="backend startup on top of the import floor")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="nexus-bench-")
+    if args.accounts:
+        asyncio.run(seed(data_dir, args.accounts))
+
+    first = start_once(data_dir)
+    label = "existing database" if args.accounts else "new database"
+    print(f"first run ({label}):  ready {first[0]:7.0f} ms, healthy {first[1]:7.0f} ms")
+
+    # The floor is measured next to every run, machine noise hits both alike
+    floors, runs = [], []
+    for _ in range(args.runs):
+        floors.append(floor_ms())
+        runs.append(start_once(data_dir))
+    print(f"import floor (python, fastapi, sqlalchemy, uvicorn), median of {args.runs}: "
+          f"{statistics.median(floors):7.0f} ms")
+    print(f"existing database, median of {args.runs}:  ready {statistics.median(r[0] for r in runs):7.0f} ms, "
+          f"healthy {statistics.median(r[1] for r in runs):7.0f} ms")
+
+    own = statistics.median(run[1] - floor for floor, run in zip(floors, runs))
+    verdict = "within" if own <= args.budget_ms else "OVER"
+    print(f"backend startup over the floor: {own:7.0f} ms, {verdict} the {args.budget_ms:.0f} ms budget")
+    sys.exit(0 if own <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Status updates per second: one commit per update vs the status writer
+
+Concurrent fake checkers set status and timestamps on random accounts
+and proxies, first committing every update on its own and then through
+the coalescing status writer. Both runs end when every update is
+committed.
+
+    cd backend && python -m benchmarks.bench_status_writer --accounts 20000 --updates 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+from sqlalchemy import insert, update
+
+from database.database import init_db, close_db, async_session
+from database.models import Account, Proxy
+from services.status_writer import StatusWriter
+
+STATUSES = ["valid", "banned", "spamblock", "session_expired"]
+
+
+async def seed(accounts: int, proxies: int):
+    async with async_session() as session:
+        await session.execute(insert(Proxy), [
+            {"type": "socks5", "host": f"10.0.{i // 250}.{i % 250}", "port": 1080} for i in range(proxies)
+        ])
+        await session.execute(insert(Account), [
+            {"phone": f"+7900{i:07d}", "status": "unchecked"} for i in range(accounts)
+        ])
+        await session.commit()
+
+
+def make_updates(count: int, accounts: int, proxies: int):
+    updates = []
+    for _ in range(count):
+        if random.random() < 0.2:
+            updates.append((Proxy, random.randint(1, proxies), {
+                "status": random.choice(["valid", "invalid"]),
+                "latency_ms": random.randint(50, 900),
+                "last_checked_at": datetime.utcnow()
+            }))
+        else:
+            updates.append((Account, random.randint(1, accounts), {
+                "status": random.choice(STATUSES),
+                "last_checked_at": datetime.utcnow()
+            }))
+    return updates
+
+
+async def run(label, updates, concurrency, apply, finish=None):
+    queue = list(updates)
+    started = time.perf_counter()
+
+    async def worker():
+        while queue:
+            await apply(*queue.pop())
+            # A real checker waits on the network between updates
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    if finish:
+        await finish()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10}: {len(updates) / elapsed:10,.0f} updates/s ({elapsed:.2f}s)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--proxies", type=int, default=500)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.1, help="writer flush interval")
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+
+    await init_db()
+    await seed(args.accounts, args.proxies)
+
+    async def per_commit(model, row_id, values):
+        async with async_session() as session:
+            await session.execute(update(model).where(model.id == row_id).values(**values))
+            await session.commit()
+
+    await run("per-commit", make_updates(args.updates, args.accounts, args.proxies), args.concurrency, per_commit)
+
+    writer = StatusWriter(interval=args.interval, max_pending=args.max_pending)
+    writer.start()
+
+    async def buffered(model, row_id, values):
+        writer.update(model, row_id, **values)
+
+    await run("writer", make_updates(args.updates, args.accounts, args.proxies), args.concurrency,
+              buffered, writer.stop)
+    print(f"writer stats: {writer.stats}")
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
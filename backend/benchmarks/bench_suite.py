@@ -0,0 +1,355 @@
+"""Load benchmark of the backend endpoints on a synthetic dataset
+
+Seeds a database with benchmarks.synthetic, starts the app with its
+lifespan and drives it in-process through an ASGI client. Every scenario
+sends a fixed number of requests from concurrent workers and reports
+p50/p95/p99 latency, throughput and the peak RSS sampled while it ran.
+Read scenarios marked cold clear the response cache before each request
+so they measure the query path; writes run after all reads.
+
+Results are written as JSON with --save. With --compare the run is
+checked against a saved baseline and the exit status is 1 when a
+scenario got slower (p50, or p95 for longer scenarios), lost throughput
+or used more memory than the tolerance allows. Differences under a few
+milliseconds or megabytes are treated as noise.
+
+    cd backend && python -m benchmarks.bench_suite --save baseline.json
+    cd backend && python -m benchmarks.bench_suite --compare baseline.json --tolerance 0.5
+    cd backend && python -m benchmarks.bench_suite --scale small --only accounts
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("NEXUS_DATA_DIR", tempfile.mkdtemp(prefix="nexus-bench-"))
+
+import httpx
+
+from benchmarks.synthetic import Dataset, FIRST_NAMES, LAST_NAMES, account_rows, phone, populate
+from database.database import init_db
+from main import app
+from services.account_index import account_index
+from services.response_cache import response_cache
+
+SCALES = {
+    "full": Dataset(accounts=100_000, proxies=10_000, groups=300, tags=200),
+    "small": Dataset(accounts=10_000, proxies=1_000, groups=50, tags=40),
+}
+STATUSES = ["valid", "unchecked", "banned", "spamblock", "session_expired", "invalid"]
+
+# Regressions smaller than this are noise for sub-millisecond endpoints
+MIN_LATENCY_DELTA_MS = 5.0
+MIN_RSS_DELTA_MB = 32.0
+# Tail latency of shorter scenarios is a single slow request, not compared
+MIN_REQUESTS_FOR_P95 = 100
+# Untimed requests sent before each scenario
+WARMUP_REQUESTS = 5
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    params: Optional[dict] = None
+    json: Optional[dict] = None
+    files: Optional[dict] = None
+    headers: Optional[dict] = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    make: Callable[[random.Random, int], Request]
+    requests: int = 200
+    concurrency: int = 8
+    cold: bool = False
+
+
+@dataclass
+class Context:
+    """What scenarios need to know about the seeded data"""
+    dataset: Dataset
+    etags: Dict[str, str] = field(default_factory=dict)
+    # New rows created by import scenarios start after the seeded ones
+    next_account: int = 0
+    next_proxy: int = 0
+
+
+def build_scenarios(ctx: Context) -> List[Scenario]:
+    ds = ctx.dataset
+
+    def account_id(rng):
+        return rng.randint(1, ds.accounts)
+
+    def ids(rng, k):
+        return rng.sample(range(1, ds.accounts + 1), k)
+
+    def search_term(rng):
+        kind = rng.random()
+        if kind < 0.4:
+            return rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(3, 6)]
+        if kind < 0.7:
+            return phone(account_id(rng))[:rng.randint(5, 9)]
+        return rng.choice(["ka", "ri", "mo", "zu"]) + rng.choice(["la", "to", "vi"])
+
+    def proxy_lines(count):
+        start, ctx.next_proxy = ctx.next_proxy, ctx.next_proxy + count
+        return [f"172.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}:1080:user{n}:pass" for n in range(start, start + count)]
+
+    def session_jsonl(rng, count):
+        start, ctx.next_account = ctx.next_account, ctx.next_account + count
+        rows = account_rows(rng, count, ds, start)
+        lines = [json.dumps({
+            "user_id": r["telegram_id"], "phone": r["phone"], "username": r["username"],
+            "first_name": r["first_name"], "last_name": r["last_name"], "session_string": r["session_string"]
+        }) for r in rows]
+        return "\n".join(lines).encode()
+
+    return [
+        Scenario("health", lambda rng, i: Request("GET", "/health"), requests=500),
+        # Reads
+        Scenario("accounts.page", lambda rng, i: Request("GET", "/api/accounts", {"limit": 100}), cold=True),
+        Scenario("accounts.page.cached", lambda rng, i: Request("GET", "/api/accounts", {"limit": 100}), requests=500),
+        Scenario("accounts.page.not_modified", lambda rng, i: Request(
+            "GET", "/api/accounts", {"limit": 100}, headers={"If-None-Match": ctx.etags.get("accounts", "")}
+        ), requests=500),
+        Scenario("accounts.filtered", lambda rng, i: Request("GET", "/api/accounts", {
+            "limit": 100, "status": rng.choice(STATUSES), "group_id": rng.randint(1, ds.groups)
+        }), cold=True),
+        Scenario("accounts.tag", lambda rng, i: Request("GET", "/api/accounts", {
+            "limit": 100, "tag_id": rng.randint(1, ds.tags)
+        }), cold=True),
+        Scenario("accounts.last_checked", lambda rng, i: Request("GET", "/api/accounts", {
+            "limit": 100, "order_by": "last_checked_at", "status": rng.choice(STATUSES)
+        }), cold=True),
+        Scenario("accounts.fields_1000", lambda rng, i: Request("GET", "/api/accounts", {
+            "limit": 1000, "fields": "id,phone,status,proxy_id", "group_id": rng.randint(1, ds.groups)
+        }), requests=100, cold=True),
+        Scenario("accounts.search", lambda rng, i: Request("GET", "/api/accounts", {
+            "limit": 100, "q": search_term(rng)
+        }), cold=True),
+        Scenario("accounts.get", lambda rng, i: Request("GET", f"/api/accounts/{account_id(rng)}"), requests=500),
+        Scenario("proxies.list", lambda rng, i: Request("GET", "/api/proxy"), requests=20, concurrency=2, cold=True),
+        Scenario("proxies.filtered", lambda rng, i: Request("GET", "/api/proxy", {
+            "status": "valid", "order_by": "reliability", "min_reliability": 0.9
+        }), requests=20, concurrency=2, cold=True),
+        Scenario("proxies.get", lambda rng, i: Request("GET", f"/api/proxy/{rng.randint(1, ds.proxies)}"), requests=500),
+        Scenario("groups.list", lambda rng, i: Request("GET", "/api/groups"), requests=50, cold=True),
+        Scenario("tags.list", lambda rng, i: Request("GET", "/api/tags"), requests=200, cold=True),
+        # Writes
+        Scenario("accounts.update", lambda rng, i: Request("PUT", f"/api/accounts/{account_id(rng)}", json={
+            "group_id": rng.randint(1, ds.groups)
+        }), requests=200, concurrency=4),
+        Scenario("bulk.set_status.ids", lambda rng, i: Request("POST", "/api/accounts/bulk-action", json={
+            "action": "set_status", "status": rng.choice(STATUSES), "account_ids": ids(rng, 500)
+        }), requests=50, concurrency=2),
+        Scenario("bulk.add_tags.filter", lambda rng, i: Request("POST", "/api/accounts/bulk-action", json={
+            "action": "add_tags", "tag_ids": [rng.randint(1, ds.tags)], "filter": {"group_id": rng.randint(1, ds.groups)}
+        }), requests=50, concurrency=2),
+        Scenario("bulk.remove_tags.filter", lambda rng, i: Request("POST", "/api/accounts/bulk-action", json={
+            "action": "remove_tags", "tag_ids": [rng.randint(1, ds.tags)], "filter": {"group_id": rng.randint(1, ds.groups)}
+        }), requests=50, concurrency=2),
+        Scenario("accounts.auto_assign", lambda rng, i: Request("POST", "/api/accounts/auto-assign-proxies", json={
+            "filter": {"group_id": rng.randint(1, ds.groups)}, "max_per_proxy": 20
+        }), requests=20, concurrency=1),
+        Scenario("proxies.bulk_create", lambda rng, i: Request("POST", "/api/proxy/bulk", json={
+            "proxies": proxy_lines(1000), "type": "socks5"
+        }), requests=20, concurrency=1),
+        Scenario("proxies.import", lambda rng, i: Request("POST", "/api/proxy/import", {"type": "http"}, files={
+            "file": ("proxies.txt", "\n".join(proxy_lines(1000)).encode(), "text/plain")
+        }), requests=20, concurrency=1),
+        Scenario("accounts.import_json", lambda rng, i: Request("POST", "/api/accounts/import/json", files={
+            "file": ("sessions.jsonl", session_jsonl(rng, 500), "application/jsonl")
+        }), requests=20, concurrency=1),
+    ]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # Peak of the whole process, kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def _send(client: httpx.AsyncClient, request: Request) -> httpx.Response:
+    return await client.request(
+        request.method, request.url, params=request.params, json=request.json,
+        files=request.files, headers=request.headers
+    )
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    # Requests are generated up front, outside the timed section
+    requests = [scenario.make(rng, i) for i in range(scenario.requests + WARMUP_REQUESTS)]
+    for request in requests[:WARMUP_REQUESTS]:
+        await _send(client, request)
+    queue = iter(requests[WARMUP_REQUESTS:])
+    latencies: List[float] = []
+    errors: Dict[int, int] = {}
+    peak_rss = current_rss_mb()
+    running = True
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while running:
+            peak_rss = max(peak_rss, current_rss_mb())
+            await asyncio.sleep(0.01)
+
+    async def worker():
+        for request in queue:
+            if scenario.cold:
+                response_cache.clear()
+            started = time.perf_counter()
+            response = await _send(client, request)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    elapsed = time.perf_counter() - started
+    running = False
+    await sampler
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": scenario.concurrency,
+        "errors": sum(errors.values()),
+        "error_statuses": {str(k): v for k, v in errors.items()},
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "peak_rss_mb": round(peak_rss, 1)
+    }
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> List[str]:
+    """Regressions of `results` against `baseline`, as readable lines"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base['errors']})")
+        metrics = ["p50_ms", "p95_ms"] if current["requests"] >= MIN_REQUESTS_FOR_P95 else ["p50_ms"]
+        for metric in metrics:
+            if (current[metric] > base[metric] * (1 + tolerance)
+                    and current[metric] - base[metric] > MIN_LATENCY_DELTA_MS):
+                regressions.append(
+                    f"{name}: {metric[:3]} {current[metric]:.1f} ms (baseline {base[metric]:.1f} ms)"
+                )
+        # Compared as time per request per worker, so the same noise floor applies
+        per_request = current["concurrency"] * 1000 / current["throughput_rps"]
+        base_per_request = base["concurrency"] * 1000 / base["throughput_rps"]
+        if (per_request > base_per_request * (1 + tolerance)
+                and per_request - base_per_request > MIN_LATENCY_DELTA_MS):
+            regressions.append(
+                f"{name}: {current['throughput_rps']:.1f} req/s (baseline {base['throughput_rps']:.1f} req/s)"
+            )
+        if (current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance)
+                and current["peak_rss_mb"] - base["peak_rss_mb"] > MIN_RSS_DELTA_MB):
+            regressions.append(f"{name}: peak RSS {current['peak_rss_mb']:.0f} MB (baseline {base['peak_rss_mb']:.0f} MB)")
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="full")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=float, default=1.0, help="multiplier for requests per scenario")
+    parser.add_argument("--only", help="run scenarios whose name starts with one of these, comma separated")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression")
+    args = parser.parse_args()
+
+    dataset = SCALES[args.scale]
+    started = time.perf_counter()
+    await init_db()
+    await populate(dataset, args.seed)
+    print(f"seeded {args.scale} dataset in {time.perf_counter() - started:.1f}s: {dataset}")
+
+    ctx = Context(dataset, next_account=dataset.accounts, next_proxy=dataset.proxies)
+    scenarios = build_scenarios(ctx)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        scenarios = [s for s in scenarios if s.name.startswith(prefixes) or s.name == "health"]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        # Scenarios measure the steady state, with the account index loaded
+        await account_index.wait_built()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/accounts", params={"limit": 100})
+            ctx.etags["accounts"] = response.headers.get("etag", "")
+
+            print(f"{'scenario':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'RSS MB':>8} errors")
+            for scenario in scenarios:
+                scenario.requests = max(1, int(scenario.requests * args.requests))
+                result = await run_scenario(client, scenario, args.seed)
+                results[scenario.name] = result
+                print(f"{scenario.name:<28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+                      f"{result['throughput_rps']:9.1f} {result['peak_rss_mb']:8.0f} {result['errors'] or ''}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "scale": args.scale,
+            "dataset": vars(dataset),
+            "seed": args.seed,
+            "requests_multiplier": args.requests,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["scale"] != args.scale or baseline["meta"]["seed"] != args.seed:
+            print("baseline was recorded with a different scale or seed")
+            return 2
+        regressions = compare(baseline, results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
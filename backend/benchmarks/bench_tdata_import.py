@@ -0,0 +1,64 @@
+"""Throughput of tdata archive decoding, inline vs on the process pool
+
+Builds a synthetic zip of tdata folders and decodes it both in the
+event loop process and through decode_archive's process pool.
+
+    cd backend && python -m benchmarks.bench_tdata_import --folders 500 --passcode secret
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+import zipfile
+
+from services.progress import Progress
+from services.tdata import (
+    POOL_SIZE, build_tdata, decode_archive, decode_tdata, iter_tdata_folders, get_executor, shutdown_executor
+)
+
+
+def build_archive(folders: int, passcode: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(folders):
+            for name, data in build_tdata([(1000 + i, 2, os.urandom(256))], passcode).items():
+                archive.writestr(f"account{i}/tdata/{name}", data)
+    return buffer.getvalue()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folders", type=int, default=500)
+    parser.add_argument("--passcode", default="", help="a passcode makes key derivation CPU-heavy")
+    args = parser.parse_args()
+    passcode = args.passcode.encode()
+
+    started = time.perf_counter()
+    raw = build_archive(args.folders, passcode)
+    print(f"built {args.folders} folders ({len(raw) / 1024:.0f} KB) in {time.perf_counter() - started:.2f}s")
+
+    with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+        started = time.perf_counter()
+        rows = sum(len(decode_tdata(files, passcode)) for _, files in iter_tdata_folders(archive))
+        elapsed = time.perf_counter() - started
+    print(f"  inline: {rows / elapsed:8.1f} accounts/s ({elapsed:.2f}s)")
+
+    # Start the workers before timing
+    executor = get_executor()
+    await asyncio.get_running_loop().run_in_executor(executor, int)
+
+    with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+        progress = Progress(kind="bench")
+        started = time.perf_counter()
+        rows = 0
+        async for _ in decode_archive(archive, passcode, progress):
+            rows += 1
+        elapsed = time.perf_counter() - started
+    print(f"    pool: {rows / elapsed:8.1f} accounts/s ({elapsed:.2f}s, {POOL_SIZE} workers)")
+
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""Seeded generator of realistic datasets for benchmarks
+
+The same seed and sizes always produce the same rows: proxies with
+health data, groups, tags, accounts with profiles, sessions, statuses,
+proxy and group assignments, and a dense account_tags table.
+
+    from benchmarks.synthetic import Dataset, populate
+    await populate(Dataset(accounts=100_000, proxies=10_000), seed=1)
+"""
+import base64
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from database.database import async_session
+from database.models import Account, AccountGroup, AccountSession, AccountTag, Proxy, account_tags
+
+FIRST_NAMES = [
+    "Ivan", "Anna", "Oleg", "Maria", "Dmitry", "Elena", "Sergey", "Olga", "Alexei", "Irina",
+    "John", "Emma", "Lucas", "Sofia", "Mateo", "Chloe", "Noah", "Mia", "Ali", "Yuki"
+]
+LAST_NAMES = [
+    "Petrov", "Ivanova", "Smirnov", "Kuznetsova", "Popov", "Volkova", "Sokolov", "Novikova",
+    "Smith", "Garcia", "Muller", "Rossi", "Tanaka", "Silva", "Kowalski", "Nguyen"
+]
+SYLLABLES = ["ka", "ri", "mo", "ne", "zu", "la", "to", "vi", "sa", "do", "pe", "xa"]
+
+ACCOUNT_STATUS_WEIGHTS = {
+    "valid": 60, "unchecked": 15, "banned": 8, "spamblock": 7, "session_expired": 6, "invalid": 4
+}
+PROXY_STATUS_WEIGHTS = {"valid": 70, "invalid": 20, "unchecked": 10}
+PROXY_TYPE_WEIGHTS = {"socks5": 70, "http": 25, "https": 5}
+
+INSERT_CHUNK = 5000
+# Timestamps are relative to a fixed moment so a seed always gives the same rows
+NOW = datetime(2025, 1, 1)
+
+
+@dataclass
+class Dataset:
+    accounts: int = 100_000
+    proxies: int = 10_000
+    groups: int = 300
+    tags: int = 200
+    # account_tags rows per account are drawn from 0..max_tags_per_account
+    max_tags_per_account: int = 10
+    # share of accounts with a proxy / group
+    proxy_share: float = 0.85
+    group_share: float = 0.9
+
+
+def _weighted(rng: random.Random, weights: dict, k: int) -> list:
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def username(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + str(n)
+
+
+def phone(n: int) -> str:
+    # Unique per n, normalized like imported phones
+    return f"7{900 + n % 100}{n // 100:07d}"
+
+
+def session_string(rng: random.Random) -> str:
+    return "1" + base64.urlsafe_b64encode(rng.randbytes(263)).decode()
+
+
+def proxy_rows(rng: random.Random, count: int, start: int = 0) -> list:
+    types = _weighted(rng, PROXY_TYPE_WEIGHTS, count)
+    statuses = _weighted(rng, PROXY_STATUS_WEIGHTS, count)
+    rows = []
+    for i in range(count):
+        n = start + i
+        checked = statuses[i] != "unchecked"
+        rows.append({
+            "type": types[i],
+            # Unique per n so rows never hit the proxy identity index
+            "host": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+            "port": rng.choice([1080, 3128, 8080, 9050]),
+            "username": f"u{rng.randrange(10 ** 6)}" if rng.random() < 0.6 else None,
+            "password": f"p{rng.randrange(10 ** 8)}",
+            "status": statuses[i],
+            "latency_ms": rng.randint(40, 1500) if statuses[i] == "valid" else None,
+            "reliability_score": round(rng.betavariate(5, 1.5), 3) if checked else None,
+            "latency_score": rng.uniform(40, 1500) if checked else None,
+            "last_checked_at": NOW - timedelta(minutes=rng.randint(1, 60 * 24 * 7)) if checked else None
+        })
+    return rows
+
+
+def account_rows(rng: random.Random, count: int, dataset: Dataset, start: int = 0) -> list:
+    statuses = _weighted(rng, ACCOUNT_STATUS_WEIGHTS, count)
+    rows = []
+    for i in range(count):
+        n = start + i
+        checked = statuses[i] != "unchecked"
+        rows.append({
+            "telegram_id": 10 ** 9 + n,
+            "phone": phone(n),
+            "username": username(rng, n) if rng.random() < 0.7 else None,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES) if rng.random() < 0.8 else None,
+            "status": statuses[i],
+            "session_string": session_string(rng),
+            "proxy_id": rng.randint(1, dataset.proxies) if dataset.proxies and rng.random() < dataset.proxy_share else None,
+            "group_id": rng.randint(1, dataset.groups) if dataset.groups and rng.random() < dataset.group_share else None,
+            "last_checked_at": NOW - timedelta(minutes=rng.randint(1, 60 * 24 * 30)) if checked else None,
+            "last_used_at": NOW - timedelta(minutes=rng.randint(1, 60 * 24 * 30)) if rng.random() < 0.5 else None
+        })
+    return rows
+
+
+async def _insert(session, target, rows: list):
+    for i in range(0, len(rows), INSERT_CHUNK):
+        await session.execute(insert(target), rows[i:i + INSERT_CHUNK])
+
+
+async def populate(dataset: Dataset, seed: int = 1):
+    """Insert the dataset into an empty, migrated database"""
+    rng = random.Random(seed)
+    async with async_session() as session:
+        await _insert(session, Proxy, proxy_rows(rng, dataset.proxies))
+        await _insert(session, AccountGroup, [
+            {"name": f"{rng.choice(LAST_NAMES)} farm {i}", "color": f"#{rng.randrange(1 << 24):06x}"}
+            for i in range(dataset.groups)
+        ])
+        await _insert(session, AccountTag, [
+            {"name": f"tag-{i}", "color": f"#{rng.randrange(1 << 24):06x}"} for i in range(dataset.tags)
+        ])
+
+        for start in range(0, dataset.accounts, INSERT_CHUNK):
+            count = min(INSERT_CHUNK, dataset.accounts - start)
+            rows = account_rows(rng, count, dataset, start)
+            # Ids follow the insert order in the empty table
+            sessions = [{"account_id": start + i + 1, "session_string": row.pop("session_string")}
+                        for i, row in enumerate(rows)]
+            await _insert(session, Account, rows)
+            await _insert(session, AccountSession, sessions)
+
+        if dataset.tags:
+            pairs = []
+            for account_id in range(1, dataset.accounts + 1):
+                k = rng.randint(0, min(dataset.max_tags_per_account, dataset.tags))
+                pairs.extend({"account_id": account_id, "tag_id": t} for t in rng.sample(range(1, dataset.tags + 1), k))
+            await _insert(session, account_tags, pairs)
+        await session.commit()
@@ -1,16 +1,76 @@
 import os
+import sqlite3
 from pathlib import Path
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from urllib.parse import quote
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database.versions import table_versions
 
 # Database path in user's home directory
-DB_DIR = Path.home() / "Nexus"
-DB_DIR.mkdir(exist_ok=True)
+DB_DIR = Path(os.environ.get("NEXUS_DATA_DIR") or Path.home() / "Nexus")
 DB_PATH = DB_DIR / "nexus.db"
 
 DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# RETURNING (3.35) is used by bulk actions and imports, UPDATE FROM
+# (3.33) by proxy assignment
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Number of pooled read-only connections
+READ_POOL_SIZE = 4
+
+# Applied to every connection when it is opened
+CONNECTION_PRAGMAS = {
+    "synchronous": "NORMAL",       # fsync on checkpoint only, safe with WAL
+    "busy_timeout": "5000",        # wait for locks instead of failing at once
+    "mmap_size": "268435456",      # 256 MB memory-mapped reads
+    "cache_size": "-65536",        # 64 MB page cache per connection
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+# journal_mode is persistent and can only be changed by a writer
+WRITER_PRAGMAS = {"journal_mode": "WAL", **CONNECTION_PRAGMAS}
+
+
+def create_sqlite_engine(path: Path, read_only: bool = False, pool_size: int = 1) -> AsyncEngine:
+    """Create an engine with the tuned SQLite connection profile
+
+    Connections are pooled instead of reopened per session. The writer
+    engine keeps a single connection, so write transactions queue on the
+    pool in the application instead of contending for the file lock.
+    """
+    if read_only:
+        url = f"sqlite+aiosqlite:///file:{quote(path.as_posix(), safe='/:')}?mode=ro&uri=true"
+    else:
+        url = f"sqlite+aiosqlite:///{path}"
+
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=60
+    )
+    pragmas = CONNECTION_PRAGMAS if read_only else WRITER_PRAGMAS
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
+
+# Single-connection writer and a pool of read-only connections
+engine = create_sqlite_engine(DB_PATH)
+read_engine = create_sqlite_engine(DB_PATH, read_only=True, pool_size=READ_POOL_SIZE)
+table_versions.watch(engine)
 
 async_session = async_sessionmaker(
     engine,
@@ -18,19 +78,55 @@ async_session = async_sessionmaker(
     expire_on_commit=False
 )
 
+read_session = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
 async def init_db():
-    """Initialize database and create tables"""
-    from database.models import Account, Proxy, AccountGroup, AccountTag
+    """Initialize database and apply pending migrations"""
+    from database.migrations import run_migrations
+
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} is too old, "
+            f"{'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required"
+        )
+    # Created here rather than on import, engines only open files on first connect
+    DB_DIR.mkdir(parents=True, exist_ok=True)
+    async with engine.connect() as conn:
+        await conn.run_sync(run_migrations)
+
+
+async def close_db():
+    """Close pooled connections"""
+    await read_engine.dispose()
+    await engine.dispose()
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+async def next_ids(session: AsyncSession, model, count: int) -> range:
+    """Ids for `count` new rows of a model's table
+
+    Assigned up front so the rows insert as one executemany. Safe because
+    the session holds the only writer connection until it commits.
+    """
+    first_id = (await session.scalar(select(func.max(model.id))) or 0) + 1
+    return range(first_id, first_id + count)
 
 
 async def get_session() -> AsyncSession:
+    """Session on the writer connection, use for endpoints that write"""
     async with async_session() as session:
         yield session
+
+
+async def get_read_session() -> AsyncSession:
+    """Session on a read-only pooled connection"""
+    async with read_session() as session:
+        yield session
@@ -0,0 +1,230 @@
+"""Versioned schema migrations
+
+The schema version is stored in SQLite's `PRAGMA user_version`. Each
+migration runs once, in an explicit BEGIN/COMMIT transaction together
+with the version bump, so a failing step leaves neither schema changes
+nor a new version behind. Existing user databases are upgraded in place
+on startup. The VACUUM that compacts the file after some steps runs
+outside any transaction, after them.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.engine import Connection
+
+from database.database import Base
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+# Versions that leave existing tables fragmented, VACUUM runs once after them
+VACUUM_AFTER = set()
+
+
+def migration(version: int, description: str, vacuum: bool = False):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        if vacuum:
+            VACUUM_AFTER.add(version)
+        return fn
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def _set_version(conn: Connection, version: int):
+    conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def run_migrations(conn: Connection) -> List[int]:
+    """Apply pending migrations, returns the versions that were applied"""
+    current = get_version(conn)
+    conn.commit()
+    if current >= latest_version():
+        # Up to date, the usual startup, nothing is inspected or created
+        if current > latest_version():
+            print(f"[Backend] Database schema {current} is newer than this build ({latest_version()})")
+        return []
+    applied = []
+
+    for version, description, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        with conn.begin():
+            # pysqlite only opens a transaction before DML, DDL would
+            # autocommit statement by statement and a failing step could
+            # leave half of its schema behind with the old version
+            conn.exec_driver_sql("BEGIN")
+            fn(conn)
+            _set_version(conn, version)
+        applied.append(version)
+        print(f"[Backend] Applied migration {version}: {description}")
+
+    # Outside any transaction, a new database has nothing to compact
+    if current > 0 and VACUUM_AFTER.intersection(applied):
+        conn.execute(text("VACUUM"))
+        conn.commit()
+        print("[Backend] Compacted the database")
+
+    return applied
+
+
+@migration(1, "initial schema")
+def _initial_schema(conn: Connection):
+    # Creates only missing tables, so databases that predate migrations
+    # keep their data and are upgraded by the following steps
+    import database.models  # noqa: F401
+
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "proxy latency")
+def _proxy_latency(conn: Connection):
+    if "latency_ms" not in _columns(conn, "proxies"):
+        conn.execute(text("ALTER TABLE proxies ADD COLUMN latency_ms INTEGER"))
+
+
+@migration(3, "indexes on filter columns")
+def _filter_indexes(conn: Connection):
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_accounts_status ON accounts (status)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_group_id_status ON accounts (group_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_proxy_id ON accounts (proxy_id)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_last_used_at ON accounts (last_used_at)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_last_checked_at ON accounts (last_checked_at)",
+        "CREATE INDEX IF NOT EXISTS ix_proxies_status ON proxies (status)",
+        "CREATE INDEX IF NOT EXISTS ix_account_tags_tag_id ON account_tags (tag_id)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(4, "unique proxy identity")
+def _unique_proxies(conn: Connection):
+    identity = "type, host, port, ifnull(username, '')"
+    # Copies can differ by password, the newest one has the password in use.
+    # Point accounts at the newest copy of each duplicated proxy, then drop the rest.
+    conn.execute(text("""
+        UPDATE accounts SET proxy_id = (
+            SELECT MAX(dup.id) FROM proxies AS cur JOIN proxies AS dup
+            ON dup.type = cur.type AND dup.host = cur.host AND dup.port = cur.port
+            AND ifnull(dup.username, '') = ifnull(cur.username, '')
+            WHERE cur.id = accounts.proxy_id
+        )
+        WHERE proxy_id IS NOT NULL
+    """))
+    conn.execute(text(f"""
+        DELETE FROM proxies WHERE id NOT IN (
+            SELECT MAX(id) FROM proxies GROUP BY {identity}
+        )
+    """))
+    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_proxies_identity ON proxies ({identity})"))
+
+
+@migration(5, "jobs table")
+def _jobs_table(conn: Connection):
+    from database.models import Job
+
+    # Also creates the table's indexes, fresh databases got it in step 1
+    Job.__table__.create(conn, checkfirst=True)
+
+
+@migration(6, "proxy health history and scores")
+def _proxy_health(conn: Connection):
+    from database.models import ProxyCheck, ProxyCheckRollup
+
+    columns = _columns(conn, "proxies")
+    for name in ("reliability_score", "latency_score"):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE proxies ADD COLUMN {name} FLOAT"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_proxies_reliability_score ON proxies (reliability_score)"
+    ))
+    ProxyCheck.__table__.create(conn, checkfirst=True)
+    ProxyCheckRollup.__table__.create(conn, checkfirst=True)
+
+
+@migration(7, "account full-text search")
+def _account_search(conn: Connection):
+    columns = "username, phone, first_name, last_name"
+    new_values = "new.username, new.phone, new.first_name, new.last_name"
+    old_values = "old.username, old.phone, old.first_name, old.last_name"
+    # External content table: only the index is stored, rows are read from accounts
+    conn.execute(text(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(
+            {columns}, content='accounts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 4'
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_insert AFTER INSERT ON accounts BEGIN
+            INSERT INTO accounts_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_delete AFTER DELETE ON accounts BEGIN
+            INSERT INTO accounts_fts (accounts_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    """))
+    # Status writes list profile columns without changing them, skip those
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_update AFTER UPDATE OF {columns} ON accounts
+        WHEN old.username IS NOT new.username OR old.phone IS NOT new.phone
+            OR old.first_name IS NOT new.first_name OR old.last_name IS NOT new.last_name
+        BEGIN
+            INSERT INTO accounts_fts (accounts_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO accounts_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """))
+    conn.execute(text("INSERT INTO accounts_fts (accounts_fts) VALUES ('rebuild')"))
+
+
+@migration(8, "session strings in a compressed side table", vacuum=True)
+def _account_sessions(conn: Connection):
+    from database.models import AccountSession
+
+    AccountSession.__table__.create(conn, checkfirst=True)
+    if "session_string" not in _columns(conn, "accounts"):
+        return
+
+    # Copied in chunks, sessions are compressed by the column type on insert
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, session_string FROM accounts WHERE id > :last_id AND session_string IS NOT NULL "
+            "ORDER BY id LIMIT 5000"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            break
+        conn.execute(insert(AccountSession), [{"account_id": i, "session_string": s} for i, s in rows])
+        last_id = rows[-1][0]
+
+    # Rows shrink in place, the VACUUM after this step packs them into fewer pages
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        conn.execute(text("ALTER TABLE accounts DROP COLUMN session_string"))
+    else:
+        # No DROP COLUMN before 3.35, the emptied column costs a byte per row
+        conn.execute(text("UPDATE accounts SET session_string = NULL"))
+
+
+@migration(9, "reaction campaigns")
+def _reaction_campaigns(conn: Connection):
+    from database.models import ReactionAction, ReactionCampaign
+
+    ReactionCampaign.__table__.create(conn, checkfirst=True)
+    ReactionAction.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, "proxy latency score index")
+def _latency_score_index(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_proxies_latency_score ON proxies (latency_score)"))
@@ -1,17 +1,45 @@
+import json
+import zlib
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, Table, Column, Text
+from sqlalchemy import (
+    String, Integer, Float, Boolean, DateTime, ForeignKey, Table, Column, Text, Index, LargeBinary,
+    TypeDecorator, func, table, column
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.database import Base
 
 
+ACCOUNT_STATUSES = (
+    "unchecked", "checking", "valid", "invalid", "banned", "spamblock", "session_expired"
+)
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+CAMPAIGN_STATUSES = ("running", "paused", "done", "cancelled")
+ACTION_STATUSES = ("planned", "done", "failed", "cancelled")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored zlib compressed in a BLOB"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return zlib.compress(value.encode(), 6) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return zlib.decompress(value).decode() if value is not None else None
+
+
 # Many-to-many relationship table for accounts and tags
 account_tags = Table(
     "account_tags",
     Base.metadata,
     Column("account_id", Integer, ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_account_tags_tag_id", "tag_id")
 )
 
 
@@ -25,14 +53,17 @@ class AccountGroup(Base):
 
     accounts: Mapped[List["Account"]] = relationship(back_populates="group")
 
-    def to_dict(self):
-        return {
+    def to_dict(self, accounts_count: Optional[int] = None):
+        data = {
             "id": self.id,
             "name": self.name,
             "color": self.color,
-            "accounts_count": len(self.accounts) if self.accounts else 0,
             "created_at": self.created_at.isoformat()
         }
+        # Counted in SQL by the caller, never by loading self.accounts
+        if accounts_count is not None:
+            data["accounts_count"] = accounts_count
+        return data
 
 
 class AccountTag(Base):
@@ -65,32 +96,94 @@ class Proxy(Base):
     port: Mapped[int] = mapped_column(Integer)
     username: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     password: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
-    status: Mapped[str] = mapped_column(String(20), default="unchecked")  # unchecked, valid, invalid
+    status: Mapped[str] = mapped_column(String(20), default="unchecked", index=True)  # unchecked, valid, invalid
+    latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     last_checked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+    # EWMA over check results: share of successful checks and latency in ms
+    reliability_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)
+    latency_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)
+
     accounts: Mapped[List["Account"]] = relationship(back_populates="proxy")
 
-    def to_dict(self):
-        return {
+    def to_dict(self, accounts_count: Optional[int] = None):
+        data = {
             "id": self.id,
             "type": self.type,
             "host": self.host,
             "port": self.port,
             "username": self.username,
             "status": self.status,
-            "accounts_count": len(self.accounts) if self.accounts else 0,
+            "latency_ms": self.latency_ms,
+            "reliability_score": round(self.reliability_score, 3) if self.reliability_score is not None else None,
+            "latency_score": round(self.latency_score) if self.latency_score is not None else None,
             "last_checked_at": self.last_checked_at.isoformat() if self.last_checked_at else None,
             "created_at": self.created_at.isoformat()
         }
+        # Counted in SQL by the caller, never by loading self.accounts
+        if accounts_count is not None:
+            data["accounts_count"] = accounts_count
+        return data
 
     def get_connection_string(self):
         auth = f"{self.username}:{self.password}@" if self.username else ""
         return f"{self.type}://{auth}{self.host}:{self.port}"
 
 
+# NULL usernames would never conflict in a plain unique index
+Index(
+    "ux_proxies_identity",
+    Proxy.type, Proxy.host, Proxy.port, func.ifnull(Proxy.username, ""),
+    unique=True
+)
+
+
+class ProxyCheck(Base):
+    """Raw result of one proxy check, rolled up and pruned periodically"""
+    __tablename__ = "proxy_checks"
+    __table_args__ = (
+        Index("ix_proxy_checks_proxy_id_checked_at", "proxy_id", "checked_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    proxy_id: Mapped[int] = mapped_column(ForeignKey("proxies.id", ondelete="CASCADE"))
+    checked_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    ok: Mapped[bool] = mapped_column(Boolean)
+    latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error_class: Mapped[Optional[str]] = mapped_column(String(40), nullable=True)
+
+
+class ProxyCheckRollup(Base):
+    """Check counts and latency per proxy and hour or day"""
+    __tablename__ = "proxy_check_rollups"
+
+    proxy_id: Mapped[int] = mapped_column(ForeignKey("proxies.id", ondelete="CASCADE"), primary_key=True)
+    period: Mapped[str] = mapped_column(String(4), primary_key=True)  # hour, day
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    checks: Mapped[int] = mapped_column(Integer, default=0)
+    successes: Mapped[int] = mapped_column(Integer, default=0)
+    latency_sum: Mapped[int] = mapped_column(Integer, default=0)  # over successful checks
+    latency_max: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    def to_dict(self):
+        return {
+            "period": self.period,
+            "bucket": self.bucket.isoformat(),
+            "checks": self.checks,
+            "successes": self.successes,
+            "success_rate": round(self.successes / self.checks, 3) if self.checks else None,
+            "latency_avg": round(self.latency_sum / self.successes) if self.successes else None,
+            "latency_max": self.latency_max
+        }
+
+
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        # Also serves filters on group_id alone
+        Index("ix_accounts_group_id_status", "group_id", "status"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     telegram_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, unique=True)
@@ -100,14 +193,13 @@ class Account(Base):
     last_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
 
     # Status
-    status: Mapped[str] = mapped_column(String(30), default="unchecked")
+    status: Mapped[str] = mapped_column(String(30), default="unchecked", index=True)
     # unchecked, checking, valid, invalid, banned, spamblock, session_expired
 
-    # Session storage
-    session_string: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # The session string is in AccountSession, out of the rows listings scan
 
     # Proxy
-    proxy_id: Mapped[Optional[int]] = mapped_column(ForeignKey("proxies.id", ondelete="SET NULL"), nullable=True)
+    proxy_id: Mapped[Optional[int]] = mapped_column(ForeignKey("proxies.id", ondelete="SET NULL"), nullable=True, index=True)
     proxy: Mapped[Optional["Proxy"]] = relationship(back_populates="accounts")
 
     # Group
@@ -121,8 +213,8 @@ class Account(Base):
     )
 
     # Timestamps
-    last_checked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_checked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    last_used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -143,3 +235,143 @@ class Account(Base):
             "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
             "created_at": self.created_at.isoformat()
         }
+
+
+class AccountSession(Base):
+    """Session string of an account, read only to build a client"""
+    __tablename__ = "account_sessions"
+
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    session_string: Mapped[str] = mapped_column(CompressedText)
+
+
+# FTS5 index over account names and phones, kept in sync by triggers
+# (migration 7). Not part of Base.metadata, create_all can't build it.
+accounts_fts = table("accounts_fts", column("rowid"), column("accounts_fts"))
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_priority", "status", "priority"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))
+    status: Mapped[str] = mapped_column(String(20), default="queued")  # queued, running, done, failed, cancelled
+    priority: Mapped[int] = mapped_column(Integer, default=0)  # higher runs first
+
+    # Concurrency caps are applied per account and per proxy
+    account_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    proxy_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    # JSON encoded
+    payload: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "account_id": self.account_id,
+            "proxy_id": self.proxy_id,
+            "payload": json.loads(self.payload) if self.payload else None,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ReactionCampaign(Base):
+    __tablename__ = "reaction_campaigns"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    channel: Mapped[str] = mapped_column(String(200))  # username or t.me link
+
+    # JSON encoded lists, one reaction is picked at random per action
+    post_ids: Mapped[str] = mapped_column(Text)
+    reactions: Mapped[str] = mapped_column(Text)
+    count: Mapped[int] = mapped_column(Integer)  # reactions per post
+    # Seconds between two reactions on the same post
+    min_delay: Mapped[float] = mapped_column(Float, default=0.0)
+    max_delay: Mapped[float] = mapped_column(Float, default=0.0)
+
+    status: Mapped[str] = mapped_column(String(20), default="running", index=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    done: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Time spent paused, planned fire times are shifted by it
+    shift_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    paused_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "channel": self.channel,
+            "post_ids": json.loads(self.post_ids),
+            "reactions": json.loads(self.reactions),
+            "count": self.count,
+            "min_delay": self.min_delay,
+            "max_delay": self.max_delay,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "pending": self.total - self.done - self.failed if self.status in ("running", "paused") else 0,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ReactionAction(Base):
+    """One planned reaction of a campaign"""
+    __tablename__ = "reaction_actions"
+    __table_args__ = (
+        Index("ix_reaction_actions_campaign_id_status", "campaign_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    campaign_id: Mapped[int] = mapped_column(ForeignKey("reaction_campaigns.id", ondelete="CASCADE"))
+    # Not foreign keys, like jobs, deleted accounts fail their actions
+    account_id: Mapped[int] = mapped_column(Integer)
+    proxy_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    post_id: Mapped[int] = mapped_column(Integer)
+    reaction: Mapped[str] = mapped_column(String(20))
+
+    fire_at: Mapped[datetime] = mapped_column(DateTime)  # as planned, before pauses
+    status: Mapped[str] = mapped_column(String(20), default="planned")  # planned, done, failed, cancelled
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    executed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "campaign_id": self.campaign_id,
+            "account_id": self.account_id,
+            "proxy_id": self.proxy_id,
+            "post_id": self.post_id,
+            "reaction": self.reaction,
+            "fire_at": self.fire_at.isoformat(),
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "executed_at": self.executed_at.isoformat() if self.executed_at else None
+        }
@@ -0,0 +1,52 @@
+import re
+from collections import Counter
+from typing import Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Table written by an INSERT, UPDATE, DELETE or REPLACE statement
+WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+"?(\w+)',
+    re.IGNORECASE
+)
+
+
+class TableVersions:
+    """Per-table counters bumped after every committed write
+
+    Watching the writer engine covers every write path, ORM flushes,
+    Core statements and raw SQL alike. Tables written by a transaction
+    are collected on its connection and bumped when the connection goes
+    back to the pool, after the commit, so a version is never observed
+    before the data it stands for.
+    """
+
+    def __init__(self):
+        self._versions = Counter()
+
+    def get(self, *tables: str) -> Tuple[int, ...]:
+        return tuple(self._versions[t] for t in tables)
+
+    def bump(self, *tables: str):
+        for table in tables:
+            self._versions[table] += 1
+
+    def watch(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def record_write(conn, cursor, statement, parameters, context, executemany):
+            match = WRITE_STATEMENT.match(statement)
+            if match:
+                conn.info.setdefault("written_tables", set()).add(match.group(1).lower())
+
+        @event.listens_for(sync_engine.pool, "checkin")
+        def publish_writes(dbapi_connection, connection_record):
+            # Rolled back writes are bumped too, a spare bump only costs a cache miss
+            tables = connection_record.info.pop("written_tables", None)
+            if tables:
+                self.bump(*tables)
+
+
+table_versions = TableVersions()
@@ -1,21 +1,61 @@
-import asyncio
+import multiprocessing
+import os
+import time
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from database.database import init_db
-from api.router import api_router
+from database.database import init_db, close_db, read_session, engine, read_engine
+from api.router import include_api
+from services.account_index import account_index
+from services.client_pool import client_pool
+from services.jobs import job_engine
+from services.metrics import METRICS_ENABLED, MetricsMiddleware, metrics
+from services.proxy_health import health_maintenance
+from services.reactions import reaction_engine
+from services.session_checker import reset_stale_checks
+from services.status_stream import status_stream
+from services.status_writer import status_writer
+from services.tdata import shutdown_executor
+
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("NEXUS_PORT", "8000"))
+# Auto reload on source changes, only for development
+DEV = os.environ.get("NEXUS_DEV", "0") == "1"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    started = time.perf_counter()
     await init_db()
     print("[Backend] Database initialized")
+    await reset_stale_checks()
+    account_index.start(read_session)
+    status_stream.start()
+    status_writer.start()
+    await job_engine.start()
+    reaction_engine.start()
+    client_pool.start()
+    health_maintenance.start()
+    # The socket is bound before startup in both modes, so requests are
+    # accepted from here on. The Electron shell waits for this line.
+    print(f"[Backend] Ready on http://{HOST}:{PORT} "
+          f"(startup {(time.perf_counter() - started) * 1000:.0f} ms)", flush=True)
     yield
     # Shutdown
     print("[Backend] Shutting down")
+    await health_maintenance.stop()
+    await account_index.stop()
+    await job_engine.stop()
+    await reaction_engine.stop()
+    await client_pool.close()
+    # Pending status updates are written before the database closes
+    await status_writer.stop()
+    await status_stream.stop()
+    shutdown_executor()
+    await close_db()
 
 
 app = FastAPI(
@@ -33,6 +73,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    metrics.instrument(engine, "writer")
+    metrics.instrument(read_engine, "reader")
+    # Added last so it is outermost and also times the CORS middleware
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -40,14 +90,39 @@ async def health_check():
 
 
 # API routes
-app.include_router(api_router, prefix="/api")
+include_api(app)
 
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True,
-        log_level="info"
+def serve():
+    config = uvicorn.Config(
+        app,
+        host=HOST,
+        port=PORT,
+        log_level="info",
+        # No websocket routes, skips importing a websocket implementation
+        ws="none",
+        # Status streams stay open, don't wait for them forever on shutdown
+        timeout_graceful_shutdown=5
     )
+    # Bound before the app starts, so early connections wait in the
+    # backlog instead of being refused while the database opens
+    sock = config.bind_socket()
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+if __name__ == "__main__":
+    # Decoder processes of a frozen build start this executable again
+    multiprocessing.freeze_support()
+    if DEV:
+        uvicorn.run(
+            "main:app",
+            host=HOST,
+            port=PORT,
+            reload=True,
+            log_level="info",
+            ws="none",
+            timeout_graceful_shutdown=5
+        )
+    else:
+        # The app object is passed directly, a "main:app" string would import this module a second time
+        serve()
@@ -0,0 +1,218 @@
+import asyncio
+import functools
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import Account, account_tags
+
+
+def id_mask(ids: Iterable[int]) -> int:
+    """Bitmap with the bit of every account id set"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for account_id in ids:
+        bits[account_id >> 3] |= 1 << (account_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _journaled(method):
+    """Updates made while the index is being built are applied after it"""
+    @functools.wraps(method)
+    def update(self, *args):
+        if self._journal is None:
+            method(self, *args)
+        else:
+            self._journal.append((method, tuple(list(a) if isinstance(a, Iterator) else a for a in args)))
+    return update
+
+
+class AccountIndex:
+    """In-process bitmaps of account ids per status, group and tag
+
+    Bit N of a bitmap is set when account N belongs to the bucket, so a
+    combined filter is a couple of integer ANDs and a page is read by
+    scanning set bits after the cursor id. The index is built once in the
+    background after startup and kept current by the write paths after
+    they commit.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._journal: Optional[List[tuple]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reset()
+
+    def _reset(self):
+        self._all = 0
+        self._status: Dict[str, int] = {}
+        self._group: Dict[int, int] = {}
+        self._tag: Dict[int, int] = {}
+
+    def start(self, session_factory: async_sessionmaker):
+        """Build in the background, off the startup path"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._build(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_built(self):
+        """Wait for the background build to finish"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _build(self, session_factory: async_sessionmaker):
+        started = time.perf_counter()
+        try:
+            async with session_factory() as session:
+                await self.build(session)
+        except Exception as e:
+            print(f"[Backend] Account index build failed, lists use SQL: {e}")
+            return
+        print(f"[Backend] Account index ready: {self.count(self._all)} accounts "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def build(self, session: AsyncSession):
+        """Load the bitmaps, list queries fall back to SQL until it is ready
+
+        Updates committed while loading are journaled and replayed in order
+        on top of the loaded bitmaps. They all set absolute state, so
+        replaying one the load already saw changes nothing.
+        """
+        self.ready = False
+        self._journal = []
+        try:
+            by_status = await self._load(session, Account.status, Account.id)
+            by_group = await self._load(session, Account.group_id, Account.id)
+            by_tag = await self._load(session, account_tags.c.tag_id, account_tags.c.account_id)
+        finally:
+            journal, self._journal = self._journal, None
+
+        self._all = functools.reduce(int.__or__, by_status.values(), 0)
+        self._status, self._group, self._tag = by_status, by_group, by_tag
+        for method, args in journal:
+            method(self, *args)
+        self.ready = True
+
+    @staticmethod
+    async def _load(session: AsyncSession, key, account_id) -> Dict:
+        """Bitmap per value of `key`, ids are concatenated in SQL to fetch one row per value"""
+        result = await session.execute(select(key, func.group_concat(account_id)).group_by(key))
+        return {value: id_mask(map(int, ids.split(","))) for value, ids in result if value is not None}
+
+    # Queries
+
+    def query(self, status: Optional[str] = None, group_id: Optional[int] = None, tag_id: Optional[int] = None) -> int:
+        bitmap = self._all
+        if status:
+            bitmap &= self._status.get(status, 0)
+        if group_id:
+            bitmap &= self._group.get(group_id, 0)
+        if tag_id:
+            bitmap &= self._tag.get(tag_id, 0)
+        return bitmap
+
+    @staticmethod
+    def page(bitmap: int, after_id: int = 0, limit: int = 100) -> List[int]:
+        """Ids in the bitmap greater than `after_id`, in ascending order"""
+        base = after_id + 1
+        rest = bitmap >> base
+        ids = []
+        while rest and len(ids) < limit:
+            offset = (rest & -rest).bit_length() - 1
+            ids.append(base + offset)
+            rest >>= offset + 1
+            base += offset + 1
+        return ids
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        return bitmap.bit_count()
+
+    # Updates
+
+    @staticmethod
+    def _move(buckets: Dict, mask: int, key=None):
+        """Clear the mask from every bucket and add it to `key`"""
+        for name, bitmap in list(buckets.items()):
+            if bitmap & mask:
+                buckets[name] = bitmap & ~mask
+        if key is not None:
+            buckets[key] = buckets.get(key, 0) | mask
+
+    @_journaled
+    def add(self, rows: Iterable[Tuple[int, str, Optional[int]]]):
+        """Insert or replace accounts from (id, status, group_id) rows"""
+        by_status: Dict[str, List[int]] = {}
+        by_group: Dict[Optional[int], List[int]] = {}
+        for account_id, status, group_id in rows:
+            by_status.setdefault(status, []).append(account_id)
+            by_group.setdefault(group_id, []).append(account_id)
+
+        for status, ids in by_status.items():
+            mask = id_mask(ids)
+            self._move(self._status, mask, status)
+            self._all |= mask
+        for group_id, ids in by_group.items():
+            self._move(self._group, id_mask(ids), group_id)
+
+    @_journaled
+    def remove(self, ids: Iterable[int]):
+        mask = id_mask(ids)
+        self._all &= ~mask
+        for buckets in (self._status, self._group, self._tag):
+            self._move(buckets, mask)
+
+    @_journaled
+    def set_status(self, ids: Iterable[int], status: str):
+        self._move(self._status, id_mask(ids), status)
+
+    @_journaled
+    def set_group(self, ids: Iterable[int], group_id: Optional[int]):
+        self._move(self._group, id_mask(ids), group_id)
+
+    @_journaled
+    def add_tags(self, pairs: Iterable[Tuple[int, int]]):
+        """Tag accounts from (account_id, tag_id) pairs"""
+        for tag_id, ids in self._by_tag(pairs).items():
+            self._tag[tag_id] = self._tag.get(tag_id, 0) | id_mask(ids)
+
+    @_journaled
+    def remove_tags(self, pairs: Iterable[Tuple[int, int]]):
+        for tag_id, ids in self._by_tag(pairs).items():
+            if tag_id in self._tag:
+                self._tag[tag_id] &= ~id_mask(ids)
+
+    @_journaled
+    def set_tags(self, account_id: int, tag_ids: Iterable[int]):
+        self._move(self._tag, id_mask([account_id]))
+        self.add_tags((account_id, tag_id) for tag_id in tag_ids)
+
+    @_journaled
+    def drop_group(self, group_id: int):
+        self._group.pop(group_id, None)
+
+    @_journaled
+    def drop_tag(self, tag_id: int):
+        self._tag.pop(tag_id, None)
+
+    @staticmethod
+    def _by_tag(pairs: Iterable[Tuple[int, int]]) -> Dict[int, List[int]]:
+        by_tag: Dict[int, List[int]] = {}
+        for account_id, tag_id in pairs:
+            by_tag.setdefault(tag_id, []).append(account_id)
+        return by_tag
+
+
+account_index = AccountIndex()
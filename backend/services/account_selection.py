@@ -0,0 +1,44 @@
+"""Account selection shared by bulk actions, session checks and campaigns
+
+Accounts are selected either by an id list, split into chunks that fit
+in one statement, or by the common list filters resolved in SQL.
+"""
+from typing import Iterator, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from database.models import Account, account_tags
+
+# SQLite's default limit is 999 bound parameters per statement, id
+# lists are split into chunks that leave room for the other params
+BULK_CHUNK_SIZE = 800
+
+
+class AccountFilter(BaseModel):
+    status: Optional[str] = None
+    group_id: Optional[int] = None
+    tag_id: Optional[int] = None
+
+
+def account_filters(
+    status: Optional[str] = None,
+    group_id: Optional[int] = None,
+    tag_id: Optional[int] = None
+):
+    """Build WHERE conditions for the common account filters"""
+    conditions = []
+    if status:
+        conditions.append(Account.status == status)
+    if group_id:
+        conditions.append(Account.group_id == group_id)
+    if tag_id:
+        conditions.append(Account.id.in_(
+            select(account_tags.c.account_id).where(account_tags.c.tag_id == tag_id)
+        ))
+    return conditions
+
+
+def chunks(items: List[int], size: int = BULK_CHUNK_SIZE) -> Iterator[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,218 @@
+"""Pool of connected Telegram clients keyed by account
+
+Connecting a Telethon client costs several round trips, so clients are
+kept connected between operations and shared by concurrent jobs on the
+same account. The pool holds at most `max_open` connections, evicting
+the least recently used idle client first, and disconnects clients that
+stayed idle for `idle_timeout` seconds.
+
+A client is tied to the session and proxy it was built with. When an
+account's proxy changes, the next acquire builds a new client and the
+old one is disconnected once its last user releases it.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional
+
+from database.models import Proxy
+
+# Telegram Desktop credentials, imported tdata sessions were authorized with them
+API_ID = int(os.environ.get("NEXUS_API_ID", "2040"))
+API_HASH = os.environ.get("NEXUS_API_HASH", "b18441a1ff607e10a989891a5462e627")
+
+DEFAULT_MAX_OPEN = 200
+DEFAULT_IDLE_TIMEOUT = 300.0
+CONNECT_TIMEOUT = 15
+
+ClientFactory = Callable[[str, Optional[Proxy]], Any]
+
+
+def telethon_proxy(proxy: Optional[Proxy]) -> Optional[dict]:
+    if proxy is None:
+        return None
+    return {
+        # python-socks has no https type, the CONNECT tunnel is the same
+        "proxy_type": "http" if proxy.type == "https" else proxy.type,
+        "addr": proxy.host,
+        "port": proxy.port,
+        "username": proxy.username,
+        "password": proxy.password,
+        "rdns": True
+    }
+
+
+def telethon_client(session_string: str, proxy: Optional[Proxy]):
+    """Default factory, Telethon is imported on first use"""
+    from telethon import TelegramClient
+    from telethon.sessions import StringSession
+
+    return TelegramClient(
+        StringSession(session_string),
+        API_ID,
+        API_HASH,
+        proxy=telethon_proxy(proxy),
+        timeout=CONNECT_TIMEOUT,
+        connection_retries=1,
+        receive_updates=False
+    )
+
+
+class ClientPoolFull(Exception):
+    pass
+
+
+@dataclass
+class _Entry:
+    account_id: int
+    key: tuple  # (session string, proxy connection string)
+    client: Any
+    users: int = 0
+    last_used: float = 0.0
+    retired: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ClientPool:
+    def __init__(
+        self,
+        client_factory: Optional[ClientFactory] = None,
+        max_open: int = DEFAULT_MAX_OPEN,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        acquire_timeout: float = 60.0
+    ):
+        self.client_factory = client_factory or telethon_client
+        self.max_open = max(1, max_open)
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.stats = {"connects": 0, "reuses": 0, "evictions": 0, "idle_closed": 0}
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # least recently used first
+        self._retired: List[_Entry] = []  # replaced but still in use
+        self._released = asyncio.Condition()
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._reaper is None:
+            # Bound to the running loop
+            self._released = asyncio.Condition()
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        entries = list(self._entries.values()) + self._retired
+        self._entries.clear()
+        self._retired.clear()
+        await asyncio.gather(*(self._disconnect(e) for e in entries), return_exceptions=True)
+
+    @property
+    def open_count(self) -> int:
+        return len(self._entries) + len(self._retired)
+
+    @asynccontextmanager
+    async def client(self, account_id: int, session_string: str, proxy: Optional[Proxy] = None):
+        """Connected client for an account, shared with concurrent users"""
+        entry = await self._acquire(account_id, session_string, proxy)
+        try:
+            yield entry.client
+        finally:
+            await self._release(entry)
+
+    async def discard(self, account_ids: Iterable[int]):
+        """Drop clients of deleted or reassigned accounts"""
+        for account_id in account_ids:
+            entry = self._entries.pop(account_id, None)
+            if entry is not None:
+                await self._retire(entry)
+
+    # Internals
+
+    async def _acquire(self, account_id: int, session_string: str, proxy: Optional[Proxy]) -> _Entry:
+        key = (session_string, proxy.get_connection_string() if proxy else None)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+
+        while True:
+            entry = self._entries.get(account_id)
+            if entry is not None and entry.key != key:
+                # Proxy or session changed since the client was built
+                del self._entries[account_id]
+                await self._retire(entry)
+                continue
+            if entry is not None or self.open_count < self.max_open:
+                break
+            # Full: evict the least recently used idle client or wait for one
+            idle = next((e for e in self._entries.values() if not e.users), None)
+            if idle is not None:
+                del self._entries[idle.account_id]
+                self.stats["evictions"] += 1
+                await self._disconnect(idle)
+                continue
+            try:
+                async with self._released:
+                    await asyncio.wait_for(self._released.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                raise ClientPoolFull(f"All {self.max_open} clients are busy")
+
+        if entry is None:
+            entry = _Entry(account_id, key, self.client_factory(session_string, proxy))
+            self._entries[account_id] = entry
+
+        self._entries.move_to_end(account_id)
+        entry.users += 1
+        entry.last_used = loop.time()
+
+        try:
+            async with entry.lock:
+                if entry.client.is_connected():
+                    self.stats["reuses"] += 1
+                else:
+                    # Also reconnects clients dropped by the network
+                    await entry.client.connect()
+                    self.stats["connects"] += 1
+        except BaseException:
+            await self._release(entry)
+            if self._entries.get(account_id) is entry and not entry.users:
+                del self._entries[account_id]
+                await self._disconnect(entry)
+            raise
+        return entry
+
+    async def _release(self, entry: _Entry):
+        entry.users -= 1
+        entry.last_used = asyncio.get_running_loop().time()
+        if entry.retired and not entry.users and entry in self._retired:
+            self._retired.remove(entry)
+            await self._disconnect(entry)
+        async with self._released:
+            self._released.notify_all()
+
+    async def _retire(self, entry: _Entry):
+        entry.retired = True
+        if entry.users:
+            self._retired.append(entry)
+        else:
+            await self._disconnect(entry)
+
+    async def _disconnect(self, entry: _Entry):
+        try:
+            await entry.client.disconnect()
+        except Exception as e:
+            print(f"[Backend] Failed to disconnect client of account {entry.account_id}: {e}")
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            deadline = asyncio.get_running_loop().time() - self.idle_timeout
+            idle = [e for e in self._entries.values() if not e.users and e.last_used < deadline]
+            for entry in idle:
+                del self._entries[entry.account_id]
+                self.stats["idle_closed"] += 1
+            await asyncio.gather(*(self._disconnect(e) for e in idle))
+
+
+client_pool = ClientPool()
@@ -0,0 +1,396 @@
+"""Persistent job queue
+
+Jobs are stored in the `jobs` table and scheduled in memory: a priority
+heap feeds a fixed pool of worker tasks, and a job only starts when its
+account and proxy are under their concurrency caps. Jobs waiting on a
+busy account or proxy are parked on it and go back to the heap when a
+slot frees up, so blocked jobs are not rescanned on every pick.
+
+State changes are written back in batches. Jobs that were queued or
+running when the backend stopped are queued again on the next start.
+"""
+import asyncio
+import heapq
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+
+from database.database import async_session, next_ids
+from database.models import Account, Job
+from services.account_selection import chunks
+
+DEFAULT_WORKERS = 32
+DEFAULT_ACCOUNT_LIMIT = 1
+DEFAULT_PROXY_LIMIT = 4
+# Seconds between writes of job state changes
+FLUSH_INTERVAL = 0.2
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+Executor = Callable[["JobState"], Awaitable[Optional[dict]]]
+
+JOB_HANDLERS: Dict[str, Executor] = {}
+
+
+def job_handler(kind: str):
+    """Register the coroutine that runs jobs of a kind"""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+async def run_handler(job: "JobState") -> Optional[dict]:
+    return await JOB_HANDLERS[job.kind](job)
+
+
+@dataclass
+class JobState:
+    id: int
+    kind: str
+    priority: int = 0
+    account_id: Optional[int] = None
+    proxy_id: Optional[int] = None
+    payload: Optional[dict] = None
+    status: str = "queued"
+    attempts: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_model(cls, job: Job) -> "JobState":
+        return cls(
+            id=job.id,
+            kind=job.kind,
+            priority=job.priority,
+            account_id=job.account_id,
+            proxy_id=job.proxy_id,
+            payload=json.loads(job.payload) if job.payload else None,
+            attempts=job.attempts,
+            created_at=job.created_at
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "account_id": self.account_id,
+            "proxy_id": self.proxy_id,
+            "payload": self.payload,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobEngine:
+    """Runs persisted jobs on a worker pool with per-account and per-proxy caps
+
+    `executor` runs one job and returns its JSON result; by default it
+    dispatches to the handler registered for the job kind.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        workers: int = DEFAULT_WORKERS,
+        account_limit: int = DEFAULT_ACCOUNT_LIMIT,
+        proxy_limit: int = DEFAULT_PROXY_LIMIT,
+        flush_interval: float = FLUSH_INTERVAL,
+        session_factory=async_session
+    ):
+        self.executor = executor or run_handler
+        self.workers = max(1, workers)
+        self.limits = {"account": max(1, account_limit), "proxy": max(1, proxy_limit)}
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+
+        self._jobs: Dict[int, JobState] = {}  # queued, running, and finished until flushed
+        self._heap: List[Tuple[int, int]] = []  # (-priority, id)
+        self._parked: Dict[Tuple[str, int], List[int]] = {}
+        self._running_on: Counter = Counter()  # (scope, id) -> running jobs
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._dirty: Dict[int, dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._ready = asyncio.Condition()
+        self._loops: List[asyncio.Task] = []
+        self._stopping = False
+
+    # Lifecycle
+
+    async def start(self):
+        async with self.session_factory() as session:
+            # Jobs interrupted by the last shutdown run again
+            await session.execute(update(Job).where(Job.status == "running").values(status="queued"))
+            await session.commit()
+            result = await session.execute(select(Job).where(Job.status == "queued"))
+            jobs = [JobState.from_model(job) for job in result.scalars()]
+
+        self._enqueue(jobs)
+        if jobs:
+            print(f"[Backend] Resumed {len(jobs)} queued jobs")
+
+        self._stopping = False
+        # Bound to the running loop
+        self._flush_lock = asyncio.Lock()
+        self._ready = asyncio.Condition()
+        self._loops = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._loops.append(asyncio.create_task(self._flush_loop()))
+
+    async def stop(self):
+        """Stop workers, running jobs are interrupted and stay queued"""
+        self._stopping = True
+        for task in self._loops:
+            task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+        await self.flush()
+
+    # Submitting and inspecting jobs
+
+    async def submit(self, kind: str, payload: Optional[dict] = None, account_id: Optional[int] = None,
+                     proxy_id: Optional[int] = None, priority: int = 0) -> JobState:
+        jobs = await self.submit_many([{
+            "kind": kind,
+            "payload": payload,
+            "account_id": account_id,
+            "proxy_id": proxy_id,
+            "priority": priority
+        }])
+        return jobs[0]
+
+    async def submit_many(self, specs: Iterable[dict]) -> List[JobState]:
+        """Persist and queue jobs from dicts with kind, payload, account_id, proxy_id and priority
+
+        Jobs given an account but no proxy run under the account's current
+        proxy, so its cap holds however the job was submitted.
+        """
+        now = datetime.utcnow()
+        rows = []
+        for spec in specs:
+            if self.executor is run_handler and spec["kind"] not in JOB_HANDLERS:
+                raise ValueError(f"Unknown job kind: {spec['kind']}")
+            rows.append({
+                "kind": spec["kind"],
+                "status": "queued",
+                "priority": spec.get("priority") or 0,
+                "account_id": spec.get("account_id"),
+                "proxy_id": spec.get("proxy_id"),
+                "payload": json.dumps(spec["payload"]) if spec.get("payload") is not None else None,
+                "attempts": 0,
+                "created_at": now
+            })
+        if not rows:
+            return []
+
+        async with self.session_factory() as session:
+            await self._resolve_proxies(session, rows)
+            ids = await next_ids(session, Job, len(rows))
+            for job_id, row in zip(ids, rows):
+                row["id"] = job_id
+            await session.execute(insert(Job.__table__), rows)
+            await session.commit()
+
+        jobs = [
+            JobState(
+                id=job_id,
+                kind=row["kind"],
+                priority=row["priority"],
+                account_id=row["account_id"],
+                proxy_id=row["proxy_id"],
+                payload=json.loads(row["payload"]) if row["payload"] else None,
+                created_at=now
+            )
+            for job_id, row in zip(ids, rows)
+        ]
+        self._enqueue(jobs)
+        async with self._ready:
+            self._ready.notify(len(jobs))
+        return jobs
+
+    async def _resolve_proxies(self, session, rows: List[dict]):
+        unresolved = [row for row in rows if row["account_id"] is not None and row["proxy_id"] is None]
+        account_ids = list({row["account_id"] for row in unresolved})
+        proxies = {}
+        for chunk in chunks(account_ids):
+            result = await session.execute(select(Account.id, Account.proxy_id).where(Account.id.in_(chunk)))
+            proxies.update(result.all())
+        for row in unresolved:
+            row["proxy_id"] = proxies.get(row["account_id"])
+
+    def get(self, job_id: int) -> Optional[JobState]:
+        """State of a job that is queued, running or not yet flushed"""
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: int) -> Optional[JobState]:
+        """Cancel a queued or running job, None when the job is not active"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return None
+
+        if job.status == "running":
+            self._tasks[job_id].cancel()
+        # A queued job stays in the heap or a parked list and is skipped when picked
+        self._finish(job, "cancelled")
+        return job
+
+    def stats(self) -> dict:
+        counts = Counter(job.status for job in self._jobs.values())
+        return {
+            "queued": counts["queued"],
+            "running": counts["running"],
+            "workers": self.workers,
+            "account_limit": self.limits["account"],
+            "proxy_limit": self.limits["proxy"]
+        }
+
+    # Scheduling
+
+    def _enqueue(self, jobs: Iterable[JobState]):
+        for job in jobs:
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (-job.priority, job.id))
+
+    def _keys(self, job: JobState) -> List[Tuple[str, int]]:
+        keys = []
+        if job.account_id is not None:
+            keys.append(("account", job.account_id))
+        if job.proxy_id is not None:
+            keys.append(("proxy", job.proxy_id))
+        return keys
+
+    def _take(self) -> Optional[JobState]:
+        """Pop the highest priority job that can start now"""
+        while self._heap:
+            _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+
+            keys = self._keys(job)
+            blocked = next((k for k in keys if self._running_on[k] >= self.limits[k[0]]), None)
+            if blocked:
+                self._parked.setdefault(blocked, []).append(job_id)
+                continue
+
+            for key in keys:
+                self._running_on[key] += 1
+            return job
+        return None
+
+    def _release(self, job: JobState) -> int:
+        """Free the job's slots, returns how many parked jobs were requeued"""
+        requeued = 0
+        for key in self._keys(job):
+            self._running_on[key] -= 1
+            if not self._running_on[key]:
+                del self._running_on[key]
+            for job_id in self._parked.pop(key, []):
+                parked = self._jobs.get(job_id)
+                if parked is not None and parked.status == "queued":
+                    heapq.heappush(self._heap, (-parked.priority, job_id))
+                    requeued += 1
+        return requeued
+
+    async def _worker(self):
+        while True:
+            async with self._ready:
+                job = self._take()
+                while job is None:
+                    await self._ready.wait()
+                    job = self._take()
+            await self._execute(job)
+
+    async def _execute(self, job: JobState):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job.attempts += 1
+        self._mark(job, "status", "started_at", "attempts")
+
+        task = asyncio.create_task(self.executor(job))
+        self._tasks[job.id] = task
+        try:
+            result = await task
+            if job.status == "running":
+                job.result = result
+                self._finish(job, "done")
+        except asyncio.CancelledError:
+            if self._stopping and job.status == "running":
+                # Interrupted by shutdown, runs again after restart
+                job.status = "queued"
+                self._mark(job, "status")
+            if self._stopping:
+                raise
+            # Cancelled by cancel(), which already finished the job
+        except Exception as e:
+            if job.status == "running":
+                job.error = str(e) or type(e).__name__
+                self._finish(job, "failed")
+        finally:
+            self._tasks.pop(job.id, None)
+            requeued = self._release(job)
+
+        if requeued:
+            async with self._ready:
+                self._ready.notify(requeued)
+
+    def _finish(self, job: JobState, status: str):
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        self._mark(job, "status", "result", "error", "finished_at")
+
+    # Persistence
+
+    def _mark(self, job: JobState, *fields: str):
+        row = self._dirty.setdefault(job.id, {"id": job.id})
+        for name in fields:
+            value = getattr(job, name)
+            row[name] = json.dumps(value) if name == "result" and value is not None else value
+
+    async def flush(self):
+        """Write pending state changes in one transaction"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        try:
+            async with self.session_factory() as session:
+                await session.execute(update(Job), list(dirty.values()))
+                await session.commit()
+        except Exception:
+            # Keep the changes for the next flush, newer ones win
+            for job_id, row in dirty.items():
+                self._dirty[job_id] = {**row, **self._dirty.get(job_id, {})}
+            raise
+
+        for job_id in dirty:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in FINISHED_STATUSES and job_id not in self._dirty:
+                del self._jobs[job_id]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Not interrupted by stop(), which flushes after it
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                print(f"[Backend] Failed to save job states: {e}")
+
+
+job_engine = JobEngine()
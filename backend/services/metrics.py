@@ -0,0 +1,225 @@
+"""Per-route request metrics in Prometheus text format
+
+MetricsMiddleware times every HTTP request and records latency,
+response size and the SQL statements it ran, per method and route
+template. Statements are counted with engine events into the context
+of the request that issued them, so background work is not attributed
+to requests. Requests slower than the threshold are logged with their
+statements.
+
+Enabled with NEXUS_METRICS=1. When disabled, main.py installs neither
+the middleware nor the engine events, so requests and queries run
+exactly as without this module.
+"""
+import os
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+METRICS_ENABLED = os.environ.get("NEXUS_METRICS", "0") == "1"
+SLOW_REQUEST_MS = float(os.environ.get("NEXUS_SLOW_REQUEST_MS", "500"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow request log, all are counted
+MAX_LOGGED_STATEMENTS = 50
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    sql_seconds: float = 0.0
+    log: List[Tuple[float, str]] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+@dataclass
+class RouteMetrics:
+    latency: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    response_bytes: Histogram = field(default_factory=lambda: Histogram(SIZE_BUCKETS))
+    statements: Histogram = field(default_factory=lambda: Histogram(STATEMENT_BUCKETS))
+    sql_seconds: float = 0.0
+    responses: Dict[int, int] = field(default_factory=dict)  # status code -> count
+
+
+class Metrics:
+    def __init__(self, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.slow_request_ms = slow_request_ms
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.statements_total = 0
+        self.sql_seconds_total = 0.0
+
+    def instrument(self, engine: AsyncEngine, name: str):
+        """Count statements run on `engine` into the current request"""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def start_timer(conn, cursor, statement, parameters, context, executemany):
+            context._metrics_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._metrics_started
+            self.statements_total += 1
+            self.sql_seconds_total += elapsed
+            stats = _current.get()
+            if stats is not None:
+                stats.statements += 1
+                stats.sql_seconds += elapsed
+                if len(stats.log) < MAX_LOGGED_STATEMENTS:
+                    stats.log.append((elapsed, f"[{name}] {_compact(statement)}"))
+
+    def record(self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats):
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.latency.observe(seconds)
+        metrics.response_bytes.observe(size)
+        metrics.statements.observe(stats.statements)
+        metrics.sql_seconds += stats.sql_seconds
+        metrics.responses[status] = metrics.responses.get(status, 0) + 1
+
+        if seconds * 1000 >= self.slow_request_ms:
+            self._log_slow(method, route, status, seconds, stats)
+
+    def _log_slow(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        print(
+            f"[Backend] Slow request {method} {route} -> {status}: {seconds * 1000:.0f} ms, "
+            f"{stats.statements} SQL statements in {stats.sql_seconds * 1000:.0f} ms"
+        )
+        for elapsed, statement in stats.log:
+            print(f"[Backend]   {elapsed * 1000:8.1f} ms  {statement}")
+        if stats.statements > len(stats.log):
+            print(f"[Backend]   ... {stats.statements - len(stats.log)} more")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP nexus_http_request_duration_seconds Request latency by route",
+            "# TYPE nexus_http_request_duration_seconds histogram",
+        ]
+        routes = sorted(self.routes.items())
+        for (method, route), metrics in routes:
+            lines += metrics.latency.render("nexus_http_request_duration_seconds", _labels(method, route))
+
+        lines += [
+            "# HELP nexus_http_response_size_bytes Response body size by route",
+            "# TYPE nexus_http_response_size_bytes histogram",
+        ]
+        for (method, route), metrics in routes:
+            lines += metrics.response_bytes.render("nexus_http_response_size_bytes", _labels(method, route))
+
+        lines += [
+            "# HELP nexus_http_sql_statements SQL statements per request by route",
+            "# TYPE nexus_http_sql_statements histogram",
+        ]
+        for (method, route), metrics in routes:
+            lines += metrics.statements.render("nexus_http_sql_statements", _labels(method, route))
+
+        lines += [
+            "# HELP nexus_http_sql_seconds_total Time spent in SQL statements by route",
+            "# TYPE nexus_http_sql_seconds_total counter",
+        ]
+        for (method, route), metrics in routes:
+            lines.append(f"nexus_http_sql_seconds_total{{{_labels(method, route)}}} {metrics.sql_seconds:.6f}")
+
+        lines += [
+            "# HELP nexus_http_responses_total Responses by route and status code",
+            "# TYPE nexus_http_responses_total counter",
+        ]
+        for (method, route), metrics in routes:
+            for status, count in sorted(metrics.responses.items()):
+                lines.append(f'nexus_http_responses_total{{{_labels(method, route)},status="{status}"}} {count}')
+
+        lines += [
+            "# HELP nexus_sql_statements_total SQL statements on all connections, requests and background work",
+            "# TYPE nexus_sql_statements_total counter",
+            f"nexus_sql_statements_total {self.statements_total}",
+            "# HELP nexus_sql_seconds_total Time spent in SQL statements on all connections",
+            "# TYPE nexus_sql_seconds_total counter",
+            f"nexus_sql_seconds_total {self.sql_seconds_total:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _compact(statement: str) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= 300 else statement[:297] + "..."
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request into `metrics`"""
+
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            # Set by the router on the shared scope once a route matched
+            route = scope.get("route")
+            self.metrics.record(
+                scope["method"], route.path if route is not None else "unmatched",
+                status, elapsed, size, stats
+            )
+
+
+metrics = Metrics()
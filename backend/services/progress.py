@@ -0,0 +1,79 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Dict, List
+
+
+# Keep at most this many per-item errors on a run so a bad input
+# cannot grow the progress record without bound
+MAX_ERRORS = 100
+
+
+@dataclass
+class Progress:
+    """Progress of a long-running operation (proxy checks, imports, ...)"""
+
+    kind: str
+    total: Optional[int] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "running"  # running, done, failed
+    done: int = 0
+    counters: Dict[str, int] = field(default_factory=dict)
+    errors: List[dict] = field(default_factory=list)
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def add(self, counter: str, amount: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def error(self, item: str, message: str):
+        self.add("failed")
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"item": item, "error": message})
+
+    def finish(self, status: str = "done"):
+        self.status = status
+        self.finished_at = datetime.utcnow()
+
+    def to_dict(self):
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            **self.counters,
+            "errors": self.errors,
+            "elapsed": round(elapsed, 3),
+            "rate": round(self.done / elapsed, 1) if elapsed > 0 else None,  # items per second
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ProgressRegistry:
+    """In-memory registry of recent runs, oldest finished runs are dropped first"""
+
+    def __init__(self, max_runs: int = 50):
+        self.max_runs = max_runs
+        self._runs: Dict[str, Progress] = {}
+
+    def start(self, kind: str, total: Optional[int] = None, run_id: Optional[str] = None) -> Progress:
+        run = Progress(kind=kind, total=total)
+        if run_id:
+            run.id = run_id
+        self._runs[run.id] = run
+        self._prune()
+        return run
+
+    def get(self, run_id: str) -> Optional[Progress]:
+        return self._runs.get(run_id)
+
+    def _prune(self):
+        finished = [r for r in self._runs.values() if r.status != "running"]
+        while len(self._runs) > self.max_runs and finished:
+            self._runs.pop(finished.pop(0).id, None)
+
+
+progress_registry = ProgressRegistry()
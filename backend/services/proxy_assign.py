@@ -0,0 +1,80 @@
+import heapq
+import json
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_MAX_PER_PROXY = 3
+
+# Proxies without a measured latency sort after every measured one
+UNKNOWN_LATENCY = 1 << 30
+
+
+def plan_assignment(
+    current: Dict[int, Optional[int]],
+    proxies: Iterable[Tuple[int, Optional[int]]],
+    loads: Dict[int, int],
+    max_per_proxy: int = DEFAULT_MAX_PER_PROXY
+) -> Dict[int, int]:
+    """Map accounts to the least loaded proxies, lower latency first on ties
+
+    `current` maps the accounts to assign to their proxy, `proxies` are
+    (id, latency_ms) candidates and `loads` their account counts without
+    the accounts being assigned. Accounts stay on their proxy while it is
+    below the balanced load, so a rebalance moves as few as possible.
+    Proxies at `max_per_proxy` are skipped; accounts left over when every
+    proxy is full are not in the result.
+    """
+    latencies = dict(proxies)
+    if not latencies:
+        return {}
+    loads = {proxy_id: loads.get(proxy_id, 0) for proxy_id in latencies}
+    balanced = min(max_per_proxy, math.ceil((sum(loads.values()) + len(current)) / len(loads)))
+
+    plan = {}
+    for account_id in sorted(current):
+        proxy_id = current[account_id]
+        if proxy_id in loads and loads[proxy_id] < balanced:
+            plan[account_id] = proxy_id
+            loads[proxy_id] += 1
+
+    heap = [
+        (load, UNKNOWN_LATENCY if latencies[proxy_id] is None else latencies[proxy_id], proxy_id)
+        for proxy_id, load in loads.items()
+        if load < max_per_proxy
+    ]
+    heapq.heapify(heap)
+
+    for account_id in sorted(current):
+        if account_id in plan:
+            continue
+        if not heap:
+            break
+        load, latency, proxy_id = heap[0]
+        plan[account_id] = proxy_id
+        if load + 1 < max_per_proxy:
+            heapq.heapreplace(heap, (load + 1, latency, proxy_id))
+        else:
+            heapq.heappop(heap)
+    return plan
+
+
+async def write_assignment(session: AsyncSession, plan: Dict[int, int]):
+    """Apply an account -> proxy map with one UPDATE
+
+    The map is bound as a single JSON parameter and joined with
+    json_each, so its size is not limited by SQLite's bound parameters.
+    UPDATE FROM needs SQLite 3.33, below the version init_db requires.
+    """
+    if not plan:
+        return
+    await session.execute(
+        text(
+            "UPDATE accounts SET proxy_id = plan.value "
+            "FROM json_each(:plan) AS plan "
+            "WHERE accounts.id = CAST(plan.key AS INTEGER)"
+        ),
+        {"plan": json.dumps(plan)}
+    )
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Iterable
+
+from database.database import async_session, read_session
+from database.models import Proxy
+from services.jobs import JobState, job_handler
+from services.progress import Progress
+from services.proxy_health import record_checks
+
+CHECK_URL = "https://api.ipify.org?format=json"
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_BATCH_SIZE = 200
+
+# Checked through aiohttp's own proxy support, on a session shared by a run
+HTTP_PROXY_TYPES = ("http", "https")
+
+
+@dataclass
+class CheckResult:
+    proxy_id: int
+    status: str  # valid, invalid
+    latency_ms: Optional[int]
+    checked_at: datetime
+    error: Optional[str] = None
+
+
+class ProxyChecker:
+    """Checks proxies concurrently and stores results in batches
+
+    At most `concurrency` checks are in flight at once, each bounded by
+    `timeout` seconds. Results are written every `batch_size` checks in a
+    short transaction instead of one transaction held for the whole run.
+
+    HTTP proxies are passed per request to one client session shared by
+    the run. SOCKS proxies need a connector of their own: an aiohttp_socks
+    connector is bound to the single proxy it tunnels through and cannot
+    serve another one.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        check_url: str = CHECK_URL
+    ):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.check_url = check_url
+
+    def http_session(self):
+        """Client session for checks through HTTP proxies, one per run"""
+        # Imported on first use, not needed to start the backend
+        import aiohttp
+
+        return aiohttp.ClientSession(
+            # No pooling limit beyond the checker's own, no keep-alive to
+            # proxies that are checked once
+            connector=aiohttp.TCPConnector(limit=0, force_close=True),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def check(self, proxy: Proxy, http_session=None) -> CheckResult:
+        """Check a single proxy and measure its latency
+
+        `http_session` is reused for HTTP proxies when given, otherwise a
+        session is opened for this check alone.
+        """
+        import aiohttp
+
+        started = time.perf_counter()
+        try:
+            if proxy.type in HTTP_PROXY_TYPES:
+                # A CONNECT tunnel either way, like the client pool's proxies
+                auth = f"{proxy.username}:{proxy.password}@" if proxy.username else ""
+                url = f"http://{auth}{proxy.host}:{proxy.port}"
+                if http_session is not None:
+                    return await self._get(proxy, http_session, started, url)
+                async with self.http_session() as client:
+                    return await self._get(proxy, client, started, url)
+
+            from aiohttp_socks import ProxyConnector
+
+            connector = ProxyConnector.from_url(proxy.get_connection_string())
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+                return await self._get(proxy, client, started)
+        except asyncio.TimeoutError:
+            return CheckResult(proxy.id, "invalid", None, datetime.utcnow(), error="timeout")
+        except Exception as e:
+            return CheckResult(proxy.id, "invalid", None, datetime.utcnow(), error=type(e).__name__)
+
+    async def _get(self, proxy: Proxy, client, started: float, proxy_url: Optional[str] = None) -> CheckResult:
+        async with client.get(self.check_url, proxy=proxy_url) as resp:
+            await resp.read()
+            latency_ms = int((time.perf_counter() - started) * 1000)
+            if resp.status == 200:
+                return CheckResult(proxy.id, "valid", latency_ms, datetime.utcnow())
+            return CheckResult(proxy.id, "invalid", latency_ms, datetime.utcnow(), error=f"HTTP {resp.status}")
+
+    async def run(self, proxies: Iterable[Proxy], progress: Optional[Progress] = None) -> List[CheckResult]:
+        """Check all proxies, committing results every `batch_size` checks"""
+        pending = iter(proxies)
+        results: List[CheckResult] = []
+        batch: List[CheckResult] = []
+        write_lock = asyncio.Lock()
+
+        async def flush():
+            if not batch:
+                return
+            batch_results = list(batch)
+            batch.clear()
+            async with async_session() as session:
+                await record_checks(session, batch_results)
+                await session.commit()
+
+        async def worker():
+            for proxy in pending:
+                result = await self.check(proxy, http_session)
+                results.append(result)
+                batch.append(result)
+
+                if progress:
+                    progress.done += 1
+                    progress.add(result.status)
+
+                if len(batch) >= self.batch_size:
+                    async with write_lock:
+                        await flush()
+
+        async with self.http_session() as http_session:
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                async with write_lock:
+                    await flush()
+
+        return results
+
+
+@job_handler("check_proxy")
+async def check_proxy_job(job: JobState) -> dict:
+    """Job that checks the job's proxy and stores the result"""
+    async with read_session() as session:
+        proxy = await session.get(Proxy, job.proxy_id)
+    if proxy is None:
+        raise ValueError(f"Proxy {job.proxy_id} not found")
+
+    timeout = (job.payload or {}).get("timeout", DEFAULT_TIMEOUT)
+    check = await ProxyChecker(timeout=timeout).check(proxy)
+
+    async with async_session() as session:
+        await record_checks(session, [check])
+        await session.commit()
+
+    return {"status": check.status, "latency_ms": check.latency_ms, "error": check.error}
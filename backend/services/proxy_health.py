@@ -0,0 +1,174 @@
+"""Proxy check history, rollups and scores
+
+Every check result updates the proxy's EWMA reliability and latency
+scores in the same statement that stores its status, and is appended to
+`proxy_checks`. A maintenance task periodically recomputes hourly and
+daily rollups in `proxy_check_rollups` and prunes rows past retention,
+so listings and history read scores and rollups, never raw checks.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import DateTime, Float, Integer, bindparam, case, delete, func, insert, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import async_session
+from database.models import Proxy, ProxyCheck, ProxyCheckRollup
+
+# Weight of the newest check in the EWMA scores
+SCORE_ALPHA = 0.2
+
+RAW_RETENTION = timedelta(days=2)
+HOURLY_RETENTION = timedelta(days=30)
+DAILY_RETENTION = timedelta(days=365)
+ROLLUP_INTERVAL = 15 * 60
+
+# Bucket starts in SQLAlchemy's SQLite datetime format, so they compare
+# and load like the other DateTime columns
+HOUR_FORMAT = "%Y-%m-%d %H:00:00.000000"
+DAY_FORMAT = "%Y-%m-%d 00:00:00.000000"
+
+_proxies = Proxy.__table__
+_ok = bindparam("ok", type_=Float)
+# Typed, so raw SQL compares them in the stored format instead of relying
+# on sqlite3's deprecated default datetime adapter
+_raw_cutoff = bindparam("raw_cutoff", type_=DateTime)
+_day_start = bindparam("day_start", type_=DateTime)
+_latency = bindparam("latency", type_=Integer)
+
+# Executed once per result, so results for the same proxy apply in order
+SCORE_UPDATE = (
+    update(_proxies)
+    .where(_proxies.c.id == bindparam("proxy_id"))
+    .values(
+        status=bindparam("new_status"),
+        latency_ms=_latency,
+        last_checked_at=bindparam("checked_at"),
+        reliability_score=func.coalesce(_proxies.c.reliability_score, _ok) * (1 - SCORE_ALPHA) + _ok * SCORE_ALPHA,
+        latency_score=case(
+            (_latency.is_(None), _proxies.c.latency_score),
+            else_=func.coalesce(_proxies.c.latency_score, _latency) * (1 - SCORE_ALPHA) + _latency * SCORE_ALPHA
+        )
+    )
+)
+
+
+def error_class(error: Optional[str]) -> Optional[str]:
+    """Short error category, e.g. timeout, HTTP 407, ProxyConnectionError"""
+    return error[:40] if error else None
+
+
+async def record_checks(session: AsyncSession, results: Iterable):
+    """Store check results (CheckResult) and update proxy scores, caller commits"""
+    results = list(results)
+    if not results:
+        return
+
+    await session.execute(SCORE_UPDATE, [
+        {
+            "proxy_id": r.proxy_id,
+            "new_status": r.status,
+            "latency": r.latency_ms,
+            "checked_at": r.checked_at,
+            "ok": 1.0 if r.status == "valid" else 0.0
+        }
+        for r in results
+    ])
+    await session.execute(insert(ProxyCheck.__table__), [
+        {
+            "proxy_id": r.proxy_id,
+            "checked_at": r.checked_at,
+            "ok": r.status == "valid",
+            "latency_ms": r.latency_ms,
+            "error_class": error_class(r.error)
+        }
+        for r in results
+    ])
+
+
+def _floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+async def rollup_and_prune(session: AsyncSession, now: Optional[datetime] = None):
+    """Recompute rollups from the retained rows and drop expired ones
+
+    Buckets are recomputed as a whole and replaced, so running this
+    again, or after a long downtime, never double counts. Raw rows are
+    pruned on hour boundaries to keep every recomputed hour complete.
+    """
+    now = now or datetime.utcnow()
+    raw_cutoff = _floor_hour(now - RAW_RETENTION)
+    day_start = raw_cutoff.replace(hour=0)
+
+    upsert = """
+        INSERT INTO proxy_check_rollups
+            (proxy_id, period, bucket, checks, successes, latency_sum, latency_max)
+        {select}
+        ON CONFLICT (proxy_id, period, bucket) DO UPDATE SET
+            checks = excluded.checks,
+            successes = excluded.successes,
+            latency_sum = excluded.latency_sum,
+            latency_max = excluded.latency_max
+    """
+    await session.execute(text(upsert.format(select="""
+        SELECT proxy_id, 'hour', strftime(:hour_format, checked_at), count(*), sum(ok),
+               coalesce(sum(CASE WHEN ok THEN latency_ms END), 0), max(CASE WHEN ok THEN latency_ms END)
+        FROM proxy_checks
+        WHERE checked_at >= :raw_cutoff
+        GROUP BY proxy_id, strftime(:hour_format, checked_at)
+    """)).bindparams(_raw_cutoff), {"hour_format": HOUR_FORMAT, "raw_cutoff": raw_cutoff})
+    await session.execute(text(upsert.format(select="""
+        SELECT proxy_id, 'day', strftime(:day_format, bucket), sum(checks), sum(successes),
+               sum(latency_sum), max(latency_max)
+        FROM proxy_check_rollups
+        WHERE period = 'hour' AND bucket >= :day_start
+        GROUP BY proxy_id, strftime(:day_format, bucket)
+    """)).bindparams(_day_start), {"day_format": DAY_FORMAT, "day_start": day_start})
+
+    rollups = ProxyCheckRollup.__table__
+    await session.execute(delete(ProxyCheck.__table__).where(ProxyCheck.checked_at < raw_cutoff))
+    await session.execute(delete(rollups).where(
+        rollups.c.period == "hour", rollups.c.bucket < now - HOURLY_RETENTION
+    ))
+    await session.execute(delete(rollups).where(
+        rollups.c.period == "day", rollups.c.bucket < now - DAILY_RETENTION
+    ))
+
+
+class HealthMaintenance:
+    """Runs rollup_and_prune every ROLLUP_INTERVAL seconds"""
+
+    def __init__(self, interval: float = ROLLUP_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # First run shortly after startup, off the startup path
+        delay = min(self.interval, 60)
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.interval
+            try:
+                async with async_session() as session:
+                    await rollup_and_prune(session)
+                    await session.commit()
+            except Exception as e:
+                print(f"[Backend] Proxy health rollup failed: {e}")
+
+
+health_maintenance = HealthMaintenance()
@@ -0,0 +1,152 @@
+import codecs
+from typing import Optional, AsyncIterator, Iterable
+
+from fastapi import UploadFile
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Proxy
+from services.progress import MAX_ERRORS
+
+PROXY_TYPES = ("socks5", "socks4", "http", "https")
+
+READ_CHUNK_SIZE = 64 * 1024
+INSERT_BATCH_SIZE = 1000
+
+
+def parse_proxy_line(line: str, default_type: str = "socks5") -> Optional[dict]:
+    """Parse one proxy line, returns None for blank lines and comments
+
+    Supported formats:
+        host:port
+        host:port:user:pass
+        user:pass@host:port
+        scheme://[user:pass@]host:port
+
+    Raises ValueError for malformed lines.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    proxy_type = default_type
+    if "://" in line:
+        proxy_type, line = line.split("://", 1)
+        proxy_type = proxy_type.lower()
+
+    username = password = None
+    if "@" in line:
+        auth, line = line.rsplit("@", 1)
+        username, sep, password = auth.partition(":")
+        if not sep:
+            raise ValueError("credentials must be user:pass")
+        parts = line.split(":")
+        if len(parts) != 2:
+            raise ValueError("expected host:port after @")
+        host, port = parts
+    else:
+        parts = line.split(":")
+        if len(parts) == 2:
+            host, port = parts
+        elif len(parts) == 4:
+            host, port, username, password = parts
+        else:
+            raise ValueError("expected host:port or host:port:user:pass")
+
+    if proxy_type not in PROXY_TYPES:
+        raise ValueError(f"unsupported proxy type {proxy_type!r}")
+    if not host:
+        raise ValueError("empty host")
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"invalid port {port!r}")
+
+    return {
+        "type": proxy_type,
+        "host": host,
+        "port": int(port),
+        "username": username or None,
+        "password": password or None
+    }
+
+
+async def iter_upload_lines(file: UploadFile, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Yield lines of an uploaded text file without reading it whole"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+
+    while chunk := await file.read(chunk_size):
+        text = tail + decoder.decode(chunk)
+        lines = text.splitlines(keepends=True)
+        # The last piece may be an incomplete line, carry it over
+        tail = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line
+
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line
+
+
+class ProxyImporter:
+    """Parses proxy lines and inserts them in batches, skipping duplicates
+
+    Duplicates (same type, host, port and username) are detected by the
+    unique ux_proxies_identity index, both within the input and against
+    proxies that already exist.
+    """
+
+    def __init__(self, session: AsyncSession, default_type: str = "socks5", batch_size: int = INSERT_BATCH_SIZE):
+        self.session = session
+        self.default_type = default_type
+        self.batch_size = batch_size
+        self.created = 0
+        self.duplicates = 0
+        self.malformed = 0
+        self.errors = []
+
+    async def run(self, lines) -> dict:
+        if not hasattr(lines, "__aiter__"):
+            lines = _iter_lines(lines)
+
+        batch = []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            try:
+                row = parse_proxy_line(line, self.default_type)
+            except ValueError as e:
+                self.malformed += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append({"line": line_number, "error": str(e)})
+                continue
+
+            if row:
+                batch.append(row)
+            if len(batch) >= self.batch_size:
+                await self._insert(batch)
+                batch = []
+
+        if batch:
+            await self._insert(batch)
+
+        return self.to_dict()
+
+    async def _insert(self, rows):
+        # Core insert: executemany with a total rowcount of inserted rows
+        result = await self.session.execute(insert(Proxy.__table__).on_conflict_do_nothing(), rows)
+        await self.session.commit()
+        self.created += result.rowcount
+        self.duplicates += len(rows) - result.rowcount
+
+    def to_dict(self):
+        return {
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "malformed": self.malformed,
+            "errors": self.errors
+        }
@@ -0,0 +1,641 @@
+"""Reaction campaigns: mass reactions on channel posts
+
+A campaign is planned in full when it is created. Every (account, post,
+reaction, fire_at) action is written to `reaction_actions` up front, and
+one dispatcher task pops due actions from a single timer heap, so a
+campaign over ten thousand accounts costs heap entries, not sleeping
+coroutines. Reactions on a post are spaced by random delays between
+`min_delay` and `max_delay`.
+
+An action only starts when its account and proxy are past their minimum
+interval since their last reaction. Blocked actions are parked on the
+account or proxy in arrival order, and one timer per blocked account or
+proxy releases them one at a time once its interval, plus a random
+jitter, has passed, so a backlog is never rescanned. Flood waits block
+the account for the requested time and retry the action through the
+heap.
+
+Pausing shifts the campaign's remaining fire times by the time spent
+paused. Results and campaign counters are written back in batches.
+Campaigns that were running or paused when the backend stopped are
+restored on the next start.
+"""
+import asyncio
+import heapq
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.database import async_session, next_ids, read_session
+from database.models import Account, AccountSession, Proxy, ReactionAction, ReactionCampaign
+from services.client_pool import client_pool
+from services.status_writer import StatusWriter, status_writer, update_statement
+
+DEFAULT_CONCURRENCY = 200
+# Minimum seconds between two reactions of the same account and through the same proxy
+DEFAULT_ACCOUNT_INTERVAL = 30.0
+DEFAULT_PROXY_INTERVAL = 0.5
+# Upper bound of the random delay added before releasing a parked action
+DEFAULT_JITTER = 2.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 5.0
+# Longest flood wait honoured before the action fails
+MAX_RETRY_AFTER = 3600.0
+# Seconds between writes of results
+FLUSH_INTERVAL = 0.5
+# Planned rows per executemany, bounds the memory of parameter dicts
+INSERT_CHUNK_SIZE = 5000
+
+ACTIVE_STATUSES = ("running", "paused")
+ACTION_COLUMNS = ("status", "attempts", "error", "executed_at")
+CAMPAIGN_COLUMNS = ("status", "done", "failed", "shift_seconds", "paused_at", "finished_at")
+
+
+class TransientReactionError(Exception):
+    """Reaction failed for a reason worth retrying"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True)
+class ActionState:
+    id: int
+    campaign_id: int
+    account_id: int
+    proxy_id: Optional[int]
+    post_id: int
+    reaction: str
+    fire_at: float  # epoch seconds, as planned
+    status: str = "planned"
+    attempts: int = 0
+    error: Optional[str] = None
+    executed_at: Optional[datetime] = None
+
+
+@dataclass
+class CampaignState:
+    id: int
+    channel: str
+    status: str
+    total: int
+    pending: int
+    done: int = 0
+    failed: int = 0
+    shift: float = 0.0  # seconds spent paused
+    paused_at: Optional[float] = None
+    finished_at: Optional[datetime] = None
+    in_flight: int = 0
+    parked: List[int] = field(default_factory=list)  # popped while paused
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "pending": self.pending if self.status in ACTIVE_STATUSES else 0,
+            "in_flight": self.in_flight,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Sends one reaction, raises on failure
+Reactor = Callable[[ActionState, str], Awaitable[None]]
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _epoch(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def telethon_react(action: ActionState, channel: str):
+    """Send the action's reaction with the account's pooled client"""
+    from telethon import errors, functions, types
+
+    async with read_session() as session:
+        session_string = await session.scalar(
+            select(AccountSession.session_string).where(AccountSession.account_id == action.account_id)
+        )
+        proxy = await session.get(Proxy, action.proxy_id) if action.proxy_id is not None else None
+    if not session_string:
+        raise ValueError("Account has no session")
+
+    try:
+        async with client_pool.client(action.account_id, session_string, proxy) as client:
+            # Resolved entities are cached by the pooled client's session
+            peer = await client.get_input_entity(channel)
+            await client(functions.messages.SendReactionRequest(
+                peer=peer,
+                msg_id=action.post_id,
+                reaction=[types.ReactionEmoji(emoticon=action.reaction)]
+            ))
+    except (errors.AuthKeyUnregisteredError, errors.SessionRevokedError, errors.SessionExpiredError,
+            errors.AuthKeyDuplicatedError, errors.UserDeactivatedBanError, errors.UserDeactivatedError):
+        await client_pool.discard([action.account_id])
+        raise
+    except errors.FloodWaitError as e:
+        raise TransientReactionError(f"flood wait {e.seconds}s", retry_after=e.seconds)
+    except (errors.ServerError, OSError, asyncio.TimeoutError) as e:
+        raise TransientReactionError(str(e) or type(e).__name__)
+
+
+def plan_actions(
+    post_ids: List[int],
+    accounts: List[Tuple[int, Optional[int]]],
+    reactions: List[str],
+    count: int,
+    min_delay: float,
+    max_delay: float,
+    start: float,
+    rng: random.Random = random
+) -> List[Tuple[int, Optional[int], int, str, float]]:
+    """(account_id, proxy_id, post_id, reaction, fire_at) for every reaction of a campaign
+
+    Each post gets `count` distinct accounts, or all of them when there
+    are fewer. Posts start at a random offset within the first delay so
+    they are not all hit at once.
+    """
+    actions = []
+    for post_id in post_ids:
+        fire_at = start + rng.uniform(0, max_delay)
+        for account_id, proxy_id in rng.sample(accounts, min(count, len(accounts))):
+            actions.append((account_id, proxy_id, post_id, rng.choice(reactions), fire_at))
+            fire_at += rng.uniform(min_delay, max_delay)
+    return actions
+
+
+class ReactionEngine:
+    """Dispatches planned reactions from one timer heap
+
+    At most `concurrency` reactions are in flight. An account reacts at
+    most once per `account_interval` seconds and a proxy carries at most
+    one reaction per `proxy_interval` seconds, across all campaigns.
+    """
+
+    def __init__(
+        self,
+        reactor: Optional[Reactor] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        account_interval: float = DEFAULT_ACCOUNT_INTERVAL,
+        proxy_interval: float = DEFAULT_PROXY_INTERVAL,
+        jitter: float = DEFAULT_JITTER,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        flush_interval: float = FLUSH_INTERVAL,
+        session_factory: async_sessionmaker = async_session,
+        writer: StatusWriter = status_writer
+    ):
+        self.reactor = reactor or telethon_react
+        self.concurrency = max(1, concurrency)
+        self.intervals = {"account": account_interval, "proxy": proxy_interval}
+        self.jitter = jitter
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self.writer = writer
+        self.counters = {"dispatched": 0, "deferred": 0, "retried": 0}
+        self._reset()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._restored = asyncio.Event()
+        self._loops: List[asyncio.Task] = []
+        self._stopping = False
+
+    def _reset(self):
+        self._campaigns: Dict[int, CampaignState] = {}  # active, and finished until flushed
+        self._actions: Dict[int, ActionState] = {}  # planned and in flight
+        self._heap: List[Tuple[float, int]] = []  # (due, action id)
+        self._next: Dict[Tuple[str, int], float] = {}  # (scope, id) -> earliest next reaction
+        self._waiting: Dict[Tuple[str, int], deque] = {}  # action ids parked on a blocked key
+        self._releases: List[Tuple[float, str, int]] = []  # (time, scope, id) of blocked keys
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._dirty_actions: Dict[int, ActionState] = {}
+        self._dirty_campaigns: set = set()
+
+    # Lifecycle
+
+    def start(self):
+        """Start dispatching, active campaigns are restored in the background"""
+        self._stopping = False
+        # Everything active is loaded again from the tables
+        self._reset()
+        # Bound to the running loop
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._restored = asyncio.Event()
+        self._loops = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._flush_loop())]
+
+    async def stop(self):
+        """Stop dispatching, reactions in flight are interrupted and stay planned"""
+        self._stopping = True
+        for task in self._loops:
+            task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+        await self.flush()
+
+    async def _restore(self):
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(ReactionCampaign).where(ReactionCampaign.status.in_(ACTIVE_STATUSES))
+            )
+            campaigns = list(result.scalars())
+            if not campaigns:
+                return
+            result = await session.execute(
+                select(
+                    ReactionAction.id, ReactionAction.campaign_id, ReactionAction.account_id,
+                    ReactionAction.proxy_id, ReactionAction.post_id, ReactionAction.reaction,
+                    ReactionAction.fire_at, ReactionAction.attempts
+                )
+                .where(ReactionAction.campaign_id.in_([c.id for c in campaigns]), ReactionAction.status == "planned")
+            )
+            rows = result.all()
+
+        for c in campaigns:
+            self._campaigns[c.id] = CampaignState(
+                id=c.id, channel=c.channel, status=c.status, total=c.total, pending=0,
+                done=c.done, failed=c.failed, shift=c.shift_seconds,
+                paused_at=_epoch(c.paused_at) if c.paused_at else None
+            )
+        actions = [
+            ActionState(action_id, campaign_id, account_id, proxy_id, post_id, reaction, _epoch(fire_at),
+                        attempts=attempts)
+            for action_id, campaign_id, account_id, proxy_id, post_id, reaction, fire_at, attempts in rows
+        ]
+        # Overdue actions are dispatched as soon as their account and proxy allow
+        self._enqueue(actions)
+        for campaign in campaigns:
+            if not self._campaigns[campaign.id].pending:
+                self._campaign_finished(self._campaigns[campaign.id], "done")
+        print(f"[Backend] Resumed {len(campaigns)} reaction campaigns with {len(actions)} planned reactions")
+
+    # Campaigns
+
+    async def create(
+        self,
+        channel: str,
+        post_ids: List[int],
+        reactions: List[str],
+        accounts: List[Tuple[int, Optional[int]]],
+        count: int,
+        min_delay: float = 0.0,
+        max_delay: float = 0.0,
+        name: Optional[str] = None
+    ) -> CampaignState:
+        """Plan and persist a campaign over (account_id, proxy_id) pairs, dispatch starts right away"""
+        await self._restored.wait()
+        now = time.time()
+        planned = plan_actions(post_ids, accounts, reactions, count, min_delay, max_delay, now)
+        created_at = _utc(now)
+
+        async with self.session_factory() as session:
+            campaign = ReactionCampaign(
+                name=name, channel=channel, post_ids=json.dumps(post_ids), reactions=json.dumps(reactions),
+                count=count, min_delay=min_delay, max_delay=max_delay, status="running" if planned else "done",
+                total=len(planned), created_at=created_at, finished_at=None if planned else created_at
+            )
+            session.add(campaign)
+            await session.flush()
+            ids = await next_ids(session, ReactionAction, len(planned))
+            actions = [
+                ActionState(action_id, campaign.id, account_id, proxy_id, post_id, reaction, fire_at)
+                for action_id, (account_id, proxy_id, post_id, reaction, fire_at) in zip(ids, planned)
+            ]
+            for i in range(0, len(actions), INSERT_CHUNK_SIZE):
+                await session.execute(insert(ReactionAction.__table__), [
+                    {
+                        "id": a.id, "campaign_id": a.campaign_id, "account_id": a.account_id,
+                        "proxy_id": a.proxy_id, "post_id": a.post_id, "reaction": a.reaction,
+                        "fire_at": _utc(a.fire_at), "status": "planned", "attempts": 0
+                    }
+                    for a in actions[i:i + INSERT_CHUNK_SIZE]
+                ])
+            await session.commit()
+
+        state = CampaignState(id=campaign.id, channel=channel, status=campaign.status, total=len(actions), pending=0)
+        if actions:
+            self._campaigns[state.id] = state
+            self._enqueue(actions)
+            self._wakeup.set()
+        return state
+
+    def get(self, campaign_id: int) -> Optional[CampaignState]:
+        """State of a campaign that is active or not yet flushed"""
+        return self._campaigns.get(campaign_id)
+
+    async def pause(self, campaign_id: int) -> Optional[CampaignState]:
+        """Stop dispatching a running campaign, reactions in flight finish"""
+        await self._restored.wait()
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None or campaign.status != "running":
+            return None
+        campaign.status = "paused"
+        campaign.paused_at = time.time()
+        self._dirty_campaigns.add(campaign_id)
+        return campaign
+
+    async def resume(self, campaign_id: int) -> Optional[CampaignState]:
+        """Continue a paused campaign, its remaining fire times move by the pause"""
+        await self._restored.wait()
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None or campaign.status != "paused":
+            return None
+        now = time.time()
+        campaign.shift += now - campaign.paused_at
+        campaign.paused_at = None
+        campaign.status = "running"
+        # Actions still in the heap have stale due times, they are pushed back when popped early
+        for action_id in campaign.parked:
+            action = self._actions.get(action_id)
+            if action is not None:
+                heapq.heappush(self._heap, (action.fire_at + campaign.shift, action_id))
+        campaign.parked = []
+        self._dirty_campaigns.add(campaign_id)
+        self._wakeup.set()
+        return campaign
+
+    async def cancel(self, campaign_id: int) -> Optional[CampaignState]:
+        """Drop a campaign's remaining reactions"""
+        await self._restored.wait()
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is None or campaign.status not in ACTIVE_STATUSES:
+            return None
+
+        ids = [a.id for a in self._actions.values() if a.campaign_id == campaign_id]
+        for action_id in ids:
+            del self._actions[action_id]
+            # Retries not yet written would overwrite the cancellation
+            self._dirty_actions.pop(action_id, None)
+            task = self._tasks.get(action_id)
+            if task is not None:
+                task.cancel()
+        # Heap entries of dropped actions are skipped when popped
+        campaign.pending = 0
+        campaign.parked = []
+        self._campaign_finished(campaign, "cancelled")
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(ReactionAction)
+                .where(ReactionAction.campaign_id == campaign_id, ReactionAction.status == "planned")
+                .values(status="cancelled"),
+                execution_options={"synchronize_session": False}
+            )
+            await session.commit()
+        return campaign
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "campaigns": sum(c.status in ACTIVE_STATUSES for c in self._campaigns.values()),
+            "planned": len(self._actions) - len(self._tasks),
+            "in_flight": len(self._tasks),
+            "concurrency": self.concurrency,
+            "account_interval": self.intervals["account"],
+            "proxy_interval": self.intervals["proxy"]
+        }
+
+    # Dispatching
+
+    def _enqueue(self, actions: Iterable[ActionState]):
+        for action in actions:
+            self._actions[action.id] = action
+            campaign = self._campaigns[action.campaign_id]
+            campaign.pending += 1
+            self._heap.append((action.fire_at + campaign.shift, action.id))
+        heapq.heapify(self._heap)
+
+    def _route(self, action_id: int, now: float, released: Optional[Tuple[str, int]] = None):
+        """Start a popped action or put it back where it can run
+
+        Keys with parked actions count as blocked so they are served in
+        order, except `released`, the key the action was just taken from.
+        """
+        action = self._actions.get(action_id)
+        if action is None or action_id in self._tasks:
+            return
+        campaign = self._campaigns[action.campaign_id]
+        if campaign.status == "paused":
+            campaign.parked.append(action_id)
+            return
+
+        due = action.fire_at + campaign.shift
+        if due > now:
+            # Popped with the due time from before a pause
+            heapq.heappush(self._heap, (due, action_id))
+            return
+
+        keys = self._keys(action)
+        blocked = next(
+            (k for k in keys if (k != released and k in self._waiting) or self._next.get(k, 0.0) > now), None
+        )
+        if blocked:
+            waiting = self._waiting.get(blocked)
+            if blocked == released:
+                # Blocked again, by a flood wait, stays first in line
+                waiting.appendleft(action_id)
+            else:
+                if waiting is None:
+                    waiting = self._waiting[blocked] = deque()
+                    self._schedule_release(blocked)
+                waiting.append(action_id)
+            self.counters["deferred"] += 1
+            return
+
+        for key in keys:
+            self._next[key] = now + self.intervals[key[0]]
+        campaign.in_flight += 1
+        self.counters["dispatched"] += 1
+        self._tasks[action_id] = asyncio.create_task(self._execute(action, campaign))
+
+    @staticmethod
+    def _keys(action: ActionState) -> List[Tuple[str, int]]:
+        if action.proxy_id is None:
+            return [("account", action.account_id)]
+        return [("account", action.account_id), ("proxy", action.proxy_id)]
+
+    def _schedule_release(self, key: Tuple[str, int]):
+        heapq.heappush(self._releases, (self._next[key] + random.uniform(0, self.jitter), *key))
+
+    def _release(self, key: Tuple[str, int], now: float):
+        """Route the oldest action parked on a key that is free again"""
+        waiting = self._waiting[key]
+        self._route(waiting.popleft(), now, released=key)
+        if waiting:
+            # The next one waits for the reaction just started, or goes now if
+            # the released action was dropped or blocked on its other key
+            self._next[key] = max(self._next.get(key, 0.0), now)
+            self._schedule_release(key)
+        else:
+            del self._waiting[key]
+
+    def _next_due(self) -> Optional[float]:
+        return min((q[0][0] for q in (self._heap, self._releases) if q), default=None)
+
+    async def _dispatch(self):
+        try:
+            await self._restore()
+        except Exception as e:
+            print(f"[Backend] Failed to restore reaction campaigns: {e}")
+        finally:
+            self._restored.set()
+        while True:
+            self._wakeup.clear()
+            while len(self._tasks) < self.concurrency:
+                # Read per action, a pass over a large backlog takes a while
+                now = time.time()
+                due = self._next_due()
+                if due is None or due > now:
+                    break
+                if self._releases and self._releases[0][0] == due:
+                    _, scope, key_id = heapq.heappop(self._releases)
+                    self._release((scope, key_id), now)
+                else:
+                    _, action_id = heapq.heappop(self._heap)
+                    self._route(action_id, now)
+
+            timeout = None
+            due = self._next_due()
+            if due is not None and len(self._tasks) < self.concurrency:
+                timeout = max(0.0, due - time.time())
+            try:
+                # Woken early by new campaigns, resumes and finished reactions
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, action: ActionState, campaign: CampaignState):
+        action.attempts += 1
+        try:
+            await self.reactor(action, campaign.channel)
+        except asyncio.CancelledError:
+            # Cancelled campaigns already dropped the action, on shutdown it stays planned
+            if self._stopping and action.id in self._actions:
+                self._dirty_actions[action.id] = action
+            raise
+        except TransientReactionError as e:
+            action.error = str(e)
+            if action.attempts <= self.retries and (e.retry_after or 0) <= MAX_RETRY_AFTER:
+                now = time.time()
+                if e.retry_after:
+                    key = ("account", action.account_id)
+                    self._next[key] = max(self._next.get(key, 0.0), now + e.retry_after)
+                    delay = e.retry_after
+                else:
+                    delay = self.backoff * 2 ** (action.attempts - 1) * random.uniform(0.5, 1.5)
+                heapq.heappush(self._heap, (now + delay, action.id))
+                self._dirty_actions[action.id] = action
+                self.counters["retried"] += 1
+            else:
+                self._finish(action, campaign, "failed")
+        except Exception as e:
+            action.error = str(e) or type(e).__name__
+            self._finish(action, campaign, "failed")
+        else:
+            action.error = None
+            self._finish(action, campaign, "done")
+            self.writer.update(Account, action.account_id, last_used_at=datetime.utcnow())
+        finally:
+            self._tasks.pop(action.id, None)
+            campaign.in_flight -= 1
+            self._wakeup.set()
+
+    def _finish(self, action: ActionState, campaign: CampaignState, status: str):
+        if self._actions.pop(action.id, None) is None:
+            return
+        action.status = status
+        action.executed_at = datetime.utcnow()
+        self._dirty_actions[action.id] = action
+        campaign.pending -= 1
+        if status == "done":
+            campaign.done += 1
+        else:
+            campaign.failed += 1
+        self._dirty_campaigns.add(campaign.id)
+        if not campaign.pending and campaign.status in ACTIVE_STATUSES:
+            self._campaign_finished(campaign, "done")
+
+    def _campaign_finished(self, campaign: CampaignState, status: str):
+        campaign.status = status
+        campaign.paused_at = None
+        campaign.finished_at = datetime.utcnow()
+        self._dirty_campaigns.add(campaign.id)
+
+    # Persistence
+
+    @staticmethod
+    def _action_row(action: ActionState) -> dict:
+        return {"row_id": action.id, **{c: getattr(action, c) for c in ACTION_COLUMNS}}
+
+    @staticmethod
+    def _campaign_row(campaign: CampaignState) -> dict:
+        return {
+            "row_id": campaign.id,
+            "status": campaign.status,
+            "done": campaign.done,
+            "failed": campaign.failed,
+            "shift_seconds": campaign.shift,
+            "paused_at": _utc(campaign.paused_at) if campaign.paused_at else None,
+            "finished_at": campaign.finished_at
+        }
+
+    async def flush(self):
+        """Write results and campaign counters in one transaction"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._dirty_actions and not self._dirty_campaigns:
+            return
+        actions, self._dirty_actions = self._dirty_actions, {}
+        campaign_ids, self._dirty_campaigns = self._dirty_campaigns, set()
+        action_rows = [self._action_row(a) for a in actions.values()]
+        campaign_rows = [self._campaign_row(self._campaigns[i]) for i in campaign_ids]
+        try:
+            async with self.session_factory() as session:
+                if action_rows:
+                    await session.execute(update_statement(ReactionAction, ACTION_COLUMNS), action_rows)
+                if campaign_rows:
+                    await session.execute(update_statement(ReactionCampaign, CAMPAIGN_COLUMNS), campaign_rows)
+                await session.commit()
+        except Exception:
+            # Rows are built from the live state, the next flush writes the latest
+            self._dirty_actions = {**actions, **self._dirty_actions}
+            self._dirty_campaigns |= campaign_ids
+            raise
+
+        for campaign_id in campaign_ids:
+            campaign = self._campaigns.get(campaign_id)
+            if campaign and campaign.status not in ACTIVE_STATUSES and campaign_id not in self._dirty_campaigns:
+                del self._campaigns[campaign_id]
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Not interrupted by stop(), which flushes after it
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                print(f"[Backend] Failed to save reaction results: {e}")
+
+
+reaction_engine = ReactionEngine()
@@ -0,0 +1,88 @@
+"""Conditional responses and cached bodies for list endpoints
+
+A list response is identified by its endpoint, query string and the
+versions of the tables it reads. That identity is hashed into the ETag,
+so a client sending it back in If-None-Match gets a 304 without any
+query, and other clients get the serialized body from an LRU cache. Any
+committed write to one of the tables changes the versions and with them
+the ETag; stale entries age out of the cache.
+"""
+import hashlib
+import secrets
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+from database.versions import table_versions
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# ETags from before a restart must not match, versions start over
+_BOOT_ID = secrets.token_hex(8)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()  # least recently used first
+        self._size = 0
+
+    async def respond(
+        self,
+        request: Request,
+        endpoint: str,
+        tables: Iterable[str],
+        build: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """Answer with 304, a cached body or `build()` serialized with orjson"""
+        # Read before building, a write during the build only makes the entry older
+        versions = table_versions.get(*tables)
+        etag = self._etag(endpoint, sorted(request.query_params.multi_items()), versions)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in _parse_if_none_match(request.headers.get("if-none-match")):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        body = self._entries.get(etag)
+        if body is not None:
+            self._entries.move_to_end(etag)
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            body = ORJSONResponse(await build()).body
+            self._store(etag, body)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    @staticmethod
+    def _etag(endpoint: str, params: list, versions: Tuple[int, ...]) -> str:
+        identity = repr((_BOOT_ID, endpoint, params, versions)).encode()
+        return f'"{hashlib.blake2b(identity, digest_size=16).hexdigest()}"'
+
+    def _store(self, etag: str, body: bytes):
+        if len(body) > self.max_bytes or etag in self._entries:
+            return
+        self._entries[etag] = body
+        self._size += len(body)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+def _parse_if_none_match(value: str) -> set:
+    if not value:
+        return set()
+    # Weak comparison, proxies may mark forwarded ETags weak
+    return {tag.strip().removeprefix("W/") for tag in value.split(",")}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,106 @@
+"""List payloads built from column selects
+
+List endpoints select plain row tuples instead of ORM objects and turn
+them into dicts with `zip`. Accounts reference their proxy, group and
+tags by id; the rows those ids point to are sent once per page in side
+tables keyed by id. Datetimes are left as they are for orjson, which
+writes them in isoformat.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Account, AccountGroup, AccountTag, Proxy, account_tags
+
+ACCOUNT_COLUMNS = (
+    Account.id, Account.telegram_id, Account.username, Account.phone,
+    Account.first_name, Account.last_name, Account.status, Account.proxy_id,
+    Account.group_id, Account.last_checked_at, Account.last_used_at, Account.created_at
+)
+ACCOUNT_KEYS = tuple(c.key for c in ACCOUNT_COLUMNS)
+
+# Proxy fields repeated in account pages, the full row is in the proxy list
+PROXY_REF_COLUMNS = (Proxy.id, Proxy.type, Proxy.host, Proxy.port, Proxy.status, Proxy.latency_ms)
+GROUP_REF_COLUMNS = (AccountGroup.id, AccountGroup.name, AccountGroup.color)
+TAG_REF_COLUMNS = (AccountTag.id, AccountTag.name, AccountTag.color)
+
+PROXY_COLUMNS = (
+    Proxy.id, Proxy.type, Proxy.host, Proxy.port, Proxy.username, Proxy.status,
+    Proxy.latency_ms, Proxy.reliability_score, Proxy.latency_score,
+    Proxy.last_checked_at, Proxy.created_at
+)
+PROXY_KEYS = tuple(c.key for c in PROXY_COLUMNS)
+
+
+def _in(column, ids: Iterable[int]):
+    # Inlined, page id lists can exceed SQLite's bound parameter limit
+    return column.in_(bindparam(f"{column.key}_ids", list(ids), expanding=True, literal_execute=True))
+
+
+async def _side_table(session: AsyncSession, columns: Sequence, ids: set) -> Dict[int, dict]:
+    if not ids:
+        return {}
+    keys = [c.key for c in columns]
+    result = await session.execute(select(*columns).where(_in(columns[0], ids)))
+    return {row[0]: dict(zip(keys, row)) for row in result}
+
+
+async def account_page(session: AsyncSession, rows: Sequence[tuple]) -> dict:
+    """Accounts from ACCOUNT_COLUMNS rows with proxies, groups and tags side tables"""
+    accounts = [dict(zip(ACCOUNT_KEYS, row)) for row in rows]
+    for account in accounts:
+        account["tag_ids"] = []
+
+    by_id = {account["id"]: account for account in accounts}
+    tag_ids = set()
+    if by_id:
+        result = await session.execute(
+            select(account_tags.c.account_id, account_tags.c.tag_id)
+            .where(_in(account_tags.c.account_id, by_id))
+            .order_by(account_tags.c.account_id, account_tags.c.tag_id)
+        )
+        for account_id, tag_id in result:
+            by_id[account_id]["tag_ids"].append(tag_id)
+            tag_ids.add(tag_id)
+
+    proxy_ids = {a["proxy_id"] for a in accounts if a["proxy_id"] is not None}
+    group_ids = {a["group_id"] for a in accounts if a["group_id"] is not None}
+    return {
+        "data": accounts,
+        "proxies": await _side_table(session, PROXY_REF_COLUMNS, proxy_ids),
+        "groups": await _side_table(session, GROUP_REF_COLUMNS, group_ids),
+        "tags": await _side_table(session, TAG_REF_COLUMNS, tag_ids)
+    }
+
+
+def flat_rows(rows: Sequence[tuple], keys: Sequence[str]) -> List[dict]:
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def proxy_select():
+    """PROXY_COLUMNS with the number of accounts on each proxy"""
+    counts = (
+        select(Account.proxy_id, func.count().label("accounts_count"))
+        .where(Account.proxy_id.is_not(None))
+        .group_by(Account.proxy_id)
+        .subquery()
+    )
+    return (
+        select(*PROXY_COLUMNS, func.coalesce(counts.c.accounts_count, 0))
+        .outerjoin(counts, counts.c.proxy_id == Proxy.id)
+    )
+
+
+def proxy_rows(rows: Sequence[tuple]) -> List[dict]:
+    """Rows of proxy_select() in the shape of Proxy.to_dict(accounts_count)"""
+    proxies = []
+    for row in rows:
+        proxy = dict(zip(PROXY_KEYS, row))
+        proxy["accounts_count"] = row[-1]
+        if proxy["reliability_score"] is not None:
+            proxy["reliability_score"] = round(proxy["reliability_score"], 3)
+        if proxy["latency_score"] is not None:
+            proxy["latency_score"] = round(proxy["latency_score"])
+        proxies.append(proxy)
+    return proxies
@@ -0,0 +1,246 @@
+"""Mass validation of account sessions
+
+A run marks the selected accounts `checking` in one statement per
+chunk, checks them with bounded global and per-proxy concurrency and
+hands statuses and `last_checked_at` to the status writer, which
+commits them in batches. Accounts are interleaved across proxies so a
+busy proxy does not hold up the rest.
+
+Only transient failures (network errors, timeouts, flood waits) are
+retried, with exponential backoff. Accounts that still fail get their
+previous status back. The checker is a plain coroutine so runs can be
+exercised offline with a fake one.
+"""
+import asyncio
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import zip_longest
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.database import async_session, read_session
+from database.models import Account, AccountSession, Proxy
+from services.account_index import account_index
+from services.client_pool import client_pool
+from services.progress import Progress
+from services.status_stream import status_stream
+from services.status_writer import StatusWriter, status_writer
+
+DEFAULT_CONCURRENCY = 200
+DEFAULT_PROXY_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+# Longest flood wait honoured before giving up on an account
+MAX_RETRY_AFTER = 60.0
+
+# SQLite bound parameter limit, see BULK_CHUNK_SIZE in services/account_selection.py
+MARK_CHUNK_SIZE = 800
+
+# Profile columns a checker may refresh
+PROFILE_COLUMNS = ("username", "first_name", "last_name")
+
+
+class TransientCheckError(Exception):
+    """Check failed for a reason worth retrying"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class CheckTarget:
+    id: int
+    proxy: Optional[Proxy]
+    previous_status: str
+
+
+# Returns {"status": ..., **profile columns}
+SessionCheckFn = Callable[[CheckTarget], Awaitable[dict]]
+
+
+async def telethon_check(target: CheckTarget) -> dict:
+    """Connect with the account session and read its own profile"""
+    from telethon import errors
+
+    # Loaded here, right before the client is built, not with the targets
+    async with read_session() as session:
+        session_string = await session.scalar(
+            select(AccountSession.session_string).where(AccountSession.account_id == target.id)
+        )
+    if not session_string:
+        return {"status": "invalid"}
+
+    try:
+        async with client_pool.client(target.id, session_string, target.proxy) as client:
+            if not await client.is_user_authorized():
+                return {"status": "session_expired"}
+            me = await client.get_me()
+    except (errors.AuthKeyUnregisteredError, errors.SessionRevokedError,
+            errors.SessionExpiredError, errors.AuthKeyDuplicatedError):
+        await client_pool.discard([target.id])
+        return {"status": "session_expired"}
+    except (errors.UserDeactivatedBanError, errors.UserDeactivatedError, errors.PhoneNumberBannedError):
+        await client_pool.discard([target.id])
+        return {"status": "banned"}
+    except errors.FloodWaitError as e:
+        raise TransientCheckError(f"flood wait {e.seconds}s", retry_after=e.seconds)
+    except (errors.ServerError, OSError, asyncio.TimeoutError) as e:
+        raise TransientCheckError(str(e) or type(e).__name__)
+
+    return {
+        "status": "valid",
+        "username": me.username,
+        "first_name": me.first_name,
+        "last_name": me.last_name
+    }
+
+
+def _interleave(targets: List[CheckTarget]) -> List[CheckTarget]:
+    """Round-robin order over proxies"""
+    by_proxy: Dict[Optional[int], List[CheckTarget]] = defaultdict(list)
+    for target in targets:
+        by_proxy[target.proxy.id if target.proxy else None].append(target)
+    rounds = zip_longest(*by_proxy.values())
+    return [target for row in rounds for target in row if target is not None]
+
+
+class SessionValidator:
+    """Validates account sessions and stores results in batches
+
+    At most `concurrency` checks run at once and at most `proxy_concurrency`
+    through the same proxy. Accounts without a proxy are bounded by the
+    global limit only.
+    """
+
+    def __init__(
+        self,
+        checker: Optional[SessionCheckFn] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        proxy_concurrency: int = DEFAULT_PROXY_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        session_factory: async_sessionmaker = async_session,
+        writer: StatusWriter = status_writer
+    ):
+        self.checker = checker or telethon_check
+        self.concurrency = max(1, concurrency)
+        self.proxy_concurrency = max(1, proxy_concurrency)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.session_factory = session_factory
+        self.writer = writer
+
+    async def mark_checking(self, selections: List[list]) -> List[CheckTarget]:
+        """Set status to checking for every selection, returns what to check"""
+        marked = []
+        async with self.session_factory() as session:
+            for conditions in selections:
+                # Previous statuses are restored for accounts that cannot be checked
+                result = await session.execute(
+                    select(Account.id, Account.status).where(*conditions, Account.status != "checking")
+                )
+                previous = dict(result.all())
+                ids = list(previous)
+                for i in range(0, len(ids), MARK_CHUNK_SIZE):
+                    result = await session.execute(
+                        update(Account)
+                        .where(Account.id.in_(ids[i:i + MARK_CHUNK_SIZE]))
+                        .values(status="checking")
+                        .returning(Account.id, Account.proxy_id),
+                        execution_options={"synchronize_session": False}
+                    )
+                    marked.extend((*row, previous[row[0]]) for row in result.all())
+
+            proxy_ids = {proxy_id for _, proxy_id, _ in marked if proxy_id is not None}
+            proxies = {}
+            if proxy_ids:
+                result = await session.execute(select(Proxy).where(Proxy.id.in_(proxy_ids)))
+                proxies = {proxy.id: proxy for proxy in result.scalars()}
+            await session.commit()
+
+        targets = [
+            CheckTarget(account_id, proxies.get(proxy_id), previous_status)
+            for account_id, proxy_id, previous_status in marked
+        ]
+        ids = [t.id for t in targets]
+        account_index.set_status(ids, "checking")
+        status_stream.publish_ids(ids, status="checking")
+        return targets
+
+    async def run(self, targets: List[CheckTarget], progress: Optional[Progress] = None):
+        """Check all targets, returns once every result is committed"""
+        pending = iter(_interleave(targets))
+        proxy_slots: Dict[int, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.proxy_concurrency))
+        checked = set()
+
+        async def worker():
+            for target in pending:
+                if target.proxy is not None:
+                    async with proxy_slots[target.proxy.id]:
+                        row = await self._check(target, progress)
+                else:
+                    row = await self._check(target, progress)
+                self.writer.update(Account, target.id, **row)
+                checked.add(target.id)
+
+                if progress:
+                    progress.done += 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(targets)) or 1)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            # A cancelled or failed run leaves no account in checking
+            for target in targets:
+                if target.id not in checked:
+                    self.writer.update(Account, target.id, status=target.previous_status)
+            await self.writer.flush()
+
+    async def _check(self, target: CheckTarget, progress: Optional[Progress]) -> dict:
+        """Check one account with retries, returns its new column values"""
+        for attempt in range(self.retries + 1):
+            try:
+                outcome = await self.checker(target)
+                break
+            except TransientCheckError as e:
+                if attempt == self.retries or (e.retry_after or 0) > MAX_RETRY_AFTER:
+                    return self._failed(target, progress, str(e))
+                delay = e.retry_after or self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                if progress:
+                    progress.add("retries")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                return self._failed(target, progress, str(e) or type(e).__name__)
+
+        row = {"status": outcome["status"], "last_checked_at": datetime.utcnow()}
+        row.update({c: outcome[c] for c in PROFILE_COLUMNS if outcome.get(c) is not None})
+        if progress:
+            progress.add(outcome["status"])
+        return row
+
+    @staticmethod
+    def _failed(target: CheckTarget, progress: Optional[Progress], message: str) -> dict:
+        if progress:
+            progress.error(f"account {target.id}", message)
+        return {"status": target.previous_status}
+
+
+async def reset_stale_checks():
+    """Accounts left in checking by a crash go back to unchecked"""
+    async with async_session() as session:
+        result = await session.execute(
+            update(Account).where(Account.status == "checking").values(status="unchecked")
+            .returning(Account.id),
+            execution_options={"synchronize_session": False}
+        )
+        ids = result.scalars().all()
+        await session.commit()
+    if ids:
+        print(f"[Backend] Reset {len(ids)} accounts left in checking")
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import zipfile
+from itertools import islice
+from typing import Optional, List, Iterator, Tuple, Union
+
+from fastapi import UploadFile
+from sqlalchemy import select, or_, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Account, AccountSession
+from services.account_index import account_index
+from services.progress import Progress
+from services.status_stream import status_stream
+
+# Lookups bind two parameters per row, stay under SQLite's limit of 999
+UPSERT_BATCH_SIZE = 400
+
+# Profile columns written by imports, existing values are kept when the
+# imported value is missing. So is the session string, stored apart.
+PROFILE_COLUMNS = ("telegram_id", "phone", "username", "first_name", "last_name")
+
+# Keys used by Telethon / Pyrogram session exports for each column
+SESSION_KEYS = {
+    "telegram_id": ("user_id", "telegram_id", "id"),
+    "phone": ("phone", "phone_number"),
+    "username": ("username",),
+    "first_name": ("first_name",),
+    "last_name": ("last_name",),
+    "session_string": ("session_string", "string_session", "session"),
+}
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+SessionItem = Tuple[str, Union[dict, Exception]]
+
+
+def normalize_phone(phone) -> Optional[str]:
+    digits = "".join(ch for ch in str(phone) if ch.isdigit()) if phone else ""
+    return digits or None
+
+
+def parse_session(data) -> dict:
+    """Map a session JSON object to account columns"""
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+
+    row = {}
+    for column, keys in SESSION_KEYS.items():
+        value = next((data[k] for k in keys if data.get(k) not in (None, "")), None)
+        row[column] = value
+
+    if row["telegram_id"] is not None:
+        try:
+            row["telegram_id"] = int(row["telegram_id"])
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid user id {row['telegram_id']!r}")
+    row["phone"] = normalize_phone(row["phone"])
+    if not isinstance(row["session_string"], str):
+        row["session_string"] = None
+
+    if row["telegram_id"] is None and row["phone"] is None:
+        raise ValueError("session has neither user id nor phone")
+    return row
+
+
+def _parse_json(name: str, raw: bytes) -> SessionItem:
+    try:
+        return name, parse_session(json.loads(raw))
+    except (ValueError, UnicodeDecodeError) as e:
+        return name, e
+
+
+def iter_session_files(file: UploadFile) -> Iterator[SessionItem]:
+    """Yield (item name, parsed row or error) for each session in an upload
+
+    Accepts a zip of *.json session files, a JSONL file with one session
+    per line, or a single JSON session. Zip members and lines are read
+    one at a time from the spooled upload.
+    """
+    upload = file.file
+    upload.seek(0)
+    magic = upload.read(4)
+    upload.seek(0)
+
+    if magic == ZIP_MAGIC:
+        with zipfile.ZipFile(upload) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".json"):
+                    continue
+                try:
+                    raw = archive.read(info)
+                except (zipfile.BadZipFile, OSError) as e:
+                    yield info.filename, e
+                    continue
+                yield _parse_json(info.filename, raw)
+        return
+
+    filename = file.filename or "upload"
+    if filename.lower().endswith(".json"):
+        yield _parse_json(filename, upload.read())
+        return
+
+    for number, line in enumerate(upload, start=1):
+        if line.strip():
+            yield _parse_json(f"{filename}:{number}", line)
+
+
+def _merge_key(row: dict):
+    return ("telegram_id", row["telegram_id"]) if row["telegram_id"] is not None else ("phone", row["phone"])
+
+
+async def upsert_accounts(session: AsyncSession, rows: List[dict]) -> Tuple[int, int, list]:
+    """Insert or update accounts keyed on telegram_id, then phone
+
+    Existing accounts are resolved with one lookup per batch and written
+    together with new ones in a single INSERT ... ON CONFLICT(id) DO
+    UPDATE. Session strings are then written to account_sessions. Returns
+    (created, updated, written) where `written` holds the (id, status,
+    group_id) of every upserted account.
+    """
+    # Later duplicates in the same batch win
+    merged, sessions = {}, {}
+    for row in rows:
+        key = _merge_key(row)
+        merged[key] = {column: row.get(column) for column in PROFILE_COLUMNS}
+        sessions[key] = row.get("session_string")
+    rows = list(merged.values())
+
+    telegram_ids = [r["telegram_id"] for r in rows if r["telegram_id"] is not None]
+    phones = [r["phone"] for r in rows if r["phone"] is not None]
+    result = await session.execute(
+        select(Account.id, Account.telegram_id, Account.phone).where(or_(
+            Account.telegram_id.in_(telegram_ids),
+            Account.phone.in_(phones)
+        ))
+    )
+    by_telegram_id, by_phone = {}, {}
+    for account_id, telegram_id, phone in result.all():
+        if telegram_id is not None:
+            by_telegram_id[telegram_id] = account_id
+        if phone is not None:
+            by_phone.setdefault(phone, (account_id, telegram_id))
+
+    created = updated = 0
+    for row in rows:
+        account_id = by_telegram_id.get(row["telegram_id"])
+        if account_id is None and row["phone"] in by_phone:
+            # Match by phone only when it cannot belong to another Telegram user
+            phone_id, phone_telegram_id = by_phone[row["phone"]]
+            if phone_telegram_id is None or row["telegram_id"] is None:
+                account_id = phone_id
+        row["id"] = account_id
+        if account_id is None:
+            created += 1
+        else:
+            updated += 1
+
+    table = Account.__table__
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={c: func.coalesce(statement.excluded[c], table.c[c]) for c in PROFILE_COLUMNS}
+    ).returning(table.c.id, table.c.status, table.c.group_id, table.c.telegram_id, table.c.phone)
+    result = await session.execute(statement, rows)
+
+    written, session_rows = [], []
+    for account_id, status, group_id, telegram_id, phone in result.all():
+        written.append((account_id, status, group_id))
+        # RETURNING order is not guaranteed, rows are matched back by their merge key
+        key = ("telegram_id", telegram_id) if ("telegram_id", telegram_id) in sessions else ("phone", phone)
+        if sessions.get(key):
+            session_rows.append({"account_id": account_id, "session_string": sessions[key]})
+    if session_rows:
+        statement = insert(AccountSession)
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[AccountSession.account_id],
+            set_={"session_string": statement.excluded.session_string}
+        ), session_rows)
+
+    return created, updated, written
+
+
+class SessionImporter:
+    """Imports parsed sessions in batches, recording progress and errors"""
+
+    def __init__(self, session: AsyncSession, progress: Progress, batch_size: int = UPSERT_BATCH_SIZE):
+        self.session = session
+        self.progress = progress
+        self.batch_size = batch_size
+        self.batch: List[dict] = []
+
+    async def run(self, items: Iterator[SessionItem]):
+        """Import all items, reading and parsing them in a thread a batch at a time"""
+        items = iter(items)
+        while True:
+            chunk = await asyncio.to_thread(list, islice(items, self.batch_size))
+            if not chunk:
+                break
+            for name, item in chunk:
+                self.progress.done += 1
+                if isinstance(item, Exception):
+                    self.progress.error(name, str(item))
+                    continue
+                await self.add(item)
+
+        await self.flush()
+
+    async def add(self, row: dict):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        created, updated, written = await upsert_accounts(self.session, batch)
+        await self.session.commit()
+        account_index.add(written)
+        status_stream.publish({"id": account_id, "status": status} for account_id, status, _ in written)
+        self.progress.add("created", created)
+        self.progress.add("updated", updated)
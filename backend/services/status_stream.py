@@ -0,0 +1,133 @@
+import asyncio
+import json
+from collections import deque
+from itertools import islice
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Changes published within this window are merged into one frame
+FLUSH_INTERVAL = 0.25
+# Frames kept for clients resuming with a sequence number
+BUFFER_SIZE = 1000
+# Comment line sent to idle streams so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15.0
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+class StatusStream:
+    """Coalesces account changes into numbered frames for streaming clients
+
+    Writers publish changed fields per account id. Changes are merged per
+    account and flushed as one frame every `interval` seconds into a ring
+    buffer shared by all subscribers, so a frame is serialized once however
+    many clients are connected. A client that reconnects with the last
+    sequence number it saw gets the frames it missed, or a reset when they
+    have already left the buffer.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, buffer_size: int = BUFFER_SIZE):
+        self.interval = interval
+        self.seq = 0
+        self._frames = deque(maxlen=buffer_size)
+        self._pending: Dict[int, dict] = {}
+        self._has_pending = asyncio.Event()
+        self._new_frame = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            # Bound to the running loop
+            self._has_pending = asyncio.Event()
+            if self._pending:
+                self._has_pending.set()
+            self._new_frame = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def publish(self, changes: Iterable[dict]):
+        """Queue changes, each a dict with the account `id` and changed fields"""
+        for change in changes:
+            self._pending.setdefault(change["id"], {}).update(change)
+        if self._pending:
+            self._has_pending.set()
+
+    def publish_ids(self, ids: Iterable[int], **fields):
+        """Queue the same field values for many accounts"""
+        self.publish({"id": account_id, **fields} for account_id in ids)
+
+    def flush(self):
+        if not self._pending:
+            return
+        changes, self._pending = list(self._pending.values()), {}
+        self._has_pending.clear()
+        self.seq += 1
+        # Serialized once, shared by every subscriber
+        event = sse_event("changes", {"seq": self.seq, "changes": changes}, self.seq)
+        self._frames.append((self.seq, event))
+        # Wake every subscriber waiting for this frame
+        self._new_frame.set()
+        self._new_frame = asyncio.Event()
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def frames_after(self, seq: int) -> Optional[List[tuple]]:
+        """Frames newer than `seq`, None when some of them were dropped"""
+        if seq > self.seq:
+            # Sequence from before a restart
+            return None
+        if seq == self.seq:
+            return []
+        oldest = self._frames[0][0] if self._frames else self.seq + 1
+        if seq + 1 < oldest:
+            return None
+        return list(islice(self._frames, seq + 1 - oldest, None))
+
+    async def subscribe(self, since: Optional[int] = None):
+        """Yield server-sent events, starting after frame `since`"""
+        seq = self.seq if since is None else since
+        yield sse_event("hello", {"seq": self.seq})
+
+        while True:
+            frames = self.frames_after(seq)
+            if frames is None:
+                # Missed frames are gone (slow reader or stale sequence),
+                # the client has to reload the account list
+                seq = self.seq
+                yield sse_event("reset", {"seq": seq}, seq)
+                continue
+
+            for frame_seq, event in frames:
+                yield event
+                seq = frame_seq
+
+            if seq == self.seq:
+                try:
+                    await asyncio.wait_for(self._new_frame.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+
+
+status_stream = StatusStream()
@@ -0,0 +1,158 @@
+"""Write-behind buffer for high-frequency status columns
+
+Checkers and clients report status changes with `update()`, which only
+merges the values into a pending row and returns. Pending rows are
+written in one transaction every `interval` seconds, or sooner once
+`max_pending` rows are waiting, so hundreds of concurrent writers share
+one commit instead of queueing on SQLite's single writer for their own.
+
+Later values for the same row replace earlier ones, only the last state
+of a row within a flush is written. Account status changes are published
+to the account index and the status stream after they are committed.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.database import async_session
+from database.models import Account, Proxy
+from services.account_index import account_index
+from services.status_stream import status_stream
+
+# Seconds between flushes
+FLUSH_INTERVAL = 0.1
+# Pending rows that trigger a flush before the interval ends
+MAX_PENDING = 1000
+
+# Columns accepted per model
+WRITABLE_COLUMNS = {
+    Account: {"status", "last_checked_at", "last_used_at", "username", "first_name", "last_name"},
+    Proxy: {"status", "latency_ms", "last_checked_at"}
+}
+
+# Account columns sent to status stream subscribers
+STREAMED_COLUMNS = ("status", "last_checked_at")
+
+
+def update_statement(model: Type, columns: tuple):
+    """Core UPDATE by `row_id` for executemany, rows deleted since are skipped"""
+    table = model.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values({c: bindparam(c) for c in columns})
+    )
+
+
+class StatusWriter:
+    def __init__(
+        self,
+        interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING,
+        session_factory: async_sessionmaker = async_session
+    ):
+        self.interval = interval
+        self.max_pending = max(1, max_pending)
+        self.session_factory = session_factory
+        self.stats = {"updates": 0, "rows": 0, "flushes": 0}
+
+        self._pending: Dict[Tuple[Type, int], dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            # Bound to the running loop
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write what is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def update(self, model: Type, row_id: int, **values):
+        """Queue new column values for a row of Account or Proxy"""
+        unknown = values.keys() - WRITABLE_COLUMNS[model]
+        if unknown:
+            raise ValueError(f"Not writable through StatusWriter: {', '.join(sorted(unknown))}")
+
+        self._pending.setdefault((model, row_id), {}).update(values)
+        self.stats["updates"] += 1
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Write pending rows in one transaction"""
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        by_columns: Dict[Tuple[Type, tuple], List[dict]] = defaultdict(list)
+        for (model, row_id), values in pending.items():
+            by_columns[(model, tuple(sorted(values)))].append({"row_id": row_id, **values})
+
+        try:
+            async with self.session_factory() as session:
+                for (model, columns), rows in by_columns.items():
+                    await session.execute(update_statement(model, columns), rows)
+                await session.commit()
+        except Exception:
+            # Keep the rows for the next flush, newer values win
+            for key, row in pending.items():
+                self._pending[key] = {**row, **self._pending.get(key, {})}
+            raise
+
+        self.stats["rows"] += len(pending)
+        self.stats["flushes"] += 1
+        self._publish(pending)
+
+    @staticmethod
+    def _publish(pending: Dict[Tuple[Type, int], dict]):
+        by_status = defaultdict(list)
+        changes = []
+        for (model, row_id), values in pending.items():
+            if model is not Account:
+                continue
+            if "status" in values:
+                by_status[values["status"]].append(row_id)
+            change = {k: values[k] for k in STREAMED_COLUMNS if k in values}
+            if change:
+                changes.append({"id": row_id, **change})
+        for status, ids in by_status.items():
+            account_index.set_status(ids, status)
+        status_stream.publish(changes)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                # Not interrupted by stop(), which flushes after it
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                print(f"[Backend] Failed to write status updates: {e}")
+
+
+status_writer = StatusWriter()
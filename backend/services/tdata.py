@@ -0,0 +1,336 @@
+"""Telegram Desktop tdata decoding
+
+A tdata folder keeps an encrypted local key in `key_datas` and one
+encrypted MTProto authorization file per account. Decoding derives the
+passcode key (PBKDF2-SHA512), decrypts the local key and account list
+with AES-256-IGE, then reads the user id and per-DC auth keys from which
+a Telethon session string is built.
+
+Decoding is CPU-bound, so archives are decoded in a process pool from
+member bytes read straight out of the uploaded zip. Telethon is imported
+on first use, it is not needed to start the backend.
+"""
+import asyncio
+import hashlib
+import os
+import posixpath
+import struct
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Iterator, Tuple
+
+from services.progress import Progress
+
+TDF_MAGIC = b"TDF$"
+TDF_VERSION = 4000000
+
+DATA_NAME = "data"
+KEY_FILE = "key_" + DATA_NAME
+FILE_SUFFIXES = ("s", "1", "0")
+
+DBI_MTP_AUTHORIZATION = 0x4B
+AUTH_KEY_SIZE = 256
+STRONG_ITERATIONS = 100000
+
+# Production DC addresses used for the generated Telethon sessions
+DC_ADDRESSES = {
+    1: "149.154.175.53",
+    2: "149.154.167.51",
+    3: "149.154.175.100",
+    4: "149.154.167.91",
+    5: "91.108.56.130",
+}
+DC_PORT = 443
+
+# Largest top-level tdata file that is read, settings and auth files are tiny
+MAX_MEMBER_SIZE = 1024 * 1024
+
+# One worker per core, less the one the event loop runs on
+POOL_SIZE = max(1, (os.cpu_count() or 1) - 1)
+
+
+class TdataError(ValueError):
+    pass
+
+
+class _QtStream:
+    """Reader for QDataStream (big-endian) serialized data"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise TdataError("unexpected end of data")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def int32(self) -> int:
+        return struct.unpack(">i", self.read(4))[0]
+
+    def uint64(self) -> int:
+        return struct.unpack(">Q", self.read(8))[0]
+
+    def bytearray(self) -> bytes:
+        size = struct.unpack(">I", self.read(4))[0]
+        return b"" if size == 0xFFFFFFFF else self.read(size)
+
+
+def _qt_bytearray(data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + data
+
+
+def file_part(data_name: str) -> str:
+    """File name tdesktop derives from a data name, e.g. data -> D877F783D5D3EF8C"""
+    digest = hashlib.md5(data_name.encode()).digest()[:8]
+    return "".join(f"{b & 0x0F:X}{b >> 4:X}" for b in digest)
+
+
+def account_data_name(index: int) -> str:
+    return DATA_NAME if index == 0 else f"{DATA_NAME}#{index + 1}"
+
+
+def read_tdf(raw: bytes) -> bytes:
+    """Validate a TDF$ container and return its payload"""
+    if len(raw) < 24 or raw[:4] != TDF_MAGIC:
+        raise TdataError("not a TDF file")
+    version, data, checksum = raw[4:8], raw[8:-16], raw[-16:]
+    expected = hashlib.md5(data + struct.pack("<i", len(data)) + version + TDF_MAGIC).digest()
+    if checksum != expected:
+        raise TdataError("TDF checksum mismatch")
+    return data
+
+
+def write_tdf(data: bytes, version: int = TDF_VERSION) -> bytes:
+    version_bytes = struct.pack("<i", version)
+    checksum = hashlib.md5(data + struct.pack("<i", len(data)) + version_bytes + TDF_MAGIC).digest()
+    return TDF_MAGIC + version_bytes + data + checksum
+
+
+def create_local_key(passcode: bytes, salt: bytes) -> bytes:
+    hash_key = hashlib.sha512(salt + passcode + salt).digest()
+    iterations = STRONG_ITERATIONS if passcode else 1
+    return hashlib.pbkdf2_hmac("sha512", hash_key, salt, iterations, AUTH_KEY_SIZE)
+
+
+def _aes_key_iv(auth_key: bytes, msg_key: bytes) -> Tuple[bytes, bytes]:
+    # MTProto 1.0 key derivation, local storage always uses the x = 8 offset
+    x = 8
+    sha_a = hashlib.sha1(msg_key + auth_key[x:x + 32]).digest()
+    sha_b = hashlib.sha1(auth_key[x + 32:x + 48] + msg_key + auth_key[x + 48:x + 64]).digest()
+    sha_c = hashlib.sha1(auth_key[x + 64:x + 96] + msg_key).digest()
+    sha_d = hashlib.sha1(msg_key + auth_key[x + 96:x + 128]).digest()
+    aes_key = sha_a[:8] + sha_b[8:20] + sha_c[4:16]
+    aes_iv = sha_a[8:20] + sha_b[:8] + sha_c[16:20] + sha_d[:8]
+    return aes_key, aes_iv
+
+
+def decrypt_local(encrypted: bytes, key: bytes) -> bytes:
+    from telethon.crypto import AES
+
+    if len(encrypted) <= 16 or (len(encrypted) - 16) % 16:
+        raise TdataError("bad encrypted data size")
+    msg_key = encrypted[:16]
+    decrypted = AES.decrypt_ige(encrypted[16:], *_aes_key_iv(key, msg_key))
+    if hashlib.sha1(decrypted).digest()[:16] != msg_key:
+        raise TdataError("wrong passcode or corrupted data")
+    length = struct.unpack("<I", decrypted[:4])[0]
+    if length > len(decrypted) or length < 4:
+        raise TdataError("bad decrypted data length")
+    return decrypted[4:length]
+
+
+def encrypt_local(data: bytes, key: bytes) -> bytes:
+    from telethon.crypto import AES
+
+    payload = struct.pack("<I", len(data) + 4) + data
+    payload += os.urandom(-len(payload) % 16)
+    msg_key = hashlib.sha1(payload).digest()[:16]
+    return msg_key + AES.encrypt_ige(payload, *_aes_key_iv(key, msg_key))
+
+
+def _read_file(files: Dict[str, bytes], name: str) -> bytes:
+    for suffix in FILE_SUFFIXES:
+        raw = files.get(name + suffix)
+        if raw is not None:
+            return read_tdf(raw)
+    raise TdataError(f"missing {name}s")
+
+
+def _session_string(dc_id: int, auth_key: bytes) -> str:
+    from telethon.crypto import AuthKey
+    from telethon.sessions import StringSession
+
+    if dc_id not in DC_ADDRESSES:
+        raise TdataError(f"unknown DC {dc_id}")
+    session = StringSession()
+    session.set_dc(dc_id, DC_ADDRESSES[dc_id], DC_PORT)
+    session.auth_key = AuthKey(auth_key)
+    return session.save()
+
+
+def _read_authorization(data: bytes) -> Tuple[int, int, Dict[int, bytes]]:
+    stream = _QtStream(data)
+    if stream.int32() != DBI_MTP_AUTHORIZATION:
+        raise TdataError("no MTProto authorization in account file")
+    serialized = _QtStream(stream.bytearray())
+
+    user_id, main_dc_id = serialized.int32(), serialized.int32()
+    if user_id == -1 and main_dc_id == -1:
+        # Wide ids tag, 64-bit user id follows
+        user_id, main_dc_id = serialized.uint64(), serialized.int32()
+
+    keys = {}
+    for _ in range(serialized.int32()):
+        dc_id = serialized.int32()
+        keys[dc_id] = serialized.read(AUTH_KEY_SIZE)
+    return user_id, main_dc_id, keys
+
+
+def decode_tdata(files: Dict[str, bytes], passcode: bytes = b"") -> List[dict]:
+    """Decode the top-level files of one tdata folder into account rows
+
+    Runs in a worker process, so it takes and returns plain data only.
+    """
+    key_data = _QtStream(_read_file(files, KEY_FILE))
+    salt = key_data.bytearray()
+    key_encrypted = key_data.bytearray()
+    info_encrypted = key_data.bytearray()
+
+    local_key = decrypt_local(key_encrypted, create_local_key(passcode, salt))[:AUTH_KEY_SIZE]
+    info = _QtStream(decrypt_local(info_encrypted, local_key))
+    indices = [info.int32() for _ in range(info.int32())]
+
+    rows = []
+    for index in indices:
+        encrypted = _QtStream(_read_file(files, file_part(account_data_name(index)))).bytearray()
+        user_id, main_dc_id, keys = _read_authorization(decrypt_local(encrypted, local_key))
+        if main_dc_id not in keys:
+            raise TdataError(f"no auth key for main DC {main_dc_id}")
+        rows.append({
+            "telegram_id": user_id,
+            "session_string": _session_string(main_dc_id, keys[main_dc_id])
+        })
+    return rows
+
+
+def build_tdata(accounts: List[Tuple[int, int, bytes]], passcode: bytes = b"") -> Dict[str, bytes]:
+    """Build the files of a tdata folder for (user_id, dc_id, auth_key) accounts
+
+    Counterpart of decode_tdata, used for fixtures and benchmarks.
+    """
+    salt = os.urandom(32)
+    local_key = os.urandom(AUTH_KEY_SIZE)
+    info = struct.pack(">i", len(accounts)) + b"".join(struct.pack(">i", i) for i in range(len(accounts)))
+    key_data = (
+        _qt_bytearray(salt)
+        + _qt_bytearray(encrypt_local(local_key, create_local_key(passcode, salt)))
+        + _qt_bytearray(encrypt_local(info, local_key))
+    )
+    files = {KEY_FILE + "s": write_tdf(key_data)}
+
+    for index, (user_id, dc_id, auth_key) in enumerate(accounts):
+        serialized = struct.pack(">iiQi", -1, -1, user_id, dc_id)
+        serialized += struct.pack(">i", 1) + struct.pack(">i", dc_id) + auth_key
+        serialized += struct.pack(">i", 0)  # keys to destroy
+        data = struct.pack(">i", DBI_MTP_AUTHORIZATION) + _qt_bytearray(serialized)
+        name = file_part(account_data_name(index)) + "s"
+        files[name] = write_tdf(_qt_bytearray(encrypt_local(data, local_key)))
+
+    return files
+
+
+def _is_tdata_file(name: str) -> bool:
+    base, suffix = name[:-1], name[-1:]
+    if suffix not in FILE_SUFFIXES:
+        return False
+    return base == KEY_FILE or (len(base) == 16 and all(c in "0123456789ABCDEF" for c in base))
+
+
+def iter_tdata_folders(archive: zipfile.ZipFile) -> Iterator[Tuple[str, Dict[str, bytes]]]:
+    """Yield (folder, files) for every tdata folder in an archive
+
+    A folder is any directory holding key_datas. Only its top-level key
+    and account files are read, straight from the zip into memory.
+    """
+    folders: Dict[str, List[zipfile.ZipInfo]] = {}
+    roots = set()
+    for info in archive.infolist():
+        if info.is_dir() or info.file_size > MAX_MEMBER_SIZE:
+            continue
+        folder, name = posixpath.split(info.filename)
+        if _is_tdata_file(name):
+            folders.setdefault(folder, []).append(info)
+            if name.startswith(KEY_FILE):
+                roots.add(folder)
+
+    for folder in sorted(roots):
+        files = {posixpath.basename(i.filename): archive.read(i) for i in folders[folder]}
+        yield folder or "tdata", files
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=POOL_SIZE)
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the decoder processes without blocking the event loop"""
+    global _executor
+    if _executor is not None:
+        # Queued decodes are dropped, a running one finishes in the background
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def decode_archive(
+    archive: zipfile.ZipFile,
+    passcode: bytes,
+    progress: Progress,
+    executor: Optional[ProcessPoolExecutor] = None,
+    max_in_flight: int = 2 * POOL_SIZE
+):
+    """Decode every tdata folder of an archive on the process pool
+
+    Yields account rows as folders finish. Members are read in a thread,
+    overlapping with decoding, with a bounded number of folders in flight.
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor or get_executor()
+    pending = {}
+
+    async def drain(return_when):
+        done, _ = await asyncio.wait(pending, return_when=return_when)
+        for future in done:
+            folder = pending.pop(future)
+            progress.done += 1
+            try:
+                rows = future.result()
+            except Exception as e:
+                progress.error(folder, str(e))
+                continue
+            for row in rows:
+                yield row
+
+    folders = iter_tdata_folders(archive)
+    while True:
+        entry = await asyncio.to_thread(next, folders, None)
+        if entry is None:
+            break
+        folder, files = entry
+        future = loop.run_in_executor(executor, decode_tdata, files, passcode)
+        pending[future] = folder
+        if len(pending) >= max_in_flight:
+            async for row in drain(asyncio.FIRST_COMPLETED):
+                yield row
+
+    while pending:
+        async for row in drain(asyncio.ALL_COMPLETED):
+            yield row
@@ -0,0 +1,166 @@
+"""Account index filters agree with the SQL filters they stand in for"""
+import asyncio
+import itertools
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import delete, insert, select, update
+
+import api.accounts
+from api.router import include_api
+from database.database import async_session, close_db, init_db, read_session
+from database.models import Account, AccountGroup, AccountTag, account_tags
+from services.account_index import AccountIndex
+from services.account_selection import account_filters
+
+STATUSES = ["valid", "banned", "unchecked"]
+GROUPS = [1, 2, 3]
+TAGS = [1, 2]
+
+
+async def _reset(accounts=60):
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(account_tags))
+        await session.execute(delete(Account))
+        await session.execute(delete(AccountGroup))
+        await session.execute(delete(AccountTag))
+        await session.execute(insert(AccountGroup), [{"id": i, "name": f"group {i}"} for i in GROUPS])
+        await session.execute(insert(AccountTag), [{"id": i, "name": f"tag {i}"} for i in TAGS])
+        await session.execute(insert(Account), [
+            {"id": i, "phone": f"7900{i:07d}", "status": STATUSES[i % 3],
+             "group_id": GROUPS[i % 4] if i % 4 < 3 else None}
+            for i in range(1, accounts + 1)
+        ])
+        await session.execute(insert(account_tags), [
+            {"account_id": i, "tag_id": tag_id}
+            for i in range(1, accounts + 1) for tag_id in TAGS if i % (tag_id + 1) == 0
+        ])
+        await session.commit()
+
+
+async def _mismatches(index: AccountIndex) -> list:
+    """Filter combinations where the index and SQL disagree"""
+    mismatches = []
+    async with read_session() as session:
+        combinations = itertools.product([None, *STATUSES, "spamblock"], [None, *GROUPS, 99], [None, *TAGS, 99])
+        for status, group_id, tag_id in combinations:
+            result = await session.execute(
+                select(Account.id).where(*account_filters(status, group_id, tag_id)).order_by(Account.id)
+            )
+            expected = result.scalars().all()
+            found = index.page(index.query(status, group_id, tag_id), 0, 1000)
+            if found != expected:
+                mismatches.append(((status, group_id, tag_id), found, expected))
+    return mismatches
+
+
+class InterleavedSession:
+    """Runs one write after each load query of an index build"""
+
+    def __init__(self, session, writes):
+        self.session = session
+        self.writes = list(writes)
+
+    async def execute(self, *args, **kwargs):
+        result = await self.session.execute(*args, **kwargs)
+        if self.writes:
+            await self.writes.pop(0)()
+        return result
+
+
+def test_index_matches_sql_filters():
+    async def scenario():
+        await _reset()
+        try:
+            index = AccountIndex()
+            async with read_session() as session:
+                await index.build(session)
+            return await _mismatches(index)
+        finally:
+            await close_db()
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_writes_during_the_build_are_replayed():
+    index = AccountIndex()
+
+    async def write(statement, apply):
+        # As the write paths do: commit, then update the index
+        async with async_session() as session:
+            await session.execute(statement)
+            await session.commit()
+        apply()
+
+    async def after_status_load():
+        # Already loaded, only the journal has it
+        await write(update(Account).where(Account.id.in_([3, 6])).values(status="spamblock"),
+                    lambda: index.set_status([3, 6], "spamblock"))
+        # Not loaded yet, the load sees it and the replay changes nothing
+        await write(update(Account).where(Account.id == 5).values(group_id=1),
+                    lambda: index.set_group([5], 1))
+
+    async def after_group_load():
+        await write(insert(Account).values(id=61, phone="79000000061", status="valid", group_id=2),
+                    lambda: index.add([(61, "valid", 2)]))
+        await write(delete(Account).where(Account.id == 4), lambda: index.remove([4]))
+        await write(insert(account_tags).values(account_id=61, tag_id=1), lambda: index.add_tags([(61, 1)]))
+
+    async def after_tag_load():
+        await write(delete(account_tags).where(account_tags.c.account_id == 2),
+                    lambda: index.remove_tags([(2, 1)]))
+
+    async def scenario():
+        await _reset()
+        try:
+            async with read_session() as session:
+                await index.build(InterleavedSession(session, [after_status_load, after_group_load, after_tag_load]))
+            return await _mismatches(index)
+        finally:
+            await close_db()
+
+    assert asyncio.run(scenario()) == []
+    assert index.ready
+
+
+def test_list_endpoint_reapplies_filters_to_index_pages(monkeypatch):
+    app = FastAPI()
+    include_api(app)
+
+    async def pages(client, **params):
+        ids, cursor = [], None
+        while True:
+            response = await client.get("/api/accounts", params={**params, **({"cursor": cursor} if cursor else {})})
+            body = response.json()
+            ids.extend(row["id"] for row in body["data"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids
+
+    async def scenario():
+        await _reset()
+        try:
+            index = AccountIndex()
+            async with read_session() as session:
+                await index.build(session)
+            monkeypatch.setattr(api.accounts, "account_index", index)
+            # Committed without telling the index
+            async with async_session() as session:
+                await session.execute(update(Account).where(Account.id <= 30).values(status="banned"))
+                await session.commit()
+            async with read_session() as session:
+                result = await session.execute(
+                    select(Account.id).where(*account_filters("valid", 1)).order_by(Account.id)
+                )
+                expected = result.scalars().all()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                found = await pages(client, status="valid", group_id=1, limit=2)
+            return found, expected
+        finally:
+            await close_db()
+
+    found, expected = asyncio.run(scenario())
+
+    assert expected and found == expected
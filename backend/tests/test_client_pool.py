@@ -0,0 +1,233 @@
+"""Client pool reuse, eviction and shutdown with stub clients"""
+import asyncio
+
+import pytest
+
+from database.models import Proxy
+from services.client_pool import ClientPool, ClientPoolFull
+
+
+class StubClient:
+    def __init__(self, session_string, proxy, fail_connect=False):
+        self.session_string = session_string
+        self.proxy = proxy
+        self.fail_connect = fail_connect
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def connect(self):
+        await asyncio.sleep(0)
+        if self.fail_connect:
+            raise OSError("unreachable")
+        self.connected = True
+        self.connects += 1
+
+    async def disconnect(self):
+        self.connected = False
+        self.disconnects += 1
+
+
+class StubFactory:
+    """Builds stub clients and keeps every one it built"""
+
+    def __init__(self, fail_sessions=()):
+        self.built = []
+        self.fail_sessions = set(fail_sessions)
+
+    def __call__(self, session_string, proxy):
+        client = StubClient(session_string, proxy, session_string in self.fail_sessions)
+        self.built.append(client)
+        return client
+
+
+def _proxy(host):
+    return Proxy(type="socks5", host=host, port=1080)
+
+
+def test_idle_client_is_reused():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory)
+        async with pool.client(1, "session") as first:
+            pass
+        async with pool.client(1, "session") as second:
+            pass
+        return pool, first, second
+
+    pool, first, second = asyncio.run(scenario())
+
+    assert first is second and len(factory.built) == 1
+    assert first.connects == 1 and first.disconnects == 0
+    assert pool.stats["connects"] == 1 and pool.stats["reuses"] == 1
+
+
+def test_concurrent_users_share_one_client():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory)
+
+        async def use():
+            async with pool.client(1, "session") as client:
+                await asyncio.sleep(0.01)
+                return client
+
+        return await asyncio.gather(*(use() for _ in range(5)))
+
+    clients = asyncio.run(scenario())
+
+    assert len({id(client) for client in clients}) == 1
+    assert clients[0].connects == 1
+
+
+def test_least_recently_used_idle_client_is_evicted():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory, max_open=2)
+        for account_id in (1, 2, 1):
+            async with pool.client(account_id, f"session-{account_id}"):
+                pass
+        async with pool.client(3, "session-3"):
+            pass
+        return pool
+
+    pool = asyncio.run(scenario())
+
+    first, second, third = factory.built
+    # Account 1 was used after account 2, so 2 went first
+    assert second.disconnects == 1
+    assert first.connected and third.connected
+    assert pool.open_count == 2 and pool.stats["evictions"] == 1
+
+
+def test_full_pool_waits_for_a_release():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory, max_open=1, acquire_timeout=1.0)
+        order = []
+
+        async def hold():
+            async with pool.client(1, "session-1"):
+                order.append("held")
+                await asyncio.sleep(0.05)
+            order.append("released")
+
+        async def wait():
+            await asyncio.sleep(0.01)
+            async with pool.client(2, "session-2"):
+                order.append("acquired")
+
+        await asyncio.gather(hold(), wait())
+        return order
+
+    assert asyncio.run(scenario()) == ["held", "released", "acquired"]
+    assert factory.built[0].disconnects == 1
+
+
+def test_full_pool_times_out_when_every_client_is_busy():
+    async def scenario():
+        pool = ClientPool(StubFactory(), max_open=1, acquire_timeout=0.05)
+        async with pool.client(1, "session-1"):
+            async with pool.client(2, "session-2"):
+                pass
+
+    with pytest.raises(ClientPoolFull):
+        asyncio.run(scenario())
+
+
+def test_proxy_change_replaces_the_client_after_its_last_user():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory)
+        async with pool.client(1, "session", _proxy("10.0.0.1")) as old:
+            async with pool.client(1, "session", _proxy("10.0.0.2")) as new:
+                # The old client is still in use by the outer block
+                assert old.disconnects == 0 and pool.open_count == 2
+        return pool, old, new
+
+    pool, old, new = asyncio.run(scenario())
+
+    assert old is not new
+    assert old.disconnects == 1 and new.connected
+    assert pool.open_count == 1
+
+
+def test_failed_connect_does_not_keep_the_client():
+    factory = StubFactory(fail_sessions={"broken"})
+
+    async def scenario():
+        pool = ClientPool(factory)
+        with pytest.raises(OSError):
+            async with pool.client(1, "broken"):
+                pass
+        return pool
+
+    pool = asyncio.run(scenario())
+
+    assert pool.open_count == 0
+    assert factory.built[0].disconnects == 1
+
+
+def test_discard_drops_the_client():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory)
+        async with pool.client(1, "session"):
+            pass
+        await pool.discard([1, 2])
+        return pool
+
+    pool = asyncio.run(scenario())
+
+    assert pool.open_count == 0 and factory.built[0].disconnects == 1
+
+
+def test_close_disconnects_every_client():
+    factory = StubFactory()
+
+    async def scenario():
+        pool = ClientPool(factory)
+        pool.start()
+        for account_id in (1, 2):
+            async with pool.client(account_id, f"session-{account_id}"):
+                pass
+        # Retired while in use, closed all the same
+        async with pool.client(3, "session-3", _proxy("10.0.0.1")):
+            async with pool.client(3, "session-3", _proxy("10.0.0.2")):
+                await pool.close()
+        return pool
+
+    pool = asyncio.run(scenario())
+
+    assert pool.open_count == 0
+    assert all(client.disconnects >= 1 and not client.connected for client in factory.built)
+
+
+def test_idle_clients_are_closed_by_the_reaper():
+    factory = StubFactory()
+
+    async def scenario():
+        # The reaper runs at least once a second
+        pool = ClientPool(factory, idle_timeout=0.1)
+        pool.start()
+        try:
+            async with pool.client(1, "session"):
+                pass
+            await asyncio.sleep(1.2)
+            return pool
+        finally:
+            await pool.close()
+
+    pool = asyncio.run(scenario())
+
+    assert pool.stats["idle_closed"] == 1
+    assert factory.built[0].disconnects == 1
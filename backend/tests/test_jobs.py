@@ -0,0 +1,201 @@
+"""Job engine scheduling with a fake executor"""
+import asyncio
+from collections import Counter
+
+from sqlalchemy import delete, insert, select
+
+from database.database import async_session, close_db, init_db
+from database.models import Account, Job, Proxy
+from services.jobs import JobEngine
+
+
+class FakeExecutor:
+    """Records running jobs, each job runs until its gate opens"""
+
+    def __init__(self):
+        self.started = []
+        self.running = Counter()
+        self.peak = Counter()
+        self.gates = {}
+
+    def gate(self, job_id) -> asyncio.Event:
+        return self.gates.setdefault(job_id, asyncio.Event())
+
+    def open_all(self):
+        for job_id in [job.id for job in self.started]:
+            self.gate(job_id).set()
+
+    async def __call__(self, job):
+        self.started.append(job)
+        keys = [("account", job.account_id), ("proxy", job.proxy_id)]
+        for key in keys:
+            self.running[key] += 1
+            self.peak[key] = max(self.peak[key], self.running[key])
+        try:
+            await self.gate(job.id).wait()
+        finally:
+            for key in keys:
+                self.running[key] -= 1
+        return {"ok": True}
+
+
+async def _reset(accounts=0, proxies=0):
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(Job))
+        await session.execute(delete(Account))
+        await session.execute(delete(Proxy))
+        if proxies:
+            await session.execute(insert(Proxy), [
+                {"id": i, "type": "socks5", "host": f"10.0.0.{i}", "port": 1080} for i in range(1, proxies + 1)
+            ])
+        if accounts:
+            await session.execute(insert(Account), [
+                {"id": i, "phone": f"7900{i:07d}", "status": "valid", "proxy_id": i % proxies + 1 if proxies else None}
+                for i in range(1, accounts + 1)
+            ])
+        await session.commit()
+
+
+async def _settle(condition, timeout=2.0):
+    """Let the workers run until `condition()` holds"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+async def _statuses():
+    async with async_session() as session:
+        result = await session.execute(select(Job.id, Job.status))
+        return dict(result.all())
+
+
+def test_account_and_proxy_caps():
+    async def scenario():
+        await _reset(accounts=6, proxies=1)
+        executor = FakeExecutor()
+        engine = JobEngine(executor, workers=8, account_limit=1, proxy_limit=2, flush_interval=0.01)
+        await engine.start()
+        try:
+            # Only account ids, the proxy comes from the account
+            jobs = await engine.submit_many([
+                {"kind": "test", "account_id": account_id} for account_id in (1, 1, 2, 3, 4, 5, 6)
+            ])
+            await _settle(lambda: len(executor.started) == 2)
+            await asyncio.sleep(0.02)
+            assert len(executor.started) == 2
+            while len(executor.started) < len(jobs):
+                executor.open_all()
+                await asyncio.sleep(0.01)
+            executor.open_all()
+            await _settle(lambda: all(job.status == "done" for job in jobs))
+        finally:
+            await engine.stop()
+            await close_db()
+        return jobs, executor
+
+    jobs, executor = asyncio.run(scenario())
+
+    assert {job.proxy_id for job in jobs} == {1}
+    assert executor.peak[("proxy", 1)] == 2
+    assert max(count for (scope, _), count in executor.peak.items() if scope == "account") == 1
+
+
+def test_explicit_proxy_wins_over_the_accounts():
+    async def scenario():
+        await _reset(accounts=1, proxies=2)
+        engine = JobEngine(FakeExecutor())
+        try:
+            return await engine.submit("test", account_id=1, proxy_id=2)
+        finally:
+            await close_db()
+
+    job = asyncio.run(scenario())
+
+    assert job.proxy_id == 2
+
+
+def test_higher_priority_runs_first():
+    async def scenario():
+        await _reset()
+        executor = FakeExecutor()
+        engine = JobEngine(executor, workers=1, flush_interval=0.01)
+        await engine.start()
+        try:
+            first = await engine.submit("test")
+            await _settle(lambda: executor.started)
+            low = await engine.submit("test", priority=1)
+            high = await engine.submit("test", priority=5)
+            while len(executor.started) < 3:
+                executor.open_all()
+                await asyncio.sleep(0.01)
+            executor.open_all()
+        finally:
+            await engine.stop()
+            await close_db()
+        return [job.id for job in executor.started], [first.id, high.id, low.id]
+
+    started, expected = asyncio.run(scenario())
+
+    assert started == expected
+
+
+def test_cancel_queued_and_running_jobs():
+    async def scenario():
+        await _reset()
+        executor = FakeExecutor()
+        engine = JobEngine(executor, workers=1, flush_interval=0.01)
+        await engine.start()
+        try:
+            running = await engine.submit("test")
+            queued = await engine.submit("test")
+            await _settle(lambda: executor.started)
+            assert (await engine.cancel(queued.id)).status == "cancelled"
+            assert (await engine.cancel(running.id)).status == "cancelled"
+            assert await engine.cancel(running.id) is None
+            await asyncio.sleep(0.05)
+            await engine.flush()
+            return [job.id for job in executor.started], running.id, await _statuses()
+        finally:
+            await engine.stop()
+            await close_db()
+
+    started, running_id, statuses = asyncio.run(scenario())
+
+    assert started == [running_id]
+    assert set(statuses.values()) == {"cancelled"}
+
+
+def test_jobs_resume_after_restart():
+    async def scenario():
+        await _reset()
+        executor = FakeExecutor()
+        engine = JobEngine(executor, workers=1, flush_interval=0.01)
+        await engine.start()
+        jobs = await engine.submit_many([{"kind": "test"} for _ in range(3)])
+        await _settle(lambda: executor.started)
+        await engine.stop()
+        interrupted = await _statuses()
+
+        restarted = FakeExecutor()
+        engine = JobEngine(restarted, workers=3, flush_interval=0.01)
+        await engine.start()
+        try:
+            await _settle(lambda: len(restarted.started) == 3)
+            restarted.open_all()
+            await _settle(lambda: all(engine.get(job.id) is None or engine.get(job.id).status == "done"
+                                      for job in jobs))
+            await engine.flush()
+            return [job.id for job in jobs], interrupted, await _statuses(), restarted.started
+        finally:
+            await engine.stop()
+            await close_db()
+
+    ids, interrupted, finished, started = asyncio.run(scenario())
+
+    assert set(interrupted.values()) == {"queued"}
+    assert set(finished.values()) == {"done"}
+    # The interrupted job counts its first attempt
+    assert {job.id: job.attempts for job in started} == {ids[0]: 2, ids[1]: 1, ids[2]: 1}
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from database import migrations
+
+
+def _engine(path):
+    return create_engine(f"sqlite:///{path}")
+
+
+def test_failed_migration_leaves_no_schema(tmp_path, monkeypatch):
+    def create_then_fail(conn):
+        conn.execute(text("CREATE TABLE half_done (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("CREATE INDEX ix_half_done ON half_done (id)"))
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(1, "failing step", create_then_fail)])
+    engine = _engine(tmp_path / "nexus.db")
+    with engine.connect() as conn, pytest.raises(RuntimeError):
+        migrations.run_migrations(conn)
+    engine.dispose()
+
+    db = sqlite3.connect(tmp_path / "nexus.db")
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert db.execute("SELECT name FROM sqlite_master WHERE name LIKE '%half_done'").fetchall() == []
+    db.close()
+
+
+def test_migrations_apply_once(tmp_path):
+    engine = _engine(tmp_path / "nexus.db")
+    with engine.connect() as conn:
+        assert migrations.run_migrations(conn) == [v for v, _, _ in migrations.MIGRATIONS]
+    with engine.connect() as conn:
+        assert migrations.run_migrations(conn) == []
+        assert migrations.get_version(conn) == migrations.latest_version()
+    engine.dispose()
+
+
+def test_duplicate_proxies_keep_the_newest_copy(tmp_path, monkeypatch):
+    engine = _engine(tmp_path / "nexus.db")
+    all_migrations = list(migrations.MIGRATIONS)
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m for m in all_migrations if m[0] < 4])
+    with engine.connect() as conn:
+        migrations.run_migrations(conn)
+    with engine.begin() as conn:
+        # Created by step 1 on fresh databases, older ones lack it
+        conn.execute(text("DROP INDEX ux_proxies_identity"))
+        conn.execute(text("""
+            INSERT INTO proxies (id, type, host, port, username, password, status, created_at) VALUES
+            (1, 'socks5', '10.0.0.1', 1080, 'user', 'old', 'valid', '2024-01-01'),
+            (2, 'socks5', '10.0.0.1', 1080, 'user', 'new', 'unchecked', '2024-02-01'),
+            (3, 'socks5', '10.0.0.1', 1080, NULL, NULL, 'valid', '2024-01-01'),
+            (4, 'socks5', '10.0.0.1', 1080, NULL, NULL, 'valid', '2024-02-01'),
+            (5, 'http', '10.0.0.1', 1080, 'user', 'old', 'valid', '2024-01-01')
+        """))
+        conn.execute(text("""
+            INSERT INTO accounts (id, phone, status, proxy_id, created_at) VALUES
+            (1, '1', 'valid', 1, '2024-01-01'), (2, '2', 'valid', 2, '2024-01-01'),
+            (3, '3', 'valid', 3, '2024-01-01'), (4, '4', 'valid', 5, '2024-01-01'),
+            (5, '5', 'valid', NULL, '2024-01-01')
+        """))
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations)
+    with engine.connect() as conn:
+        migrations.run_migrations(conn)
+        proxies = conn.execute(text("SELECT id, password FROM proxies ORDER BY id")).all()
+        accounts = dict(conn.execute(text("SELECT id, proxy_id FROM accounts")).all())
+    engine.dispose()
+
+    assert [tuple(row) for row in proxies] == [(2, "new"), (4, None), (5, "old")]
+    assert accounts == {1: 2, 2: 2, 3: 4, 4: 5, 5: None}
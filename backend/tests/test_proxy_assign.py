@@ -0,0 +1,87 @@
+import asyncio
+from collections import Counter
+
+from sqlalchemy import delete, event, insert, select
+
+from api.accounts import ProxyAutoAssign, auto_assign_proxies
+from database.database import async_session, close_db, engine, init_db
+from database.models import Account, Proxy
+from services.proxy_assign import plan_assignment
+
+
+def test_plan_respects_the_cap():
+    current = {account_id: None for account_id in range(1, 11)}
+    plan = plan_assignment(current, [(1, 100), (2, 200), (3, 300)], {}, max_per_proxy=3)
+
+    assert len(plan) == 9
+    assert set(Counter(plan.values()).values()) == {3}
+
+
+def test_plan_prefers_lower_latency_on_equal_load():
+    current = {1: None, 2: None, 3: None}
+    plan = plan_assignment(current, [(1, 300), (2, None), (3, 50), (4, 120)], {}, max_per_proxy=10)
+
+    # One account per proxy is balanced, the fastest measured proxies first
+    assert plan == {1: 3, 2: 4, 3: 1}
+
+
+def test_plan_keeps_accounts_on_proxies_below_the_balanced_load():
+    current = {1: 1, 2: 1, 3: 1, 4: 2}
+    plan = plan_assignment(current, [(1, 10), (2, 10)], {}, max_per_proxy=10)
+
+    assert plan[4] == 2
+    assert Counter(plan.values()) == {1: 2, 2: 2}
+    assert sum(plan[a] != current[a] for a in current) == 1
+
+
+def test_plan_counts_existing_load():
+    plan = plan_assignment({1: None, 2: None}, [(1, 10), (2, 500)], {1: 3}, max_per_proxy=4)
+
+    # Load goes before latency
+    assert plan == {1: 2, 2: 2}
+
+
+def test_auto_assign_filters_types_and_writes_one_statement():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE accounts"):
+            statements.append((statement, executemany))
+
+    async def scenario():
+        await init_db()
+        try:
+            async with async_session() as session:
+                await session.execute(delete(Account))
+                await session.execute(delete(Proxy))
+                await session.execute(insert(Proxy), [
+                    {"id": 1, "type": "socks5", "host": "10.0.0.1", "port": 1080, "status": "valid", "latency_ms": 80},
+                    {"id": 2, "type": "socks5", "host": "10.0.0.2", "port": 1080, "status": "valid", "latency_ms": 40},
+                    {"id": 3, "type": "http", "host": "10.0.0.3", "port": 8080, "status": "valid", "latency_ms": 5},
+                    {"id": 4, "type": "socks5", "host": "10.0.0.4", "port": 1080, "status": "invalid"},
+                ])
+                await session.execute(insert(Account), [
+                    {"id": i, "phone": f"7900{i:07d}", "status": "valid"} for i in range(1, 6)
+                ])
+                await session.commit()
+
+                event.listen(engine.sync_engine, "before_cursor_execute", record)
+                try:
+                    response = await auto_assign_proxies(
+                        ProxyAutoAssign(filter={"status": "valid"}, types=["socks5"], max_per_proxy=2),
+                        session
+                    )
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+                result = await session.execute(select(Account.id, Account.proxy_id).order_by(Account.id))
+                return response, dict(result.all())
+        finally:
+            await close_db()
+
+    response, assigned = asyncio.run(scenario())
+
+    assert response["assigned"] == 4 and response["unassigned"] == 1
+    # Only valid socks5 proxies, up to 2 each, the faster one first
+    assert assigned == {1: 2, 2: 1, 3: 2, 4: 1, 5: None}
+    assert len(statements) == 1 and not statements[0][1]
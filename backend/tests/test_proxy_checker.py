@@ -0,0 +1,145 @@
+"""Proxy checks against local stub proxies
+
+An HTTP and a SOCKS5 stub answer the check request themselves, a third
+server accepts connections and never replies, and a closed port refuses.
+"""
+import asyncio
+import socket
+import struct
+
+from sqlalchemy import delete, insert, select
+
+from database.database import async_session, close_db, init_db
+from database.models import Proxy, ProxyCheck
+from services import proxy_checker
+from services.proxy_checker import ProxyChecker
+
+CHECK_URL = "http://check.test/ip"
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok"
+TIMEOUT = 0.5
+
+
+async def _answer(reader, writer):
+    # Request line and headers of the check request, no body
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(RESPONSE)
+    await writer.drain()
+    writer.close()
+
+
+async def _http_proxy(reader, writer):
+    await _answer(reader, writer)
+
+
+async def _socks5_proxy(reader, writer):
+    _, methods = await reader.readexactly(2)
+    await reader.readexactly(methods)
+    writer.write(b"\x05\x00")  # no authentication
+
+    _, _, _, address_type = await reader.readexactly(4)
+    if address_type == 1:
+        await reader.readexactly(4)
+    elif address_type == 3:
+        await reader.readexactly((await reader.readexactly(1))[0])
+    else:
+        await reader.readexactly(16)
+    await reader.readexactly(2)  # port
+    writer.write(b"\x05\x00\x00\x01" + socket.inet_aton("127.0.0.1") + struct.pack("!H", 0))
+    await _answer(reader, writer)
+
+
+async def _silent(reader, writer):
+    await asyncio.sleep(TIMEOUT * 4)
+    writer.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _serve(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _add_proxies(rows):
+    async with async_session() as session:
+        await session.execute(delete(ProxyCheck))
+        await session.execute(delete(Proxy))
+        await session.execute(insert(Proxy), rows)
+        await session.commit()
+        result = await session.execute(select(Proxy).order_by(Proxy.id))
+        return list(result.scalars())
+
+
+async def _stored():
+    async with async_session() as session:
+        result = await session.execute(select(Proxy.port, Proxy.status, Proxy.latency_ms))
+        return {port: (status, latency) for port, status, latency in result.all()}
+
+
+def test_statuses_and_latency_are_stored():
+    async def scenario():
+        await init_db()
+        http, http_port = await _serve(_http_proxy)
+        socks, socks_port = await _serve(_socks5_proxy)
+        silent, silent_port = await _serve(_silent)
+        refused_port = _free_port()
+        try:
+            proxies = await _add_proxies([
+                {"type": "http", "host": "127.0.0.1", "port": http_port},
+                {"type": "socks5", "host": "127.0.0.1", "port": socks_port},
+                {"type": "http", "host": "127.0.0.1", "port": silent_port},
+                {"type": "socks5", "host": "127.0.0.1", "port": refused_port},
+            ])
+            checker = ProxyChecker(concurrency=4, timeout=TIMEOUT, check_url=CHECK_URL)
+            results = await checker.run(proxies)
+            return results, await _stored(), (http_port, socks_port, silent_port, refused_port)
+        finally:
+            for server in (http, socks, silent):
+                server.close()
+            await close_db()
+
+    results, stored, (http_port, socks_port, silent_port, refused_port) = asyncio.run(scenario())
+
+    assert len(results) == 4
+    errors = {r.proxy_id: r.error for r in results}
+    assert stored[http_port][0] == "valid" and 0 <= stored[http_port][1] < TIMEOUT * 1000
+    assert stored[socks_port][0] == "valid" and 0 <= stored[socks_port][1] < TIMEOUT * 1000
+    assert stored[silent_port] == ("invalid", None)
+    assert stored[refused_port] == ("invalid", None)
+    assert "timeout" in errors.values()
+
+
+def test_results_are_committed_every_batch(monkeypatch):
+    batches = []
+    record_checks = proxy_checker.record_checks
+
+    async def recording(session, results):
+        batches.append(len(results))
+        await record_checks(session, results)
+
+    monkeypatch.setattr(proxy_checker, "record_checks", recording)
+
+    async def scenario():
+        await init_db()
+        http, http_port = await _serve(_http_proxy)
+        try:
+            proxies = await _add_proxies([
+                {"type": "http", "host": "127.0.0.1", "port": http_port, "username": f"user{i}"}
+                for i in range(5)
+            ])
+            await ProxyChecker(concurrency=1, timeout=TIMEOUT, batch_size=2, check_url=CHECK_URL).run(proxies)
+            async with async_session() as session:
+                result = await session.execute(select(ProxyCheck.ok))
+                return result.scalars().all()
+        finally:
+            http.close()
+            await close_db()
+
+    checks = asyncio.run(scenario())
+
+    assert batches == [2, 2, 1]
+    assert checks == [True] * 5
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert, select
+
+from database.database import async_session, close_db, engine, init_db
+from database.models import Proxy, ProxyCheck, ProxyCheckRollup
+from services.proxy_checker import CheckResult
+from services.proxy_health import record_checks, rollup_and_prune
+
+
+def test_datetimes_are_bound_without_the_default_adapter():
+    now = datetime(2024, 6, 1, 12, 30)
+    # Parameters that reach sqlite3 as datetime objects, which only its
+    # deprecated default adapter converts
+    adapted = []
+
+    def record_binds(conn, cursor, statement, parameters, context, executemany):
+        rows = parameters if executemany else [parameters]
+        adapted.extend(value for row in rows for value in row if isinstance(value, datetime))
+
+    async def scenario():
+        await init_db()
+        try:
+            async with async_session() as session:
+                await session.execute(delete(ProxyCheckRollup))
+                await session.execute(delete(ProxyCheck))
+                await session.execute(delete(Proxy))
+                await session.execute(insert(Proxy), [{"id": 1, "type": "socks5", "host": "10.0.0.1", "port": 1080}])
+                event.listen(engine.sync_engine, "before_cursor_execute", record_binds)
+                await record_checks(session, [
+                    CheckResult(1, "valid", 100, now - timedelta(minutes=20)),
+                    CheckResult(1, "invalid", None, now - timedelta(minutes=10)),
+                    CheckResult(1, "valid", 50, now - timedelta(hours=1)),
+                    # Past raw retention, pruned and not rolled up
+                    CheckResult(1, "valid", 10, now - timedelta(days=3)),
+                ])
+                await rollup_and_prune(session, now)
+                event.remove(engine.sync_engine, "before_cursor_execute", record_binds)
+                await session.commit()
+
+                result = await session.execute(select(ProxyCheckRollup).order_by(ProxyCheckRollup.bucket))
+                rollups = [(r.period, r.bucket, r.checks, r.successes, r.latency_sum) for r in result.scalars()]
+                result = await session.execute(select(ProxyCheck.checked_at))
+                return rollups, result.scalars().all()
+        finally:
+            await close_db()
+
+    rollups, checked = asyncio.run(scenario())
+
+    assert rollups == [
+        ("day", datetime(2024, 6, 1), 3, 2, 150),
+        ("hour", datetime(2024, 6, 1, 11), 1, 1, 50),
+        ("hour", datetime(2024, 6, 1, 12), 2, 1, 100),
+    ]
+    assert len(checked) == 3
+    assert adapted == []
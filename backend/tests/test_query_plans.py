@@ -0,0 +1,139 @@
+"""Account and proxy list filters are answered from indexes, not table scans
+
+Plans are checked on a database created by the migrations and on one
+upgraded from the schema that predates them (user_version 0).
+"""
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+
+from api.accounts import _encode_cursor, _list_conditions, _list_query
+from api.proxy import proxy_list_query
+from database.migrations import latest_version, run_migrations
+from services.serializers import ACCOUNT_KEYS
+
+# Schema created by the first release, before versioned migrations
+BASELINE_SCHEMA = """
+CREATE TABLE account_groups (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, color VARCHAR(20), created_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE tags (
+    id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, color VARCHAR(20) NOT NULL, created_at DATETIME NOT NULL,
+    PRIMARY KEY (id), UNIQUE (name)
+);
+CREATE TABLE proxies (
+    id INTEGER NOT NULL, type VARCHAR(10) NOT NULL, host VARCHAR(255) NOT NULL, port INTEGER NOT NULL,
+    username VARCHAR(100), password VARCHAR(100), status VARCHAR(20) NOT NULL, last_checked_at DATETIME,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE accounts (
+    id INTEGER NOT NULL, telegram_id INTEGER, username VARCHAR(100), phone VARCHAR(20),
+    first_name VARCHAR(100), last_name VARCHAR(100), status VARCHAR(30) NOT NULL, session_string TEXT,
+    proxy_id INTEGER, group_id INTEGER, last_checked_at DATETIME, last_used_at DATETIME,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (id), UNIQUE (telegram_id),
+    FOREIGN KEY(proxy_id) REFERENCES proxies (id) ON DELETE SET NULL,
+    FOREIGN KEY(group_id) REFERENCES account_groups (id) ON DELETE SET NULL
+);
+CREATE TABLE account_tags (
+    account_id INTEGER NOT NULL, tag_id INTEGER NOT NULL,
+    PRIMARY KEY (account_id, tag_id),
+    FOREIGN KEY(account_id) REFERENCES accounts (id) ON DELETE CASCADE,
+    FOREIGN KEY(tag_id) REFERENCES tags (id) ON DELETE CASCADE
+);
+INSERT INTO proxies VALUES (1, 'socks5', '10.0.0.1', 1080, NULL, NULL, 'valid', NULL, '2024-01-01 00:00:00');
+INSERT INTO accounts VALUES (1, 100, 'user1', '79000000001', 'Ivan', 'Petrov', 'valid', 'session', 1, NULL,
+    NULL, NULL, '2024-01-01 00:00:00');
+"""
+
+PAGE = 100
+
+
+def _page(status=None, group_id=None, tag_id=None, cursor=None, order_by="id"):
+    """The SQL path of GET /api/accounts"""
+    conditions = _list_conditions(status, group_id, tag_id, cursor, order_by)
+    return _list_query(list(ACCOUNT_KEYS), conditions, order_by, PAGE)
+
+
+# Each account list filter and the keyset cursor
+LIST_QUERIES = {
+    "status": _page(status="valid"),
+    "group_id": _page(group_id=1),
+    "tag_id": _page(tag_id=1),
+    "cursor": _page(cursor=_encode_cursor(500, 500)),
+    "status after cursor": _page(status="valid", cursor=_encode_cursor(500, 500)),
+    "last_checked_at cursor": _page(
+        cursor=_encode_cursor(datetime(2024, 1, 1), 500), order_by="last_checked_at"
+    ),
+}
+
+# GET /api/proxy with the step that reads proxies. A score filter in id
+# order reads the table in id order rather than sort what the index finds.
+PROXY_QUERIES = {
+    "all": (proxy_list_query(), "SCAN proxies"),
+    "status": (proxy_list_query(status="valid"), "SEARCH proxies USING INDEX ix_proxies_status (status=?)"),
+    "min_reliability": (proxy_list_query(min_reliability=0.5), "SCAN proxies"),
+    "max_latency": (proxy_list_query(max_latency=200), "SCAN proxies"),
+    "by reliability": (
+        proxy_list_query(order_by="reliability"), "SCAN proxies USING INDEX ix_proxies_reliability_score"
+    ),
+    "min_reliability by reliability": (
+        proxy_list_query(min_reliability=0.5, order_by="reliability"),
+        "SEARCH proxies USING INDEX ix_proxies_reliability_score (reliability_score>?)"
+    ),
+    "by latency": (proxy_list_query(order_by="latency"), "SCAN proxies USING INDEX ix_proxies_latency_score"),
+    "max_latency by latency": (
+        proxy_list_query(max_latency=200, order_by="latency"),
+        "SEARCH proxies USING INDEX ix_proxies_latency_score (latency_score<?)"
+    ),
+}
+
+
+def _migrate(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        run_migrations(conn)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module", params=["fresh", "upgraded"])
+def database(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp(request.param) / "nexus.db"
+    if request.param == "upgraded":
+        conn = sqlite3.connect(path)
+        conn.executescript(BASELINE_SCHEMA)
+        conn.close()
+    _migrate(path)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == latest_version()
+    yield conn
+    conn.close()
+
+
+def _plan(conn, query):
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+@pytest.mark.parametrize("name", LIST_QUERIES)
+def test_list_filter_uses_index(database, name):
+    plan = _plan(database, LIST_QUERIES[name])
+    assert any(step.startswith("SEARCH accounts USING") for step in plan), plan
+    assert not any(step.startswith("SCAN accounts") for step in plan), plan
+
+
+
+@pytest.mark.parametrize("name", PROXY_QUERIES)
+def test_proxy_list_uses_index(database, name):
+    query, expected = PROXY_QUERIES[name]
+    plan = _plan(database, query)
+    assert expected in plan, plan
+    # Accounts per proxy are counted from the proxy_id index alone
+    assert any(step.startswith("SEARCH accounts USING COVERING INDEX ix_accounts_proxy_id") for step in plan), plan
+    assert not any(step.startswith("SCAN accounts") for step in plan), plan
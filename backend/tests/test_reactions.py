@@ -0,0 +1,211 @@
+"""Reaction campaign planning and dispatch with a fake reactor"""
+import asyncio
+import random
+import time
+from collections import Counter
+
+from sqlalchemy import delete, select
+
+from database.database import async_session, close_db, init_db
+from database.models import ReactionAction, ReactionCampaign
+from services.reactions import ReactionEngine, TransientReactionError, plan_actions
+from services.status_writer import StatusWriter
+
+ACCOUNTS = [(account_id, account_id % 2 + 1) for account_id in range(1, 7)]
+
+
+class FakeReactor:
+    """Records when each action fired, fails the first try of chosen posts"""
+
+    def __init__(self, flood_posts=(), retry_after=0.0):
+        self.fired = []  # (time, action id, account id, proxy id)
+        self.flood_posts = set(flood_posts)
+        self.retry_after = retry_after
+
+    async def __call__(self, action, channel):
+        self.fired.append((time.time(), action.id, action.account_id, action.proxy_id))
+        await asyncio.sleep(0)
+        if action.post_id in self.flood_posts and action.attempts == 1:
+            raise TransientReactionError("flood wait", retry_after=self.retry_after)
+
+
+def _engine(reactor, **kwargs) -> ReactionEngine:
+    options = {"account_interval": 0.0, "proxy_interval": 0.0, "jitter": 0.0, "backoff": 0.01,
+               "flush_interval": 0.01, **kwargs}
+    # A writer that is never started, last_used_at updates stay pending
+    return ReactionEngine(reactor=reactor, writer=StatusWriter(), **options)
+
+
+async def _reset():
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(ReactionAction))
+        await session.execute(delete(ReactionCampaign))
+        await session.commit()
+
+
+async def _until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+async def _stored(campaign_id):
+    async with async_session() as session:
+        campaign = await session.get(ReactionCampaign, campaign_id)
+        result = await session.execute(
+            select(ReactionAction.status, ReactionAction.attempts).where(ReactionAction.campaign_id == campaign_id)
+        )
+        return campaign.status, Counter(status for status, _ in result.all())
+
+
+def _min_gap(fired, index):
+    last, gap = {}, float("inf")
+    for row in sorted(fired):
+        key = row[index]
+        if key in last:
+            gap = min(gap, row[0] - last[key])
+        last[key] = row[0]
+    return gap
+
+
+def test_plan_actions():
+    planned = plan_actions([10, 20], ACCOUNTS, ["👍", "🔥"], 4, 1.0, 2.0, 1000.0, random.Random(7))
+
+    assert len(planned) == 8
+    for post_id in (10, 20):
+        actions = [a for a in planned if a[2] == post_id]
+        assert len({a[0] for a in actions}) == 4
+        times = [a[4] for a in actions]
+        assert 1000.0 <= times[0] <= 1002.0
+        assert all(1.0 <= b - a <= 2.0 for a, b in zip(times, times[1:]))
+    assert {a[3] for a in planned} <= {"👍", "🔥"}
+    assert all((account_id, proxy_id) in ACCOUNTS for account_id, proxy_id, _, _, _ in planned)
+
+
+def test_plan_actions_uses_every_account_when_count_is_larger():
+    planned = plan_actions([1], ACCOUNTS[:2], ["👍"], 10, 0.0, 0.0, 0.0)
+
+    assert sorted(a[0] for a in planned) == [1, 2]
+
+
+def test_dispatch_keeps_account_and_proxy_intervals():
+    reactor = FakeReactor()
+
+    async def scenario():
+        await _reset()
+        engine = _engine(reactor, account_interval=0.05, proxy_interval=0.02)
+        engine.start()
+        try:
+            campaign = await engine.create("channel", [1, 2, 3], ["👍"], ACCOUNTS, count=6)
+            await _until(lambda: campaign.status == "done")
+            await engine.flush()
+            return await _stored(campaign.id)
+        finally:
+            await engine.stop()
+            await close_db()
+
+    status, actions = asyncio.run(scenario())
+
+    assert status == "done" and actions == {"done": 18}
+    assert len(reactor.fired) == 18
+    # Dispatch times are taken in the reactor, a little after the engine's clock
+    assert _min_gap(reactor.fired, 2) >= 0.05 - 0.005
+    assert _min_gap(reactor.fired, 3) >= 0.02 - 0.005
+
+
+def test_flood_wait_retries_after_the_requested_time():
+    reactor = FakeReactor(flood_posts={1}, retry_after=0.1)
+
+    async def scenario():
+        await _reset()
+        engine = _engine(reactor)
+        engine.start()
+        try:
+            campaign = await engine.create("channel", [1], ["👍"], ACCOUNTS[:1], count=1)
+            await _until(lambda: campaign.status == "done")
+            await engine.flush()
+            return campaign, engine.counters
+        finally:
+            await engine.stop()
+            await close_db()
+
+    campaign, counters = asyncio.run(scenario())
+
+    assert campaign.done == 1 and counters["retried"] == 1
+    first, second = reactor.fired
+    assert second[0] - first[0] >= 0.1 - 0.005
+
+
+def test_pause_resume_and_cancel():
+    reactor = FakeReactor()
+
+    async def scenario():
+        await _reset()
+        engine = _engine(reactor)
+        engine.start()
+        try:
+            paused = await engine.create("channel", [1], ["👍"], ACCOUNTS, count=6, min_delay=0.03, max_delay=0.03)
+            await _until(lambda: reactor.fired)
+            assert (await engine.pause(paused.id)).status == "paused"
+            assert await engine.pause(paused.id) is None
+            fired_before = len(reactor.fired)
+            await asyncio.sleep(0.15)
+            fired_while_paused = len(reactor.fired) - fired_before
+            await engine.resume(paused.id)
+            await _until(lambda: paused.status == "done")
+
+            cancelled = await engine.create("channel", [2], ["👍"], ACCOUNTS, count=6, min_delay=0.05, max_delay=0.05)
+            await _until(lambda: cancelled.done >= 1)
+            assert (await engine.cancel(cancelled.id)).status == "cancelled"
+            fired_at_cancel = len(reactor.fired)
+            await asyncio.sleep(0.15)
+            await engine.flush()
+            return (
+                fired_while_paused, paused.shift, len(reactor.fired) - fired_at_cancel,
+                await _stored(paused.id), await _stored(cancelled.id)
+            )
+        finally:
+            await engine.stop()
+            await close_db()
+
+    fired_while_paused, shift, fired_after_cancel, paused, cancelled = asyncio.run(scenario())
+
+    assert fired_while_paused == 0
+    assert shift >= 0.15
+    assert paused == ("done", {"done": 6})
+    assert fired_after_cancel == 0
+    assert cancelled[0] == "cancelled"
+    assert cancelled[1]["done"] >= 1 and cancelled[1]["done"] + cancelled[1]["cancelled"] == 6
+
+
+def test_active_campaigns_are_restored_after_restart():
+    reactor = FakeReactor()
+
+    async def scenario():
+        await _reset()
+        engine = _engine(reactor)
+        engine.start()
+        campaign = await engine.create("channel", [1], ["👍"], ACCOUNTS, count=6, min_delay=0.05, max_delay=0.05)
+        await _until(lambda: campaign.done >= 2)
+        await engine.stop()
+        stopped = await _stored(campaign.id)
+
+        engine = _engine(reactor)
+        engine.start()
+        try:
+            await _until(lambda: len(reactor.fired) == 6)
+            # Written by the flush in stop()
+            await engine.stop()
+            return stopped, await _stored(campaign.id)
+        finally:
+            await engine.stop()
+            await close_db()
+
+    stopped, finished = asyncio.run(scenario())
+
+    assert stopped[0] == "running" and stopped[1]["planned"] >= 1
+    assert finished == ("done", {"done": 6})
+    # Every reaction fired once across both runs
+    assert len({action_id for _, action_id, _, _ in reactor.fired}) == len(reactor.fired) == 6
@@ -0,0 +1,161 @@
+"""ETags, 304s and cached list bodies follow the table versions"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from sqlalchemy import delete, insert, update
+
+import api.tags
+from api.router import include_api
+from database.database import async_session, close_db, init_db
+from database.models import Account, AccountTag, account_tags
+from services.response_cache import ResponseCache
+
+
+async def _reset():
+    await init_db()
+    async with async_session() as session:
+        await session.execute(delete(account_tags))
+        await session.execute(delete(AccountTag))
+        await session.execute(insert(AccountTag), [{"id": 1, "name": "first"}])
+        await session.commit()
+
+
+async def _write(statement, commit=True):
+    async with async_session() as session:
+        await session.execute(statement)
+        if commit:
+            await session.commit()
+
+
+def _tags_app(monkeypatch) -> tuple:
+    cache = ResponseCache()
+    monkeypatch.setattr(api.tags, "response_cache", cache)
+    app = FastAPI()
+    include_api(app)
+    return app, cache
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_unchanged_list_is_not_modified_or_cached(monkeypatch):
+    app, cache = _tags_app(monkeypatch)
+
+    async def scenario():
+        await _reset()
+        try:
+            async with _client(app) as client:
+                first = await client.get("/api/tags")
+                etag = first.headers["etag"]
+                return (
+                    first,
+                    await client.get("/api/tags"),
+                    await client.get("/api/tags", headers={"If-None-Match": etag}),
+                    await client.get("/api/tags", headers={"If-None-Match": f'"other", W/{etag}'}),
+                )
+        finally:
+            await close_db()
+
+    first, cached, not_modified, weak = asyncio.run(scenario())
+
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    assert [tag["name"] for tag in first.json()["data"]] == ["first"]
+    assert cached.content == first.content and cached.headers["etag"] == first.headers["etag"]
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert weak.status_code == 304
+    assert cache.stats == {"hits": 1, "misses": 1, "not_modified": 2}
+
+
+def test_write_to_a_read_table_invalidates(monkeypatch):
+    app, cache = _tags_app(monkeypatch)
+
+    async def scenario():
+        await _reset()
+        try:
+            async with _client(app) as client:
+                before = await client.get("/api/tags")
+                etag = before.headers["etag"]
+                # Not read by the tags list
+                await _write(update(Account).values(status="valid"))
+                unrelated = await client.get("/api/tags", headers={"If-None-Match": etag})
+                await _write(insert(AccountTag).values(id=2, name="second"))
+                after = await client.get("/api/tags", headers={"If-None-Match": etag})
+                return before, unrelated, after
+        finally:
+            await close_db()
+
+    before, unrelated, after = asyncio.run(scenario())
+
+    assert unrelated.status_code == 304
+    assert after.status_code == 200 and after.headers["etag"] != before.headers["etag"]
+    assert [tag["name"] for tag in after.json()["data"]] == ["first", "second"]
+    assert cache.stats["misses"] == 2
+
+
+def test_rolled_back_write_still_changes_the_etag(monkeypatch):
+    app, _ = _tags_app(monkeypatch)
+
+    async def scenario():
+        await _reset()
+        try:
+            async with _client(app) as client:
+                before = await client.get("/api/tags")
+                await _write(insert(AccountTag).values(id=3, name="rolled back"), commit=False)
+                after = await client.get("/api/tags", headers={"If-None-Match": before.headers["etag"]})
+                return before, after
+        finally:
+            await close_db()
+
+    before, after = asyncio.run(scenario())
+
+    # A spare miss, never a stale body
+    assert after.status_code == 200 and after.content == before.content
+
+
+def test_query_string_is_part_of_the_identity():
+    cache = ResponseCache()
+    builds = []
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request):
+        async def build():
+            builds.append(dict(request.query_params))
+            return {"page": request.query_params.get("page")}
+        return await cache.respond(request, "items", ["items"], build)
+
+    async def scenario():
+        async with _client(app) as client:
+            one = await client.get("/items", params={"page": 1, "limit": 5})
+            reordered = await client.get("/items?limit=5&page=1")
+            two = await client.get("/items", params={"page": 2, "limit": 5})
+            return one, reordered, two
+
+    one, reordered, two = asyncio.run(scenario())
+
+    assert reordered.headers["etag"] == one.headers["etag"] != two.headers["etag"]
+    assert two.json() == {"page": "2"}
+    assert len(builds) == 2
+
+
+def test_least_recently_used_bodies_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    app = FastAPI()
+
+    @app.get("/items/{item}")
+    async def items(item: int, request: Request):
+        async def build():
+            return {"item": item}
+        return await cache.respond(request, f"item {item}", ["items"], build)
+
+    async def scenario():
+        async with _client(app) as client:
+            for item in (1, 2, 1, 3, 1, 2):
+                await client.get(f"/items/{item}")
+
+    asyncio.run(scenario())
+
+    # 2 was least recently used when 3 came in
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 4
@@ -0,0 +1,184 @@
+"""Session validation runs with a fake check"""
+import asyncio
+from collections import Counter
+
+from sqlalchemy import delete, event, insert, select
+
+from database.database import async_session, close_db, engine, init_db
+from database.models import Account, Proxy
+from services import session_checker
+from services.progress import Progress
+from services.session_checker import CheckTarget, SessionValidator, TransientCheckError
+from services.status_writer import StatusWriter
+
+
+class FakeCheck:
+    """Answers from a table of outcomes per account and tracks concurrency"""
+
+    def __init__(self, outcomes=None, delay=0.0):
+        self.outcomes = outcomes or {}
+        self.delay = delay
+        self.calls = Counter()
+        self.running = Counter()
+        self.peak = Counter()
+
+    async def __call__(self, target: CheckTarget) -> dict:
+        self.calls[target.id] += 1
+        keys = ["all", ("proxy", target.proxy.id if target.proxy else None)]
+        for key in keys:
+            self.running[key] += 1
+            self.peak[key] = max(self.peak[key], self.running[key])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            for key in keys:
+                self.running[key] -= 1
+        outcome = self.outcomes.get(target.id, {"status": "valid"})
+        if isinstance(outcome, list):
+            # One entry per attempt, the last one repeats
+            outcome = outcome[min(self.calls[target.id], len(outcome)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+async def _reset(accounts, proxies=0, statuses=None):
+    await init_db()
+    statuses = statuses or {}
+    async with async_session() as session:
+        await session.execute(delete(Account))
+        await session.execute(delete(Proxy))
+        if proxies:
+            await session.execute(insert(Proxy), [
+                {"id": i, "type": "socks5", "host": f"10.0.0.{i}", "port": 1080} for i in range(1, proxies + 1)
+            ])
+        await session.execute(insert(Account), [
+            {"id": i, "phone": f"7900{i:07d}", "status": statuses.get(i, "unchecked"),
+             "proxy_id": i % proxies + 1 if proxies else None}
+            for i in range(1, accounts + 1)
+        ])
+        await session.commit()
+
+
+async def _accounts():
+    async with async_session() as session:
+        result = await session.execute(select(Account).order_by(Account.id))
+        return {account.id: account for account in result.scalars()}
+
+
+def _validator(check, **kwargs) -> SessionValidator:
+    # Not started, rows are written by the flush at the end of the run
+    return SessionValidator(check, backoff=0.001, writer=StatusWriter(), **kwargs)
+
+
+def test_mark_checking_selects_chunks_and_keeps_previous_status(monkeypatch):
+    monkeypatch.setattr(session_checker, "MARK_CHUNK_SIZE", 2)
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE accounts"):
+            updates.append(statement)
+
+    async def scenario():
+        await _reset(accounts=6, proxies=2, statuses={1: "valid", 2: "banned", 3: "checking", 4: "valid", 6: "valid"})
+        try:
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+            try:
+                targets = await _validator(FakeCheck()).mark_checking([
+                    [Account.status == "valid"],
+                    [Account.id.in_([2, 3, 4, 5])],
+                ])
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", record)
+            return targets, await _accounts()
+        finally:
+            await close_db()
+
+    targets, accounts = asyncio.run(scenario())
+
+    # 3 is already being checked, 4 was marked by the first selection
+    assert {t.id: t.previous_status for t in targets} == {1: "valid", 4: "valid", 6: "valid", 2: "banned", 5: "unchecked"}
+    assert {t.id: t.proxy.id for t in targets} == {1: 2, 4: 1, 6: 1, 2: 1, 5: 2}
+    assert {a.id for a in accounts.values() if a.status == "checking"} == {1, 2, 3, 4, 5, 6}
+    # Three valid accounts in chunks of two, then two more
+    assert len(updates) == 3
+
+
+def test_results_map_to_statuses():
+    outcomes = {
+        1: {"status": "valid", "username": "first", "first_name": "First"},
+        2: {"status": "banned"},
+        3: {"status": "session_expired"},
+        # Recovers on the second try
+        4: [TransientCheckError("reset"), {"status": "valid"}],
+        # Out of retries, gets its previous status back
+        5: [TransientCheckError("reset")],
+        # Not retried
+        6: [ValueError("bad session")],
+        # Flood wait longer than is honoured
+        7: [TransientCheckError("flood wait", retry_after=3600)],
+    }
+
+    async def scenario():
+        await _reset(accounts=7, statuses={5: "valid", 6: "banned", 7: "spamblock"})
+        try:
+            check = FakeCheck(outcomes)
+            validator = _validator(check, retries=2)
+            progress = Progress(kind="session-check")
+            targets = await validator.mark_checking([[]])
+            await validator.run(targets, progress)
+            return check, progress, validator.writer, await _accounts()
+        finally:
+            await close_db()
+
+    check, progress, writer, accounts = asyncio.run(scenario())
+
+    assert {a.id: a.status for a in accounts.values()} == {
+        1: "valid", 2: "banned", 3: "session_expired", 4: "valid", 5: "valid", 6: "banned", 7: "spamblock"
+    }
+    assert accounts[1].username == "first" and accounts[1].first_name == "First"
+    assert all(accounts[i].last_checked_at is not None for i in (1, 2, 3, 4))
+    assert all(accounts[i].last_checked_at is None for i in (5, 6, 7))
+    assert check.calls == {1: 1, 2: 1, 3: 1, 4: 2, 5: 3, 6: 1, 7: 1}
+    assert progress.done == 7
+    assert progress.counters == {"valid": 2, "banned": 1, "session_expired": 1, "retries": 3, "failed": 3}
+    assert sorted(error["item"] for error in progress.errors) == ["account 5", "account 6", "account 7"]
+    # Every result went out in one batch
+    assert writer.stats["flushes"] == 1 and writer.stats["rows"] == 7
+
+
+def test_run_bounds_global_and_per_proxy_concurrency():
+    async def scenario():
+        await _reset(accounts=40, proxies=3)
+        try:
+            check = FakeCheck(delay=0.01)
+            validator = _validator(check, concurrency=8, proxy_concurrency=2)
+            await validator.run(await validator.mark_checking([[]]))
+            return check, await _accounts()
+        finally:
+            await close_db()
+
+    check, accounts = asyncio.run(scenario())
+
+    assert {a.status for a in accounts.values()} == {"valid"}
+    # 8 workers, but 3 proxies allow only 6 checks at once
+    assert check.peak["all"] == 6
+    assert all(check.peak[("proxy", proxy_id)] == 2 for proxy_id in (1, 2, 3))
+
+
+def test_cancelled_run_restores_previous_statuses():
+    async def scenario():
+        await _reset(accounts=4, statuses={1: "valid", 2: "banned"})
+        try:
+            validator = _validator(FakeCheck(delay=10), concurrency=4)
+            task = asyncio.create_task(validator.run(await validator.mark_checking([[]])))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return await _accounts()
+        finally:
+            await close_db()
+
+    accounts = asyncio.run(scenario())
+
+    assert {a.id: a.status for a in accounts.values()} == {1: "valid", 2: "banned", 3: "unchecked", 4: "unchecked"}
@@ -0,0 +1,54 @@
+import asyncio
+import io
+import json
+import threading
+import zipfile
+
+from fastapi import UploadFile
+from sqlalchemy import delete, func, select
+
+from database.database import async_session, close_db, init_db
+from database.models import Account
+from services.progress import Progress
+from services.session_import import SessionImporter, iter_session_files
+
+
+def _zip_upload(sessions) -> UploadFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for number, data in enumerate(sessions):
+            archive.writestr(f"sessions/{number}.json", json.dumps(data))
+    buffer.seek(0)
+    return UploadFile(buffer, filename="sessions.zip")
+
+
+def test_uploads_are_read_off_the_event_loop():
+    sessions = [{"user_id": 1000 + i, "phone": f"+7900000{i:04d}", "session": f"s{i}"} for i in range(7)]
+    sessions.append({"first_name": "nobody"})
+    reader_threads = set()
+
+    def tracked(items):
+        for item in items:
+            reader_threads.add(threading.get_ident())
+            yield item
+
+    async def scenario():
+        await init_db()
+        try:
+            async with async_session() as session:
+                await session.execute(delete(Account))
+                await session.commit()
+                progress = Progress("account-import")
+                importer = SessionImporter(session, progress, batch_size=3)
+                await importer.run(tracked(iter_session_files(_zip_upload(sessions))))
+                count = await session.scalar(select(func.count()).select_from(Account))
+                return progress, count
+        finally:
+            await close_db()
+
+    progress, count = asyncio.run(scenario())
+
+    assert count == 7
+    assert progress.done == 8
+    assert len(progress.errors) == 1
+    assert threading.get_ident() not in reader_threads
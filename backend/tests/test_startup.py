@@ -0,0 +1,21 @@
+"""Backend cold start stays off heavy imports
+
+Startup time is machine dependent and is checked against its budget by
+benchmarks.bench_startup instead.
+"""
+import re
+
+from benchmarks.bench_startup import start_once
+
+# Imported on first use only, never to start or answer /health
+HEAVY_MODULES = ("telethon", "telethon.crypto", "aiohttp", "aiohttp_socks")
+
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+\d+ \|\s*(\S+)$", re.MULTILINE)
+
+
+def test_startup_skips_heavy_imports(tmp_path):
+    _, _, output = start_once(str(tmp_path), python_args=("-X", "importtime"))
+    imported = set(IMPORT_LINE.findall(output))
+
+    assert "api.router" in imported
+    assert not imported.intersection(HEAVY_MODULES), sorted(imported.intersection(HEAVY_MODULES))
@@ -0,0 +1,155 @@
+"""Status stream frames: coalescing, resume and reset"""
+import asyncio
+import json
+
+from fastapi import FastAPI
+
+import api.accounts
+from api.router import include_api
+from services.status_stream import StatusStream
+
+
+def _parse(events):
+    """(event, data) pairs from server-sent event text, keepalives skipped"""
+    parsed = []
+    for block in "".join(events).split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+async def _take(stream: StatusStream, count: int, since=None):
+    events = []
+    subscription = stream.subscribe(since)
+    try:
+        async for event in subscription:
+            events.append(event)
+            if len(events) == count:
+                return _parse(events)
+    finally:
+        await subscription.aclose()
+
+
+def test_changes_are_merged_per_account():
+    stream = StatusStream()
+    stream.publish([{"id": 1, "status": "checking"}, {"id": 2, "status": "checking"}])
+    stream.publish([{"id": 1, "status": "valid", "last_checked_at": "2026-01-01T00:00:00"}])
+    stream.publish_ids([2, 3], status="banned")
+    stream.flush()
+
+    [(seq, event)] = stream.frames_after(0)
+    assert seq == 1
+    assert _parse([event]) == [("changes", {"seq": 1, "changes": [
+        {"id": 1, "status": "valid", "last_checked_at": "2026-01-01T00:00:00"},
+        {"id": 2, "status": "banned"},
+        {"id": 3, "status": "banned"},
+    ]})]
+
+
+def test_publishes_within_the_interval_share_one_frame():
+    async def scenario():
+        stream = StatusStream(interval=0.05)
+        stream.start()
+        try:
+            for account_id in range(1, 6):
+                stream.publish_ids([account_id], status="valid")
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.1)
+            stream.publish_ids([6], status="banned")
+            await asyncio.sleep(0.1)
+            return stream.frames_after(0)
+        finally:
+            await stream.stop()
+
+    frames = asyncio.run(scenario())
+
+    assert [seq for seq, _ in frames] == [1, 2]
+    assert [len(data["changes"]) for _, data in _parse(event for _, event in frames)] == [5, 1]
+
+
+def test_subscribers_resume_after_the_last_frame_seen():
+    async def scenario():
+        stream = StatusStream()
+        for account_id in range(1, 4):
+            stream.publish_ids([account_id], status="valid")
+            stream.flush()
+        resumed = await _take(stream, 3, since=1)
+        # Frames published while the client waits are delivered live
+        live = asyncio.create_task(_take(stream, 2))
+        await asyncio.sleep(0.01)
+        stream.publish_ids([4], status="banned")
+        stream.flush()
+        return resumed, await asyncio.wait_for(live, 1)
+
+    resumed, live = asyncio.run(scenario())
+
+    assert resumed == [
+        ("hello", {"seq": 3}),
+        ("changes", {"seq": 2, "changes": [{"id": 2, "status": "valid"}]}),
+        ("changes", {"seq": 3, "changes": [{"id": 3, "status": "valid"}]}),
+    ]
+    assert live == [("hello", {"seq": 3}), ("changes", {"seq": 4, "changes": [{"id": 4, "status": "banned"}]})]
+
+
+def test_resume_past_the_buffer_or_from_a_restart_resets():
+    async def scenario():
+        stream = StatusStream(buffer_size=2)
+        for account_id in range(1, 5):
+            stream.publish_ids([account_id], status="valid")
+            stream.flush()
+        return await _take(stream, 2, since=1), await _take(stream, 2, since=10), await _take(stream, 2, since=2)
+
+    dropped, restarted, kept = asyncio.run(scenario())
+
+    assert dropped == [("hello", {"seq": 4}), ("reset", {"seq": 4})]
+    assert restarted == [("hello", {"seq": 4}), ("reset", {"seq": 4})]
+    assert kept[1] == ("changes", {"seq": 3, "changes": [{"id": 3, "status": "valid"}]})
+
+
+def test_endpoint_resumes_from_last_event_id(monkeypatch):
+    stream = StatusStream()
+    monkeypatch.setattr(api.accounts, "status_stream", stream)
+    app = FastAPI()
+    include_api(app)
+
+    async def request(headers, count):
+        """Events of a streaming GET, the client disconnects after `count`"""
+        events = []
+        requested = []
+        done = asyncio.Event()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/accounts/stream", "raw_path": b"/api/accounts/stream",
+            "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("test", 1),
+            "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+        }
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.append(message["body"].decode())
+                if len(events) == count:
+                    done.set()
+
+        task = asyncio.create_task(app(scope, receive, send))
+        await asyncio.wait_for(done.wait(), 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return _parse(events)
+
+    async def scenario():
+        for account_id in range(1, 4):
+            stream.publish_ids([account_id], status="valid")
+            stream.flush()
+        return await request({"last-event-id": "2"}, 2)
+
+    events = asyncio.run(scenario())
+
+    assert events == [("hello", {"seq": 3}), ("changes", {"seq": 3, "changes": [{"id": 3, "status": "valid"}]})]
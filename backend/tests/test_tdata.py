@@ -0,0 +1,111 @@
+"""tdata decoding against folders built by build_tdata"""
+import asyncio
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from telethon.sessions import StringSession
+
+from services.progress import Progress
+from services.tdata import KEY_FILE, TdataError, build_tdata, decode_archive, decode_tdata
+
+ACCOUNTS = [
+    (1000001, 2, os.urandom(256)),
+    # Above 32 bits, stored with the wide ids tag
+    (7_000_000_001, 4, os.urandom(256)),
+]
+
+
+def _session(session_string: str):
+    session = StringSession(session_string)
+    return session.dc_id, session.auth_key.key
+
+
+def _zip(folders) -> zipfile.ZipFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for folder, files in folders.items():
+            for name, data in files.items():
+                archive.writestr(f"{folder}/{name}" if folder else name, data)
+        archive.writestr("readme.txt", "not tdata")
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+def _decode_archive(archive: zipfile.ZipFile, passcode: bytes = b""):
+    async def scenario():
+        progress = Progress(kind="account-import")
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            rows = [row async for row in decode_archive(archive, passcode, progress, executor)]
+        return rows, progress
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("passcode", [b"", b"secret"])
+def test_round_trip(passcode):
+    rows = decode_tdata(build_tdata(ACCOUNTS, passcode), passcode)
+
+    assert [row["telegram_id"] for row in rows] == [user_id for user_id, _, _ in ACCOUNTS]
+    assert [_session(row["session_string"]) for row in rows] == [(dc_id, key) for _, dc_id, key in ACCOUNTS]
+
+
+def test_wrong_passcode():
+    files = build_tdata(ACCOUNTS, b"secret")
+
+    with pytest.raises(TdataError, match="wrong passcode"):
+        decode_tdata(files, b"guess")
+
+
+def test_corrupt_key_file():
+    files = build_tdata(ACCOUNTS)
+    key_file = bytearray(files[KEY_FILE + "s"])
+    key_file[20] ^= 0xFF
+    files[KEY_FILE + "s"] = bytes(key_file)
+
+    with pytest.raises(TdataError, match="checksum"):
+        decode_tdata(files)
+
+
+def test_missing_key_file():
+    files = build_tdata(ACCOUNTS)
+    del files[KEY_FILE + "s"]
+
+    with pytest.raises(TdataError, match="missing"):
+        decode_tdata(files)
+
+
+def test_archive_round_trip_on_the_process_pool():
+    archive = _zip({
+        "first/tdata": build_tdata(ACCOUNTS[:1]),
+        "second/tdata": build_tdata(ACCOUNTS[1:]),
+    })
+
+    rows, progress = _decode_archive(archive)
+
+    assert sorted(row["telegram_id"] for row in rows) == sorted(user_id for user_id, _, _ in ACCOUNTS)
+    assert progress.done == 2
+    assert progress.errors == []
+
+
+def test_archive_reports_broken_folders():
+    broken = build_tdata(ACCOUNTS[:1], b"secret")
+    archive = _zip({"good": build_tdata(ACCOUNTS[1:]), "broken": broken})
+
+    rows, progress = _decode_archive(archive)
+
+    assert [row["telegram_id"] for row in rows] == [ACCOUNTS[1][0]]
+    assert progress.done == 2
+    assert [error["item"] for error in progress.errors] == ["broken"]
+
+
+def test_archive_without_tdata():
+    archive = _zip({})
+
+    rows, progress = _decode_archive(archive)
+
+    assert rows == []
+    assert progress.done == 0
+    assert progress.errors == []
@@ -4,6 +4,10 @@ import path from 'path'
 
 let mainWindow: BrowserWindow | null = null
 let pythonProcess: ChildProcess | null = null
+// Resolves when the backend prints its ready line, requests wait for it
+let backendReady: Promise<void> = Promise.resolve()
+
+const READY_LINE = '[Backend] Ready on'
 
 const isDev = !app.isPackaged
 
@@ -50,15 +54,24 @@ function startPythonBackend() {
   if (isDev && scriptPath) {
     pythonProcess = spawn(pythonPath, [scriptPath], {
       cwd: path.join(__dirname, '../../backend'),
-      env: { ...process.env, PYTHONUNBUFFERED: '1' }
+      // Auto reload on source changes in development only
+      env: { ...process.env, PYTHONUNBUFFERED: '1', NEXUS_DEV: '1' }
     })
   } else {
     pythonProcess = spawn(pythonPath, [], {
-      env: { ...process.env }
+      env: { ...process.env, PYTHONUNBUFFERED: '1' }
     })
   }
 
+  let markReady: () => void = () => {}
+  backendReady = new Promise((resolve) => {
+    markReady = resolve
+  })
+
   pythonProcess.stdout?.on('data', (data) => {
+    if (data.toString().includes(READY_LINE)) {
+      markReady()
+    }
     console.log(`[Python] ${data}`)
   })
 
@@ -68,6 +81,8 @@ function startPythonBackend() {
 
   pythonProcess.on('close', (code) => {
     console.log(`[Python] Process exited with code ${code}`)
+    // Requests fail fast instead of waiting for a backend that is gone
+    markReady()
   })
 }
 
@@ -81,6 +96,7 @@ function stopPythonBackend() {
 // IPC Handlers
 ipcMain.handle('api:request', async (_event, { method, endpoint, data }) => {
   try {
+    await backendReady
     const response = await fetch(`http://127.0.0.1:8000${endpoint}`, {
       method,
       headers: { 'Content-Type': 'application/json' },